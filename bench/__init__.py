@@ -0,0 +1,3 @@
+from __future__ import annotations
+
+# Skrypty benchmarków uruchamiane przez `python -m bench.<nazwa>`
@@ -0,0 +1,198 @@
+"""
+Offline benchmark przepustowości silników lib/email.py i lib/phone.py.
+
+Zamiast prawdziwych serwisów używany jest lokalny transport httpx.MockTransport,
+który emuluje opóźnienia, błędy i odpowiedzi rate-limit, oraz syntetyczne moduły
+w stylu holehe (email, client, out) i ignorant (phone, country_code, client, out).
+Dla każdego poziomu współbieżności raportowane są: lookups/s, p50/p99 czasu
+pojedynczego sprawdzenia i szczytowe zużycie pamięci (tracemalloc).
+
+Uruchomienie:
+  python -m bench.checkers --lookups 500 --modules 20 --concurrency 8,32,128
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import httpx
+import trio
+
+from lib import email as email_lib
+from lib import phone as phone_lib
+from lib.registry import LoadedModule
+
+
+MOCK_HOST_SUFFIX = "bench.invalid"
+
+
+@dataclass
+class MockProfile:
+    latency: float = 0.05
+    jitter: float = 0.02
+    error_rate: float = 0.02
+    rate_limit_rate: float = 0.05
+    seed: int = 1234
+
+
+def mock_transport(profile: MockProfile) -> httpx.MockTransport:
+    """Transport answering every request locally after a simulated network delay."""
+    rng = random.Random(profile.seed)
+
+    async def _handler(request: httpx.Request) -> httpx.Response:
+        delay = max(0.0, rng.gauss(profile.latency, profile.jitter))
+        await trio.sleep(delay)
+        roll = rng.random()
+        if roll < profile.error_rate:
+            return httpx.Response(500, text="internal error")
+        if roll < profile.error_rate + profile.rate_limit_rate:
+            return httpx.Response(429, json={"error": "too many requests"})
+        return httpx.Response(200, json={"exists": rng.random() < 0.3})
+
+    return httpx.MockTransport(_handler)
+
+
+def _mock_result(name: str, response: httpx.Response) -> dict:
+    if response.status_code == 429:
+        return {"name": name, "domain": name, "rateLimit": True, "exists": False}
+    response.raise_for_status()
+    return {"name": name, "domain": name, "rateLimit": False, "exists": bool(response.json()["exists"])}
+
+
+def make_holehe_modules(count: int) -> List[LoadedModule]:
+    modules: List[LoadedModule] = []
+    for index in range(count):
+        name = f"site{index}"
+
+        async def _check(email: str, client: httpx.AsyncClient, out: List[dict], name: str = name) -> None:
+            response = await client.post(f"https://{name}.{MOCK_HOST_SUFFIX}/register", data={"email": email})
+            out.append(_mock_result(name, response))
+
+        modules.append(LoadedModule(f"bench.holehe.{name}", name, _check))
+    return modules
+
+
+def make_ignorant_modules(count: int) -> List[LoadedModule]:
+    modules: List[LoadedModule] = []
+    for index in range(count):
+        name = f"site{index}"
+
+        async def _check(
+            phone: str, country_code: str, client: httpx.AsyncClient, out: List[dict], name: str = name
+        ) -> None:
+            response = await client.get(
+                f"https://{name}.{MOCK_HOST_SUFFIX}/login", params={"phone": f"{country_code}{phone}"}
+            )
+            out.append(_mock_result(name, response))
+
+        modules.append(LoadedModule(f"bench.ignorant.{name}", name, _check))
+    return modules
+
+
+def _percentile(values: Sequence[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _timed(items: Iterable[object], started: Dict[object, float]) -> Iterator[object]:
+    # The bulk engine pulls an identifier right before spawning its first module
+    for item in items:
+        started[item] = time.perf_counter()
+        yield item
+
+
+def run_bulk_benchmark(
+    run_bulk: Callable[..., object],
+    identifiers: Sequence[object],
+    modules: Sequence[LoadedModule],
+    concurrency: int,
+    profile: MockProfile,
+) -> Dict[str, float]:
+    started: Dict[object, float] = {}
+    latencies: List[float] = []
+
+    async def _main() -> None:
+        send_channel, receive_channel = trio.open_memory_channel(0)
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(
+                functools.partial(
+                    run_bulk,
+                    _timed(identifiers, started),
+                    modules,
+                    send_channel,
+                    concurrency=concurrency,
+                    max_connections=concurrency,
+                    transport=mock_transport(profile),
+                )
+            )
+            async with receive_channel:
+                async for identifier, _ in receive_channel:
+                    latencies.append(time.perf_counter() - started[identifier])
+
+    tracemalloc.start()
+    wall_started = time.perf_counter()
+    trio.run(_main)
+    wall = time.perf_counter() - wall_started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "lookups_per_s": len(latencies) / wall if wall else 0.0,
+        "p50": _percentile(latencies, 0.50),
+        "p99": _percentile(latencies, 0.99),
+        "peak_mb": peak / (1024 * 1024),
+    }
+
+
+def _targets(lookups: int, module_count: int) -> Dict[str, Tuple[Callable[..., object], List[object], List[LoadedModule]]]:
+    emails: List[object] = [f"user{i}@example.com" for i in range(lookups)]
+    numbers: List[object] = [("48", f"{600000000 + i}") for i in range(lookups)]
+    return {
+        "email": (email_lib.run_bulk_checks, emails, make_holehe_modules(module_count)),
+        "phone": (phone_lib.run_bulk_checks, numbers, make_ignorant_modules(module_count)),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark silników sprawdzających")
+    parser.add_argument("--target", default="email,phone", help="email, phone lub oba po przecinku")
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--modules", type=int, default=20)
+    parser.add_argument("--concurrency", default="8,32,128")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    profile = MockProfile(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+    )
+    levels = [int(v) for v in args.concurrency.split(",") if v.strip()]
+    targets = _targets(args.lookups, args.modules)
+
+    print(f"{'cel':<6} {'współb.':>8} {'lookups/s':>10} {'p50 [ms]':>9} {'p99 [ms]':>9} {'pamięć [MB]':>12}")
+    for name in [t.strip() for t in args.target.split(",") if t.strip()]:
+        run_bulk, identifiers, modules = targets[name]
+        for level in levels:
+            stats = run_bulk_benchmark(run_bulk, identifiers, modules, level, profile)
+            print(
+                f"{name:<6} {level:>8} {stats['lookups_per_s']:>10.1f} {stats['p50'] * 1000:>9.1f} "
+                f"{stats['p99'] * 1000:>9.1f} {stats['peak_mb']:>12.2f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,280 @@
+"""
+Benchmark profili klienta HTTP (lib/client.py): handshake'i TLS na lookup i opóźnienia.
+
+Lokalny serwer HTTPS (trio + h11/h2, certyfikat self-signed z `openssl`) nasłuchuje
+na kilku portach, które udają kilka hostów. Syntetyczne moduły w stylu holehe
+wysyłają po kilka zapytań do "swojego" hosta, więc wiele modułów trafia do tego
+samego hosta, jak w prawdziwym holehe. Dla każdego profilu raportowane są: liczba
+handshake'ów TLS (liczona po stronie serwera), handshake'i na lookup, rozwiązania
+DNS (dla profili z cache DNS), lookups/s oraz p50/p99 czasu lookupu.
+
+Uruchomienie:
+  python -m bench.client --lookups 200 --modules 20 --hosts 5 --profiles default,reuse,http2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import h11
+import httpx
+import trio
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+except ImportError:  # HTTP/2 profiles are skipped without h2
+    h2 = None
+
+from bench.checkers import _percentile, _timed
+from lib.checker import CheckEngine, create_client
+from lib.client import CachingNetworkBackend, HostLimitedTransport, build_transport, get_profile
+from lib.email import EMAIL_TARGET
+from lib.registry import LoadedModule
+
+
+RESPONSE_BODY = json.dumps({"exists": False}).encode()
+_CONNECTION_ERRORS = (trio.BrokenResourceError, trio.ClosedResourceError, ssl.SSLError, h11.RemoteProtocolError)
+
+
+@dataclass
+class ServerStats:
+    handshakes: int = 0
+    requests: int = 0
+
+
+def make_certificate(directory: str) -> Tuple[str, str]:
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    try:
+        subprocess.run(
+            [
+                "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                "-keyout", key, "-out", cert, "-subj", "/CN=localhost",
+                "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+            ],
+            check=True,
+            capture_output=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as exc:
+        raise SystemExit(f"Nie udało się wygenerować certyfikatu przez openssl: {exc}")
+    return cert, key
+
+
+async def _serve_h1(stream: trio.SSLStream, stats: ServerStats, latency: float) -> None:
+    conn = h11.Connection(h11.SERVER)
+    while True:
+        event = conn.next_event()
+        if event is h11.NEED_DATA:
+            data = await stream.receive_some(65536)
+            conn.receive_data(data)
+            if not data:
+                return
+        elif isinstance(event, h11.EndOfMessage):
+            stats.requests += 1
+            await trio.sleep(latency)
+            headers = [("content-type", "application/json"), ("content-length", str(len(RESPONSE_BODY)))]
+            data = conn.send(h11.Response(status_code=200, headers=headers))
+            data += conn.send(h11.Data(data=RESPONSE_BODY)) + conn.send(h11.EndOfMessage())
+            await stream.send_all(data)
+            conn.start_next_cycle()
+        elif isinstance(event, h11.ConnectionClosed):
+            return
+
+
+async def _serve_h2(stream: trio.SSLStream, stats: ServerStats, latency: float) -> None:
+    conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+    conn.initiate_connection()
+    send_lock = trio.Lock()
+
+    async def _flush() -> None:
+        async with send_lock:
+            data = conn.data_to_send()
+            if data:
+                await stream.send_all(data)
+
+    async def _respond(stream_id: int) -> None:
+        stats.requests += 1
+        await trio.sleep(latency)
+        conn.send_headers(
+            stream_id,
+            [(":status", "200"), ("content-type", "application/json"), ("content-length", str(len(RESPONSE_BODY)))],
+        )
+        conn.send_data(stream_id, RESPONSE_BODY, end_stream=True)
+        await _flush()
+
+    await _flush()
+    async with trio.open_nursery() as nursery:
+        while True:
+            data = await stream.receive_some(65536)
+            if not data:
+                nursery.cancel_scope.cancel()
+                return
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.StreamEnded):
+                    nursery.start_soon(_respond, event.stream_id)
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    nursery.cancel_scope.cancel()
+                    return
+            await _flush()
+
+
+async def serve_https(
+    ports: Sequence[int],
+    cert: str,
+    key: str,
+    stats: ServerStats,
+    latency: float,
+    task_status: Any = trio.TASK_STATUS_IGNORED,
+) -> None:
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    context.set_alpn_protocols(["h2", "http/1.1"] if h2 is not None else ["http/1.1"])
+
+    async def _handle(stream: trio.SSLStream) -> None:
+        try:
+            await stream.do_handshake()
+            stats.handshakes += 1
+            if stream.selected_alpn_protocol() == "h2":
+                await _serve_h2(stream, stats, latency)
+            else:
+                await _serve_h1(stream, stats, latency)
+        except _CONNECTION_ERRORS:
+            pass
+
+    listeners = []
+    for port in ports:
+        for listener in await trio.open_tcp_listeners(port, host="127.0.0.1"):
+            listeners.append(trio.SSLListener(listener, context, https_compatible=True))
+    task_status.started([listener.transport_listener.socket.getsockname()[1] for listener in listeners])
+    await trio.serve_listeners(_handle, listeners)
+
+
+def make_modules(count: int, ports: Sequence[int], requests_per_module: int) -> List[LoadedModule]:
+    modules: List[LoadedModule] = []
+    for index in range(count):
+        name = f"site{index}"
+        url = f"https://localhost:{ports[index % len(ports)]}/{name}"
+
+        async def _check(email: str, client: httpx.AsyncClient, out: List[dict], name: str = name, url: str = url) -> None:
+            for _ in range(requests_per_module):
+                response = await client.post(url, data={"email": email})
+                response.raise_for_status()
+            out.append({"name": name, "domain": name, "rateLimit": False, "exists": response.json()["exists"]})
+
+        modules.append(LoadedModule(f"bench.client.{name}", name, _check))
+    return modules
+
+
+def _dns_backend(transport: httpx.AsyncBaseTransport) -> Optional[CachingNetworkBackend]:
+    if isinstance(transport, HostLimitedTransport):
+        transport = transport.inner
+    backend = getattr(getattr(transport, "_pool", None), "_network_backend", None)
+    return backend if isinstance(backend, CachingNetworkBackend) else None
+
+
+def run_profile(
+    profile_name: str,
+    lookups: int,
+    module_count: int,
+    hosts: int,
+    requests_per_module: int,
+    concurrency: int,
+    latency: float,
+    cert: str,
+    key: str,
+) -> Dict[str, float]:
+    profile = get_profile(profile_name)
+    stats = ServerStats()
+    started: Dict[object, float] = {}
+    latencies: List[float] = []
+    dns_lookups: List[int] = []
+
+    async def _main() -> None:
+        async with trio.open_nursery() as nursery:
+            ports = await nursery.start(serve_https, [0] * hosts, cert, key, stats, latency)
+            modules = make_modules(module_count, ports, requests_per_module)
+            transport = build_transport(profile, verify=ssl.create_default_context(cafile=cert))
+            client = create_client(timeout=30.0, transport=transport, profile=profile)
+
+            async def _emit(target: Any, identifier: Any, results: List[dict]) -> None:
+                latencies.append(time.perf_counter() - started[identifier])
+
+            emails = _timed((f"user{i}@example.com" for i in range(lookups)), started)
+            async with client:
+                async with CheckEngine(concurrency=concurrency, client=client) as engine:
+                    await engine.run_batch(
+                        ((EMAIL_TARGET, email) for email in emails),
+                        {EMAIL_TARGET.name: modules},
+                        _emit,
+                    )
+            backend = _dns_backend(transport)
+            if backend is not None:
+                dns_lookups.append(backend.lookups)
+            nursery.cancel_scope.cancel()
+
+    wall_started = time.perf_counter()
+    trio.run(_main)
+    wall = time.perf_counter() - wall_started
+    return {
+        "handshakes": float(stats.handshakes),
+        "handshakes_per_lookup": stats.handshakes / lookups if lookups else 0.0,
+        "dns_lookups": float(dns_lookups[0]) if dns_lookups else -1.0,
+        "requests": float(stats.requests),
+        "lookups_per_s": len(latencies) / wall if wall else 0.0,
+        "p50": _percentile(latencies, 0.50),
+        "p99": _percentile(latencies, 0.99),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark profili klienta HTTP")
+    parser.add_argument("--profiles", default="default,reuse,http2")
+    parser.add_argument("--lookups", type=int, default=100)
+    parser.add_argument("--modules", type=int, default=20)
+    parser.add_argument("--hosts", type=int, default=5)
+    parser.add_argument("--requests-per-module", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_certificate(directory)
+        print(
+            f"{'profil':<8} {'handshake':>10} {'hs/lookup':>10} {'DNS':>6} {'zapytania':>10} "
+            f"{'lookups/s':>10} {'p50 [ms]':>9} {'p99 [ms]':>9}"
+        )
+        for name in [p.strip() for p in args.profiles.split(",") if p.strip()]:
+            if h2 is None and get_profile(name).http2:
+                print(f"{name:<8} pominięty: brak pakietu 'h2' (pip install 'httpx[http2]')")
+                continue
+            stats = run_profile(
+                name,
+                args.lookups,
+                args.modules,
+                args.hosts,
+                args.requests_per_module,
+                args.concurrency,
+                args.latency,
+                cert,
+                key,
+            )
+            dns = "—" if stats["dns_lookups"] < 0 else f"{int(stats['dns_lookups'])}"
+            print(
+                f"{name:<8} {int(stats['handshakes']):>10} {stats['handshakes_per_lookup']:>10.2f} {dns:>6} "
+                f"{int(stats['requests']):>10} {stats['lookups_per_s']:>10.1f} "
+                f"{stats['p50'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,119 @@
+"""
+Benchmark i kontrola kolejki zadań (lib/jobs.py).
+
+Najpierw budowana jest kolejka z --done zakończonymi zadaniami i --pending
+oczekującymi, po czym mierzony jest średni czas `lease` i `next_available_at`
+(z filtrem celu i bez). Następnie kolejka jest opróżniana z włączonym
+ResultCache dla modułu, który --fail razy zwraca rate limit: ponowienia muszą
+naprawdę wywołać moduł (a nie odtworzyć wynik z cache), więc moduł ma zostać
+wywołany --fail + 1 razy, a zadanie zakończyć się jako `done`. W przeciwnym
+razie skrypt kończy się kodem 1.
+
+Uruchomienie:
+  python -m bench.jobs --done 1000000 --pending 5000 --fail 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import httpx
+
+from lib.cache import ResultCache
+from lib.email import EMAIL_TARGET
+from lib.jobs import TASK_DONE, JobStore, drain_queue_sync
+from lib.registry import lazy_module_function
+
+
+# Module under check: rate-limited for the first FAIL_CALLS calls per identifier
+FAIL_CALLS = 2
+CALLS: Dict[str, int] = {}
+
+
+async def rate_limited_first(email: str, client: httpx.AsyncClient, out: List[dict]) -> None:
+    CALLS[email] = CALLS.get(email, 0) + 1
+    limited = CALLS[email] <= FAIL_CALLS
+    out.append({"name": "bench", "domain": "bench.invalid", "rateLimit": limited, "exists": not limited})
+
+
+def _fill(store: JobStore, done: int, pending: int) -> None:
+    now = time.time()
+    conn = store._conn
+    conn.execute("BEGIN")
+    for status, count, offset in (("done", done, -1.0), ("pending", pending, 1.0)):
+        conn.executemany(
+            """
+            INSERT INTO check_tasks
+                (target, identifier_key, identifier, module, function, status,
+                 available_at, created_at, updated_at)
+            VALUES (?, ?, '""', ?, 'f', ?, ?, ?, ?)
+            """,
+            (
+                (EMAIL_TARGET.name, f"{status}{i}", f"m{i % 100}", status, now + offset * (1000 + i), now, now)
+                for i in range(count)
+            ),
+        )
+    conn.execute("COMMIT")
+    conn.execute("ANALYZE")
+
+
+def _per_call(fn: Callable[[], object], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def check_retries_bypass_cache(directory: str, fail: int) -> bool:
+    # Imported by path, like the queue worker does, so CALLS is the worker's counter
+    module = importlib.import_module("bench.jobs")
+    module.FAIL_CALLS = fail
+    module.CALLS.clear()
+    store = JobStore(os.path.join(directory, "retry.db"), retry_backoff=0.01, max_attempts=fail + 2)
+    try:
+        store.enqueue(EMAIL_TARGET, ["retry@example.com"], [lazy_module_function("bench.jobs", "rate_limited_first")])
+        drain_queue_sync(store, {EMAIL_TARGET.name: EMAIL_TARGET}, cache=ResultCache())
+        calls = module.CALLS.get("retry@example.com", 0)
+        counts = store.counts()
+    finally:
+        store.close()
+    ok = calls == fail + 1 and counts == {TASK_DONE: 1}
+    print(f"ponowienia z cache: wywołań modułu {calls} (oczekiwano {fail + 1}), zadania {counts}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark i kontrola kolejki zadań")
+    parser.add_argument("--done", type=int, default=200_000)
+    parser.add_argument("--pending", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--fail", type=int, default=2, help="ile pierwszych wywołań modułu zwraca rate limit")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = JobStore(os.path.join(directory, "queue.db"))
+        try:
+            _fill(store, args.done, args.pending)
+            targets = [EMAIL_TARGET.name]
+            print(f"zadań done: {args.done}, pending: {args.pending}")
+            for name, fn in (
+                ("lease (cel)", lambda: store.lease("bench", 200, targets)),
+                ("lease", lambda: store.lease("bench", 200)),
+                ("next_available_at (cel)", lambda: store.next_available_at(targets)),
+                ("next_available_at", lambda: store.next_available_at()),
+            ):
+                print(f"  {name:<24} {_per_call(fn, args.repeat) * 1000:>8.2f} ms")
+        finally:
+            store.close()
+        if not check_retries_bypass_cache(directory, args.fail):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
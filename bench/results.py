@@ -0,0 +1,136 @@
+"""
+Benchmark reprezentacji wyników: lista słowników vs ResultBatch (kolumnowo).
+
+Generowane są syntetyczne wyniki w formacie holehe, a następnie mierzone:
+zużycie pamięci (tracemalloc), czas filtrowania exists != false z sortowaniem
+(istniejące konta najpierw) oraz czas zliczania wyników według statusu.
+
+Uruchomienie:
+  python -m bench.results --results 1000000 --modules 120
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Callable, List, Tuple, TypeVar
+
+from lib.results import Flag, ResultBatch, parse_flag
+
+
+T = TypeVar("T")
+
+
+def _synthetic_results(count: int, modules: int, seed: int) -> List[Tuple[str, dict]]:
+    rng = random.Random(seed)
+    rows: List[Tuple[str, dict]] = []
+    for i in range(count):
+        module = i % modules
+        roll = rng.random()
+        item = {
+            "name": f"site{module}",
+            "domain": f"site{module}.example",
+            "method": "register",
+            "frequent_rate_limit": False,
+            "rateLimit": roll < 0.05,
+            "exists": roll > 0.8,
+            "emailrecovery": None,
+            "phoneNumber": None,
+            "others": None,
+        }
+        if roll < 0.02:
+            item.update({"exists": "Unknown", "rateLimit": "Unknown", "error": "HTTP 500"})
+        rows.append((f"user{i // modules}@example.com", item))
+    return rows
+
+
+def _measure(build: Callable[[], T]) -> Tuple[T, float, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, elapsed, peak / (1024 * 1024)
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark reprezentacji wyników")
+    parser.add_argument("--results", type=int, default=200_000)
+    parser.add_argument("--modules", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    def _build_dicts() -> List[dict]:
+        built = []
+        for email, item in _synthetic_results(args.results, args.modules, args.seed):
+            item["email"] = email
+            built.append(item)
+        return built
+
+    # The input rows for the batch are generated outside the measured block
+    dicts, dict_build, dict_mem = _measure(_build_dicts)
+    rows = _synthetic_results(args.results, args.modules, args.seed)
+
+    def _build_batch() -> ResultBatch:
+        batch = ResultBatch()
+        for email, item in rows:
+            batch.add_results(email, (item,))
+        return batch
+
+    batch, batch_build, batch_mem = _measure(_build_batch)
+
+    def _filter_dicts() -> List[dict]:
+        kept = [item for item in dicts if parse_flag(item.get("exists")) is not Flag.FALSE]
+        kept.sort(key=lambda i: 0 if parse_flag(i.get("exists")) is Flag.TRUE else 1)
+        return kept
+
+    def _count_dicts() -> dict:
+        counts: dict = {}
+        for item in dicts:
+            key = "error" if item.get("error") else ("rate_limited" if item.get("rateLimit") is True else "ok")
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    results = [
+        ("dict", dict_mem, dict_build, _timed(_filter_dicts), _timed(_count_dicts)),
+        (
+            "batch",
+            batch_mem,
+            batch_build,
+            _timed(lambda: batch.order_by_exists(batch.where_exists(Flag.TRUE, Flag.UNKNOWN))),
+            _timed(batch.count_by_status),
+        ),
+    ]
+    try:
+        frame = batch.to_frame()
+    except RuntimeError:
+        frame = None
+    if frame is not None:
+        results.append(
+            (
+                "pandas",
+                float(frame.memory_usage(deep=True).sum()) / (1024 * 1024),
+                0.0,
+                _timed(lambda: frame[frame["exists"] != "false"].sort_values("exists", kind="stable")),
+                _timed(lambda: frame["status"].value_counts()),
+            )
+        )
+
+    print(f"wyników: {len(batch)}")
+    print(f"{'format':<7} {'pamięć [MB]':>12} {'budowa [s]':>11} {'filtr+sort [ms]':>16} {'statusy [ms]':>13}")
+    for name, mem, build, filt, count in results:
+        print(f"{name:<7} {mem:>12.1f} {build:>11.2f} {filt * 1000:>16.1f} {count * 1000:>13.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,184 @@
+"""
+Benchmark budowy modelu CP-SAT i backendów solvera w lib/schedule.py w zależności
+od rozmiaru problemu.
+
+Generowane są losowe preferencje (osoby × dni, część par z wynikiem 0, czyli
+zakazanych). Dla każdego rozmiaru raportowane są czasy: budowy macierzy wyników,
+budowy modelu rzadkiego (tylko dozwolone pary, WeightedSum) oraz — dla porównania —
+dawnej, gęstej budowy (zmienna lub stała dla każdej pary, obiektyw przez `sum`),
+a także liczba zmiennych obu modeli. Z --solve problem jest też rozwiązywany przez
+oba backendy (min-cost flow i CP-SAT); raportowane są czasy i zgodność wartości
+funkcji celu, a rozbieżność przy optymalnym CP-SAT kończy skrypt kodem 1.
+--shifts dzieli każdy dzień na kilka zmian, a --window dodatkowo rozwiązuje problem
+w oknach (solve_rolling) i podaje czas oraz wartość celu względem pełnego rozwiązania.
+
+Uruchomienie:
+  python -m bench.schedule --sizes 20x31,100x92,300x92 --density 0.6
+  python -m bench.schedule --sizes 5x31,20x31,40x92 --solve --time-limit 30
+  python -m bench.schedule --sizes 40x91,120x91 --shifts 3 --no-dense --window 28 --overlap 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from ortools.sat.python import cp_model
+
+from lib.schedule import (
+    BACKEND_CP_SAT,
+    BACKEND_MIN_COST_FLOW,
+    ScheduleProblem,
+    ScheduleResult,
+    SolverConfig,
+    build_schedule_model,
+    slot_key,
+    solve_rolling,
+    solve_schedule,
+)
+
+
+def make_preferences(
+    persons: int, days: int, density: float, seed: int, shifts: int = 1
+) -> Dict[str, Dict[str, int]]:
+    rng = random.Random(seed)
+    slots = [
+        slot_key(f"d{j:04d}", f"z{k}" if shifts > 1 else None) for j in range(days) for k in range(shifts)
+    ]
+    return {
+        f"p{i:04d}": {slot: (rng.randint(1, 10) if rng.random() < density else 0) for slot in slots}
+        for i in range(persons)
+    }
+
+
+def build_dense_model(preferences: Dict[str, Dict[str, int]]) -> Tuple[cp_model.CpModel, int]:
+    """The pre-vectorization construction, kept here only as the baseline."""
+    persons: List[str] = sorted(preferences)
+    days: List[str] = sorted({d for days_map in preferences.values() for d in days_map})
+    model = cp_model.CpModel()
+    x: Dict[Tuple[str, str], Any] = {}
+    for p in persons:
+        for d in days:
+            if int(preferences.get(p, {}).get(d, 0)) == 0:
+                x[(p, d)] = model.NewConstant(0)
+            else:
+                x[(p, d)] = model.NewBoolVar(f"x_{p}_{d}")
+    for d in days:
+        model.Add(sum(x[(p, d)] for p in persons) == 1)
+    loads = {}
+    for p in persons:
+        loads[p] = model.NewIntVar(0, len(days), f"load_{p}")
+        model.Add(loads[p] == sum(x[(p, d)] for d in days))
+    base = len(days) // len(persons)
+    workable = {p: sum(1 for d in days if int(preferences.get(p, {}).get(d, 0)) > 0) for p in persons}
+    if all(workable[p] >= base for p in persons):
+        for p in persons:
+            model.Add(loads[p] >= base)
+            model.Add(loads[p] <= min(base + 1, workable[p]))
+    used = {p: model.NewBoolVar(f"used_{p}") for p in persons}
+    for p in persons:
+        model.Add(loads[p] >= used[p])
+    objective = [10 * int(preferences[p].get(d, 0)) * x[(p, d)] for p in persons for d in days]
+    objective.append(sum(used.values()))
+    model.Maximize(sum(objective))
+    return model, len(model.Proto().variables)
+
+
+def compare_backends(
+    preferences: Dict[str, Dict[str, int]], time_limit: float
+) -> Tuple[ScheduleResult, ScheduleResult]:
+    """Solve with min-cost flow and with CP-SAT (same objective when both are optimal)."""
+    flow = solve_schedule(preferences, SolverConfig(backend=BACKEND_MIN_COST_FLOW))
+    cp_sat = solve_schedule(preferences, SolverConfig(backend=BACKEND_CP_SAT, time_limit=time_limit))
+    return flow, cp_sat
+
+
+def _parse_sizes(value: str) -> List[Tuple[int, int]]:
+    sizes = []
+    for item in value.split(","):
+        persons, _, days = item.strip().partition("x")
+        sizes.append((int(persons), int(days)))
+    return sizes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark budowy modelu harmonogramu")
+    parser.add_argument("--sizes", default="20x31,50x92,100x92,200x92,300x182")
+    parser.add_argument("--density", type=float, default=0.6, help="odsetek dozwolonych par (wynik > 0)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-dense", action="store_true", help="pomiń gęsty model bazowy (zawsze pomijany przy --shifts > 1)")
+    parser.add_argument("--solve", action="store_true", help="rozwiąż też oboma backendami i porównaj wyniki")
+    parser.add_argument("--time-limit", type=float, default=30.0, help="limit czasu CP-SAT przy --solve [s]")
+    parser.add_argument("--shifts", type=int, default=1, help="liczba zmian dziennie")
+    parser.add_argument("--window", type=int, default=0, help="rozwiąż też w oknach tej długości [dni]")
+    parser.add_argument("--overlap", type=int, default=7, help="zakładka okien [dni]")
+    args = parser.parse_args()
+
+    print(
+        f"{'osoby×dni':>10} {'macierz [ms]':>13} {'rzadki [ms]':>12} {'zmienne':>8} "
+        f"{'gęsty [ms]':>11} {'zmienne':>8} {'flow [s]':>9} {'cp-sat [s]':>11} {'cel':>12}"
+    )
+    mismatches = 0
+    for persons, days in _parse_sizes(args.sizes):
+        preferences = make_preferences(persons, days, args.density, args.seed, args.shifts)
+
+        started = time.perf_counter()
+        problem = ScheduleProblem.from_preferences(preferences)
+        matrix_time = time.perf_counter() - started
+        started = time.perf_counter()
+        built = build_schedule_model(problem)
+        sparse_time = time.perf_counter() - started
+        sparse_vars = len(built.model.Proto().variables)
+
+        dense = "—"
+        dense_vars = "—"
+        if not args.no_dense and args.shifts == 1:
+            started = time.perf_counter()
+            _, count = build_dense_model(preferences)
+            dense = f"{(time.perf_counter() - started) * 1000:.1f}"
+            dense_vars = str(count)
+
+        flow_time = cp_sat_time = objective = "—"
+        if args.solve:
+            try:
+                flow, cp_sat = compare_backends(preferences, args.time_limit)
+            except RuntimeError as exc:
+                objective = "brak rozw."
+                print(f"  {persons}x{days}: {exc}")
+            else:
+                flow_time, cp_sat_time = f"{flow.wall_time:.3f}", f"{cp_sat.wall_time:.3f}"
+                if flow.objective == cp_sat.objective:
+                    objective = f"{flow.objective:.0f} ="
+                elif cp_sat.optimal:
+                    objective = f"{flow.objective:.0f}≠{cp_sat.objective:.0f}"
+                    mismatches += 1
+                else:
+                    objective = f"{flow.objective:.0f}≥{cp_sat.objective:.0f}"
+
+        print(
+            f"{f'{persons}x{days}':>10} {matrix_time * 1000:>13.1f} {sparse_time * 1000:>12.1f} "
+            f"{sparse_vars:>8} {dense:>11} {dense_vars:>8} {flow_time:>9} {cp_sat_time:>11} {objective:>12}"
+        )
+        if args.window:
+            try:
+                full = solve_schedule(preferences)
+                started = time.perf_counter()
+                rolling = solve_rolling(preferences, args.window, args.overlap)
+            except RuntimeError as exc:
+                print(f"  okna {persons}x{days}: {exc}")
+            else:
+                print(
+                    f"  okna {args.window}/{args.overlap} dni: {rolling.windows} okien, "
+                    f"{time.perf_counter() - started:.3f} s, cel {rolling.objective:.0f} "
+                    f"({rolling.objective / full.objective:.2%} pełnego {full.objective:.0f})"
+                )
+    if mismatches:
+        print(f"Rozbieżne wartości celu: {mismatches}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
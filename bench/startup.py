@@ -0,0 +1,100 @@
+"""
+Benchmark zimnego startu: ładowanie modułów eager vs lazy.
+
+Każdy pomiar odbywa się w świeżym procesie, więc importy nie są współdzielone.
+Mierzone są: czas zwrócenia listy modułów, czas do pierwszego modułu gotowego
+do wywołania oraz czas do gotowości wszystkich modułów.
+
+Uruchomienie:
+  python -m bench.startup --package holehe --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import trio
+
+
+LOADERS = {
+    "holehe": ("lib.email", "load_holehe_functions"),
+    "ignorant": ("lib.phone", "load_ignorant_functions"),
+}
+
+
+def _measure(package: str, mode: str) -> Dict[str, float]:
+    import importlib
+
+    from lib.registry import resolve_function
+
+    module_name, loader_name = LOADERS[package]
+    started = time.perf_counter()
+    lib_mod = importlib.import_module(module_name)
+    loader = getattr(lib_mod, loader_name)
+    specs = lib_mod.parse_modules_arg(None)
+    loaded = loader(specs, lazy=(mode == "lazy"))
+    load_time = time.perf_counter() - started
+
+    ready: List[float] = []
+
+    async def _resolve_one(loaded_module) -> None:
+        try:
+            await resolve_function(loaded_module)
+        except Exception:
+            pass
+        ready.append(time.perf_counter() - started)
+
+    async def _resolve_all() -> None:
+        async with trio.open_nursery() as nursery:
+            for loaded_module in loaded:
+                nursery.start_soon(_resolve_one, loaded_module)
+
+    trio.run(_resolve_all)
+    return {
+        "modules": float(len(loaded)),
+        "load": load_time,
+        "first_ready": min(ready) if ready else load_time,
+        "all_ready": max(ready) if ready else load_time,
+    }
+
+
+def _run_child(package: str, mode: str) -> Dict[str, float]:
+    proc = subprocess.run(
+        [sys.executable, "-m", "bench.startup", "--child", mode, "--package", package],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark startu: eager vs lazy")
+    parser.add_argument("--package", choices=sorted(LOADERS), default="holehe")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", choices=["eager", "lazy"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_measure(args.package, args.child)))
+        return 0
+
+    print(f"{'tryb':<6} {'moduły':>7} {'load [ms]':>10} {'pierwszy [ms]':>14} {'wszystkie [ms]':>15}")
+    for mode in ("eager", "lazy"):
+        samples = [_run_child(args.package, mode) for _ in range(max(1, args.repeat))]
+        med = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+        print(
+            f"{mode:<6} {int(med['modules']):>7} {med['load'] * 1000:>10.1f} "
+            f"{med['first_ready'] * 1000:>14.1f} {med['all_ready'] * 1000:>15.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
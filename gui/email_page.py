@@ -1,25 +1,58 @@
 from __future__ import annotations
 
-from typing import List
-
 import streamlit as st
 
-from lib.email import check_email_sync
-from .shared import render_email_cards
+from lib.email import EMAIL_TARGET
+from lib.normalize import normalize_email
+from lib.service import JOB_FAILED
+from .shared import (
+    NO_MODULES,
+    LiveResults,
+    exists_not_false,
+    follow_job,
+    get_check_service,
+    module_selector,
+    render_email_card,
+    render_email_cards,
+)
+
+JOB_STATE_KEY = "email_job_id"
 
 
 def render_email_tab() -> None:
     st.header("Email")
     email_val = st.text_input("Adres e-mail", value="")
-    if st.button("Sprawdź email", type="primary"):
+    service = get_check_service()
+    modules_str = module_selector(EMAIL_TARGET, key=JOB_STATE_KEY)
+    if st.button("Sprawdź email", type="primary", disabled=modules_str == NO_MODULES):
         if not email_val.strip():
             st.error("Podaj adres e-mail")
         else:
             try:
-                with st.spinner("Sprawdzam e-mail…"):
-                    results: List[dict] = check_email_sync(email_val.strip(), None)
-                render_email_cards(results)
+                st.session_state[JOB_STATE_KEY] = service.submit(
+                    EMAIL_TARGET, normalize_email(email_val), modules_str
+                )
             except Exception as exc:
                 st.error(f"Błąd: {exc}")
 
+    job_id = st.session_state.get(JOB_STATE_KEY)
+    if not job_id:
+        return
+    snapshot = service.job(job_id)
+    if snapshot is None:
+        del st.session_state[JOB_STATE_KEY]
+        return
 
+    live = LiveResults(
+        total=snapshot.total,
+        render_item=render_email_card,
+        item_filter=exists_not_false,
+    )
+    snapshot = follow_job(service, job_id, live)
+    live.clear()
+    if snapshot is None:
+        return
+    if snapshot.status == JOB_FAILED:
+        st.error(f"Błąd: {snapshot.error}")
+    else:
+        render_email_cards(snapshot.results)
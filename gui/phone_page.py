@@ -1,26 +1,46 @@
 from __future__ import annotations
 
-from typing import List
-
 import streamlit as st
 
-from lib.phone import check_phone_sync
-from .shared import render_results
+from lib.normalize import normalize_phone
+from lib.phone import PHONE_TARGET
+from lib.service import JOB_FAILED
+from .shared import NO_MODULES, LiveResults, follow_job, get_check_service, module_selector, render_results
+
+JOB_STATE_KEY = "phone_job_id"
 
 
 def render_phone_tab() -> None:
     st.header("Telefon")
     cc = st.text_input("Kod kraju (np. 48)", value="48")
     phone = st.text_input("Numer telefonu", value="")
-    if st.button("Sprawdź telefon", type="primary"):
+    service = get_check_service()
+    modules_str = module_selector(PHONE_TARGET, key=JOB_STATE_KEY)
+    if st.button("Sprawdź telefon", type="primary", disabled=modules_str == NO_MODULES):
         if not cc.strip() or not phone.strip():
             st.error("Podaj kod kraju i numer telefonu")
         else:
             try:
-                with st.spinner("Sprawdzam telefon…"):
-                    results: List[dict] = check_phone_sync(cc.strip(), phone.strip(), None)
-                render_results("Wyniki (telefon)", results)
+                st.session_state[JOB_STATE_KEY] = service.submit(
+                    PHONE_TARGET, normalize_phone(phone, cc), modules_str
+                )
             except Exception as exc:
                 st.error(f"Błąd: {exc}")
 
+    job_id = st.session_state.get(JOB_STATE_KEY)
+    if not job_id:
+        return
+    snapshot = service.job(job_id)
+    if snapshot is None:
+        del st.session_state[JOB_STATE_KEY]
+        return
 
+    live = LiveResults(total=snapshot.total)
+    snapshot = follow_job(service, job_id, live)
+    live.clear()
+    if snapshot is None:
+        return
+    if snapshot.status == JOB_FAILED:
+        st.error(f"Błąd: {snapshot.error}")
+    else:
+        render_results("Wyniki (telefon)", snapshot.results)
@@ -1,17 +1,36 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Dict, List, Tuple
 import calendar
 from datetime import date
 
 import streamlit as st
-from lib.schedule import optimize_schedule
+from lib.schedule import (
+    BACKEND_AUTO,
+    BACKEND_CP_SAT,
+    BACKEND_MIN_COST_FLOW,
+    BACKENDS,
+    DEFAULT_TIME_LIMIT,
+    SolverConfig,
+    slot_day,
+    slot_key,
+    slot_shift,
+    solve_rolling,
+    solve_schedule,
+)
 import pandas as pd
 import altair as alt
 import io
 
 
 DEFAULT_PEOPLE: List[str] = []
+MAX_MONTHS = 3
+
+BACKEND_LABELS = {
+    BACKEND_AUTO: "Automatycznie",
+    BACKEND_MIN_COST_FLOW: "Przepływ o minimalnym koszcie (szybki, dokładny)",
+    BACKEND_CP_SAT: "CP-SAT",
+}
 
 
 def _generate_days_for_month(year: int, month: int) -> List[str]:
@@ -19,22 +38,73 @@ def _generate_days_for_month(year: int, month: int) -> List[str]:
     return [f"{year:04d}-{month:02d}-{d:02d}" for d in range(1, num_days + 1)]
 
 
+def _months_in_range(year: int, month: int, months: int) -> List[Tuple[int, int]]:
+    index = year * 12 + month - 1
+    return [divmod(index + k, 12) for k in range(months)]
+
+
+def _generate_days_for_range(year: int, month: int, months: int) -> List[str]:
+    days: List[str] = []
+    for y, m0 in _months_in_range(year, month, months):
+        days.extend(_generate_days_for_month(y, m0 + 1))
+    return days
+
+
+def _range_key(year: int, month: int, months: int) -> str:
+    return f"{year:04d}-{month:02d}" + (f"+{months}" if months > 1 else "")
+
+
+def _parse_shifts(text: str) -> List[Tuple[str, int]]:
+    """``"rano:2, noc"`` -> ``[("rano", 2), ("noc", 1)]``; empty means one duty per day."""
+    shifts: List[Tuple[str, int]] = []
+    for item in text.split(","):
+        name, _, count = item.strip().partition(":")
+        name = name.strip()
+        if not name:
+            continue
+        if "/" in name:
+            raise ValueError(f"Nazwa zmiany nie może zawierać '/': '{name}'")
+        try:
+            headcount = int(count) if count.strip() else 1
+        except ValueError:
+            raise ValueError(f"Nieprawidłowa obsada zmiany '{name}': '{count.strip()}'") from None
+        if headcount < 1:
+            raise ValueError(f"Obsada zmiany '{name}' musi być >= 1")
+        shifts.append((name, headcount))
+    return shifts
+
+
+def _expand_to_slots(
+    preferences: Dict[str, Dict[str, int]], shifts: List[Tuple[str, int]]
+) -> Tuple[Dict[str, Dict[str, int]], Dict[str, int]]:
+    """Per-day preferences applied to every shift of the day, plus the headcount per slot."""
+    if not shifts:
+        return preferences, {}
+    slot_preferences = {
+        person: {slot_key(day, name): score for day, score in days.items() for name, _ in shifts}
+        for person, days in preferences.items()
+    }
+    days = {day for person_days in preferences.values() for day in person_days}
+    headcount = {slot_key(day, name): count for day in days for name, count in shifts}
+    return slot_preferences, headcount
+
+
 def _ensure_people_initialized() -> None:
     if "scheduler_people" not in st.session_state:
         st.session_state["scheduler_people"] = []
 
 
 def _ensure_state_for_month(
-    year: int, month: int, default_value: int = 1, force_rebuild: bool = False
+    year: int, month: int, default_value: int = 1, force_rebuild: bool = False, months: int = 1
 ) -> None:
     people: List[str] = st.session_state.get("scheduler_people", DEFAULT_PEOPLE)
-    month_key = f"{year:04d}-{month:02d}"
+    month_key = _range_key(year, month, months)
     if (
         force_rebuild
         or "scheduler_preferences" not in st.session_state
         or st.session_state.get("scheduler_month_key") != month_key
     ):
-        days_list = _generate_days_for_month(year, month)
+        days_list = _generate_days_for_range(year, month, months)
         st.session_state["scheduler_preferences"] = {
             person: {day: int(default_value) for day in days_list}
             for person in people
@@ -42,7 +112,7 @@ def _ensure_state_for_month(
         st.session_state["scheduler_month_key"] = month_key
     else:
         # If people list changed, sync preferences without losing current values
-        days_list = _generate_days_for_month(year, month)
+        days_list = _generate_days_for_range(year, month, months)
         current = st.session_state.get("scheduler_preferences", {})
         # Remove missing people
         for person in list(current.keys()):
@@ -58,7 +128,7 @@ def _ensure_state_for_month(
             for day in days_list:
                 if day not in person_days:
                     person_days[day] = int(default_value)
-            # Optionally drop extra days not in current month
+            # Optionally drop extra days not in the current range
             for day in list(person_days.keys()):
                 if day not in days_list:
                     del person_days[day]
@@ -86,6 +156,54 @@ def _weekday_for_str(day_str: str) -> str:
         return ""
 
 
+def render_solver_settings() -> SolverConfig:
+    with st.expander("Ustawienia solvera"):
+        backend = st.selectbox("Solver", BACKENDS, format_func=BACKEND_LABELS.get, key="sched_backend")
+        col_workers, col_time, col_gap, col_seed = st.columns(4)
+        with col_workers:
+            workers = st.number_input(
+                "Wątki (0 = wszystkie rdzenie)", min_value=0, max_value=256, value=0, step=1, key="sched_workers"
+            )
+        with col_time:
+            time_limit = st.number_input(
+                "Limit czasu [s]", min_value=0.1, max_value=600.0, value=DEFAULT_TIME_LIMIT, step=1.0, key="sched_time_limit"
+            )
+        with col_gap:
+            gap_percent = st.number_input(
+                "Dopuszczalna luka [%]", min_value=0.0, max_value=50.0, value=0.0, step=0.5, key="sched_gap"
+            )
+        with col_seed:
+            seed = st.number_input("Ziarno", min_value=0, value=0, step=1, key="sched_seed")
+        deterministic = st.checkbox(
+            "Deterministycznie (ten sam wynik przy tym samym ziarnie)", value=False, key="sched_deterministic"
+        )
+    return SolverConfig(
+        workers=int(workers) or None,
+        time_limit=float(time_limit),
+        relative_gap=float(gap_percent) / 100.0,
+        seed=int(seed),
+        deterministic=bool(deterministic),
+        backend=str(backend),
+    )
+
+
+def render_horizon_settings(num_days: int) -> Tuple[int, int]:
+    """Rolling-horizon window and overlap in days (window 0 solves everything at once)."""
+    with st.expander("Długi horyzont"):
+        col_window, col_overlap = st.columns(2)
+        with col_window:
+            window = st.number_input(
+                "Okno [dni] (0 = całość naraz)", min_value=0, max_value=366, value=0, step=7, key="sched_window"
+            )
+        with col_overlap:
+            overlap = st.number_input(
+                "Zakładka [dni]", min_value=0, max_value=365, value=7, step=1, key="sched_overlap"
+            )
+        if window and window < num_days:
+            st.caption("Okna są rozwiązywane po kolei, wcześniejsze dni pozostają ustalone.")
+    return int(window), int(overlap)
+
+
 def render_people_editor() -> bool:
     """Renders a minimal people editor: input + Add button, list with delete buttons.
 
@@ -131,14 +249,25 @@ def render_scheduler_tab() -> None:
     st.header("Scheduler")
 
     today = date.today()
-    col_year, col_month = st.columns([2, 2])
+    col_year, col_month, col_months = st.columns([2, 2, 2])
     with col_year:
         selected_year = st.number_input("Rok", value=int(today.year), min_value=2000, max_value=2100, step=1)
     with col_month:
         selected_month = st.selectbox("Miesiąc", options=list(range(1, 13)), index=int(today.month) - 1, format_func=lambda m: f"{m:02d}")
-
-    # Build state for current month (syncs people/preferences)
-    _ensure_state_for_month(int(selected_year), int(selected_month), force_rebuild=False)
+    with col_months:
+        selected_months = st.selectbox("Liczba miesięcy", options=list(range(1, MAX_MONTHS + 1)), index=0)
+    shifts_text = st.text_input(
+        "Zmiany (np. rano:2, noc; puste = jeden dyżur dziennie)",
+        value="",
+        key="sched_shifts",
+        help="Nazwa zmiany i po dwukropku liczba osób na zmianie (domyślnie 1)",
+    )
+    months_list = [(y, m0 + 1) for y, m0 in _months_in_range(int(selected_year), int(selected_month), int(selected_months))]
+
+    # Build state for the selected months (syncs people/preferences)
+    _ensure_state_for_month(
+        int(selected_year), int(selected_month), force_rebuild=False, months=int(selected_months)
+    )
     state_prefs: Dict[str, Dict[str, int]] = st.session_state["scheduler_preferences"]
 
     st.subheader("Preferencje")
@@ -146,14 +275,7 @@ def render_scheduler_tab() -> None:
     if not state_prefs:
         st.info("Brak preferencji do wyświetlenia")
     elif state_prefs:
-        # Calendar view of sliders — separate calendar per person
-        year = int(selected_year)
-        month = int(selected_month)
-        num_days = calendar.monthrange(year, month)[1]
-        first_weekday = calendar.monthrange(year, month)[0]  # Mon=0..Sun=6
-        total_cells = first_weekday + num_days
-        total_rows = (total_cells + 6) // 7
-
+        # Calendar view of sliders — separate calendar per person and month
         for idx, (person, days) in enumerate(state_prefs.items()):
             col_name, col_del = st.columns([6, 1])
             with col_name:
@@ -164,36 +286,44 @@ def render_scheduler_tab() -> None:
                     st.session_state["scheduler_people"] = [p for p in people if p != person]
                     st.rerun()
 
-            # Header row with weekday names
-            cols = st.columns(7)
-            for i, col in enumerate(cols):
-                with col:
-                    col.markdown(f"**{['Pn','Wt','Śr','Cz','Pt','So','Nd'][i]}**")
+            for year, month in months_list:
+                num_days = calendar.monthrange(year, month)[1]
+                first_weekday = calendar.monthrange(year, month)[0]  # Mon=0..Sun=6
+                total_cells = first_weekday + num_days
+                total_rows = (total_cells + 6) // 7
+                if len(months_list) > 1:
+                    st.markdown(f"**{year:04d}-{month:02d}**")
 
-            # Rows of calendar
-            for row in range(total_rows):
+                # Header row with weekday names
                 cols = st.columns(7)
-                for i in range(7):
-                    day_index = row * 7 + i
-                    day_num = day_index - first_weekday + 1
-                    with cols[i]:
-                        if 1 <= day_num <= num_days:
-                            d_str = f"{year:04d}-{month:02d}-{day_num:02d}"
-                            st.markdown(f"**{day_num:02d}**")
-                            key = f"sched_{person}_{d_str}"
-                            current_val = int(days.get(d_str, 0))
-                            new_val: int = st.slider(
-                                label=f"{person} {d_str}",
-                                min_value=0,
-                                max_value=10,
-                                value=current_val,
-                                step=1,
-                                key=key,
-                                label_visibility="collapsed",
-                            )
-                            days[d_str] = int(new_val)
-                        else:
-                            st.empty()
+                for i, col in enumerate(cols):
+                    with col:
+                        col.markdown(f"**{['Pn','Wt','Śr','Cz','Pt','So','Nd'][i]}**")
+
+                # Rows of calendar
+                for row in range(total_rows):
+                    cols = st.columns(7)
+                    for i in range(7):
+                        day_index = row * 7 + i
+                        day_num = day_index - first_weekday + 1
+                        with cols[i]:
+                            if 1 <= day_num <= num_days:
+                                d_str = f"{year:04d}-{month:02d}-{day_num:02d}"
+                                st.markdown(f"**{day_num:02d}**")
+                                key = f"sched_{person}_{d_str}"
+                                current_val = int(days.get(d_str, 0))
+                                new_val: int = st.slider(
+                                    label=f"{person} {d_str}",
+                                    min_value=0,
+                                    max_value=10,
+                                    value=current_val,
+                                    step=1,
+                                    key=key,
+                                    label_visibility="collapsed",
+                                )
+                                days[d_str] = int(new_val)
+                            else:
+                                st.empty()
 
             if idx < len(state_prefs) - 1:
                 st.divider()
@@ -202,19 +332,81 @@ def render_scheduler_tab() -> None:
     st.divider()
     # People editor (input + add button) shown after calendars
     render_people_editor()
+    solver_config = render_solver_settings()
+    num_days = len(_generate_days_for_range(int(selected_year), int(selected_month), int(selected_months)))
+    window, overlap = render_horizon_settings(num_days)
+    month_key = st.session_state.get("scheduler_month_key")
+    previous = st.session_state.get("scheduler_last_assignments")
+    if previous is not None and previous[0] != month_key:
+        previous = None
+    stability = 0
+    if previous is not None:
+        stability = st.slider(
+            "Stabilność względem poprzedniego harmonogramu",
+            min_value=0,
+            max_value=10,
+            value=0,
+            step=1,
+            key="sched_stability",
+            help="Ile punktów preferencji wart jest każdy dyżur z tą samą osobą co w poprzednim wyniku",
+        )
     if st.button("Optymalizuj harmonogram", type="primary"):
         try:
+            shifts = _parse_shifts(shifts_text)
+            slot_prefs, headcount = _expand_to_slots(state_prefs, shifts)
+            previous_roster = previous[1] if previous is not None else None
             with st.spinner("Optymalizuję z użyciem OR-Tools…"):
-                assignments, total = optimize_schedule(state_prefs)
-            st.success(f"Gotowe. Łączny wynik preferencji: {total}")
-            # Show results as a simple table day -> person
-            rows = [{"dzień": d, "osoba": p} for d, p in sorted(assignments.items())]
+                if window and window < num_days:
+                    result = solve_rolling(
+                        slot_prefs,
+                        window,
+                        min(overlap, window - 1),
+                        solver_config,
+                        previous=previous_roster,
+                        stability_weight=stability,
+                        headcount=headcount,
+                    )
+                else:
+                    result = solve_schedule(
+                        slot_prefs,
+                        solver_config,
+                        previous=previous_roster,
+                        stability_weight=stability,
+                        headcount=headcount,
+                    )
+            # Next run starts from this schedule (solution hint + stability term)
+            st.session_state["scheduler_last_assignments"] = (month_key, result.roster)
+            roster, total = result.roster, result.total_score
+            if result.windows > 1:
+                quality = f"{result.windows} okien"
+            else:
+                quality = "optymalne" if result.optimal else f"luka do optimum {result.gap:.1%}"
+            st.success(
+                f"Gotowe ({quality}, {result.wall_time:.2f} s). Łączny wynik preferencji: {total}"
+            )
+            details = [f"Status: {result.status}", f"cel: {result.objective:.0f}"]
+            if result.windows == 1:
+                details.append(f"najlepsze ograniczenie: {result.best_bound:.0f}")
+            if previous is not None:
+                details.append(f"zmienionych dyżurów: {result.changed_slots}")
+            st.caption(", ".join(details))
+            # Show results as a simple table slot -> people
+            rows = []
+            for slot, people in sorted(roster.items()):
+                row = {"dzień": slot_day(slot)}
+                if shifts:
+                    row["zmiana"] = slot_shift(slot)
+                    row["osoby"] = ", ".join(people)
+                else:
+                    row["osoba"] = ", ".join(people)
+                rows.append(row)
             st.table(rows)
 
             # Summary pie chart: who works how many days
             counts: Dict[str, int] = {}
-            for person in assignments.values():
-                counts[person] = counts.get(person, 0) + 1
+            for people in roster.values():
+                for person in people:
+                    counts[person] = counts.get(person, 0) + 1
             if counts:
                 df = pd.DataFrame(
                     [{"osoba": person, "dni": days} for person, days in sorted(counts.items())]
@@ -237,65 +429,77 @@ def render_scheduler_tab() -> None:
                     df_sorted = df.sort_values(by=["dni", "osoba"], ascending=[False, True])
                     st.table(df_sorted)
 
-            # Calendar visualization for the selected month
+            # Calendar visualization, one per selected month
             try:
-                year = int(selected_year)
-                month = int(selected_month)
-                num_days = calendar.monthrange(year, month)[1]
-                first_weekday = calendar.monthrange(year, month)[0]  # Mon=0..Sun=6
+                by_day: Dict[str, List[str]] = {}
+                for slot, people in sorted(roster.items()):
+                    shift = slot_shift(slot)
+                    label = ", ".join(people)
+                    by_day.setdefault(slot_day(slot), []).append(f"{shift}: {label}" if shift else label)
+
+                for year, month in months_list:
+                    num_days = calendar.monthrange(year, month)[1]
+                    first_weekday = calendar.monthrange(year, month)[0]  # Mon=0..Sun=6
+
+                    cal_rows = []
+                    for day_num in range(1, num_days + 1):
+                        d_str = f"{year:04d}-{month:02d}-{day_num:02d}"
+                        assigned = "; ".join(by_day.get(d_str, []))
+                        dow = (first_weekday + (day_num - 1)) % 7
+                        week_idx = (first_weekday + (day_num - 1)) // 7
+                        cal_rows.append(
+                            {
+                                "day": d_str,
+                                "day_num": day_num,
+                                "weekday": dow,  # 0..6, Pon..Nd
+                                "week": week_idx,
+                                "osoba": assigned or "—",
+                            }
+                        )
 
-                cal_rows = []
-                for day_num in range(1, num_days + 1):
-                    d_str = f"{year:04d}-{month:02d}-{day_num:02d}"
-                    assigned = assignments.get(d_str)
-                    dow = (first_weekday + (day_num - 1)) % 7
-                    week_idx = (first_weekday + (day_num - 1)) // 7
-                    cal_rows.append(
-                        {
-                            "day": d_str,
-                            "day_num": day_num,
-                            "weekday": dow,  # 0..6, Pon..Nd
-                            "week": week_idx,
-                            "osoba": assigned or "—",
-                        }
+                    df_cal = pd.DataFrame(cal_rows)
+                    # Base calendar grid
+                    base = (
+                        alt.Chart(df_cal)
+                        .mark_rect(stroke="lightgray")
+                        .encode(
+                            x=alt.X("weekday:O", title=None, axis=alt.Axis(labels=True, values=[0,1,2,3,4,5,6], labelExpr='{"0":"Pn","1":"Wt","2":"Śr","3":"Cz","4":"Pt","5":"So","6":"Nd"}[datum]')),
+                            y=alt.Y("week:O", title=None, sort="ascending"),
+                            color=alt.Color("osoba:N", title="Osoba"),
+                            tooltip=["day", "osoba"],
+                        )
                     )
 
-                df_cal = pd.DataFrame(cal_rows)
-                # Base calendar grid
-                base = (
-                    alt.Chart(df_cal)
-                    .mark_rect(stroke="lightgray")
-                    .encode(
-                        x=alt.X("weekday:O", title=None, axis=alt.Axis(labels=True, values=[0,1,2,3,4,5,6], labelExpr='{"0":"Pn","1":"Wt","2":"Śr","3":"Cz","4":"Pt","5":"So","6":"Nd"}[datum]')),
-                        y=alt.Y("week:O", title=None, sort="ascending"),
-                        color=alt.Color("osoba:N", title="Osoba"),
-                        tooltip=["day", "osoba"],
+                    # Overlay person name in the cell
+                    text = (
+                        alt.Chart(df_cal)
+                        .mark_text(baseline="middle", fontSize=11, color="black")
+                        .encode(
+                            x="weekday:O",
+                            y="week:O",
+                            text=alt.Text("osoba:N"),
+                        )
                     )
-                )
 
-                # Overlay person name in the cell
-                text = (
-                    alt.Chart(df_cal)
-                    .mark_text(baseline="middle", fontSize=11, color="black")
-                    .encode(
-                        x="weekday:O",
-                        y="week:O",
-                        text=alt.Text("osoba:N"),
-                    )
-                )
+                    if len(months_list) > 1:
+                        st.markdown(f"**{year:04d}-{month:02d}**")
+                    st.altair_chart(base + text, use_container_width=True)
 
-                st.altair_chart(base + text, use_container_width=True)
-                
                 # Export to Excel
                 try:
                     sched_rows = []
-                    for d, p in sorted(assignments.items()):
+                    for slot, people in sorted(roster.items()):
+                        d = slot_day(slot)
                         try:
                             day_dt = date.fromisoformat(d)
                             weekday_name = _weekday_pl_name(day_dt)
                         except Exception:
                             weekday_name = ""
-                        sched_rows.append({"data": d, "dzien_tyg": weekday_name, "osoba": p})
+                        for p in people:
+                            sched_row = {"data": d, "dzien_tyg": weekday_name, "osoba": p}
+                            if shifts:
+                                sched_row["zmiana"] = slot_shift(slot)
+                            sched_rows.append(sched_row)
                     sched_df = pd.DataFrame(sched_rows)
 
                     output = io.BytesIO()
@@ -311,7 +515,7 @@ def render_scheduler_tab() -> None:
                     st.download_button(
                         label="Pobierz harmonogram (Excel)",
                         data=output,
-                        file_name=f"harmonogram_{year:04d}_{month:02d}.xlsx",
+                        file_name=f"harmonogram_{month_key.replace('-', '_')}.xlsx",
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     )
                 except Exception as export_exc:
@@ -322,7 +526,7 @@ def render_scheduler_tab() -> None:
                         st.download_button(
                             label="Pobierz harmonogram (CSV)",
                             data=csv_bytes,
-                            file_name=f"harmonogram_{year:04d}_{month:02d}.csv",
+                            file_name=f"harmonogram_{month_key.replace('-', '_')}.csv",
                             mime="text/csv",
                         )
                     except Exception:
@@ -1,10 +1,29 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Callable, List, Optional
 import json
+import time
 
 import streamlit as st
 
+from lib.checker import CheckerTarget, parse_modules_arg
+from lib.health import ModuleHealth
+from lib.presets import (
+    PRESET_FAST,
+    PRESET_FULL,
+    PRESET_HIGH_SIGNAL,
+    PRESETS,
+    preset_module_specs,
+    specs_to_arg,
+)
+from lib.results import CheckResult, Flag, ResultBatch, Status, records_from_results
+from lib.service import CheckService, JobSnapshot
+
+POLL_INTERVAL = 0.3
+# Returned by module_selector for an empty selection; pages disable the submit
+# button on it, since an empty ``modules_str`` would mean every module
+NO_MODULES = ""
+
 
 def render_results(title: str, data: List[dict]) -> None:
     st.subheader(title)
@@ -14,76 +33,170 @@ def render_results(title: str, data: List[dict]) -> None:
     st.json(data)
 
 
-def _filter_exists_not_false(data: List[dict]) -> List[dict]:
-    filtered: List[dict] = []
-    for item in data:
-        exists_val = item.get("exists", None)
-        if exists_val is False:
-            continue
-        if isinstance(exists_val, str) and exists_val.strip().lower() == "false":
-            continue
-        filtered.append(item)
-    return filtered
-
-
-def _normalize_bool_like(value: object) -> Optional[bool]:
-    if isinstance(value, bool):
-        return value
-    if isinstance(value, str):
-        v = value.strip().lower()
-        if v in {"true", "yes", "1"}:
-            return True
-        if v in {"false", "no", "0"}:
-            return False
-    return None
+def exists_not_false(record: CheckResult) -> bool:
+    return record.exists is not Flag.FALSE
 
 
-def render_email_cards(data: List[dict]) -> None:
+def render_email_cards(data: Optional[List[dict]]) -> None:
     st.subheader("Wyniki (email)")
     if data is None:
         st.info("Brak wyników")
         return
 
-    filtered = _filter_exists_not_false(data)
-    if not filtered:
+    batch = ResultBatch.from_results("", data)
+    order = batch.order_by_exists(batch.where_exists(Flag.TRUE, Flag.UNKNOWN))
+    if not len(order):
         st.info("Brak wyników spełniających filtr exists != false")
         return
 
-    filtered.sort(key=lambda i: 0 if _normalize_bool_like(i.get("exists")) is True else 1)
-
-    for idx, item in enumerate(filtered):
-        name = item.get("name") or "(bez nazwy)"
-        domain = item.get("domain") or "(brak domeny)"
-        exists_val = item.get("exists", "Unknown")
-        method = item.get("method") or "—"
-        rate_limit = item.get("rateLimit", "—")
-        freq_limit = item.get("frequent_rate_limit", "—")
-        error_msg = item.get("error")
-
-        st.markdown(f"**{name}**\n\n`{domain}`")
-
-        norm_exists = _normalize_bool_like(exists_val)
-        if norm_exists is True:
-            st.success("Istnieje: TAK")
-        elif isinstance(exists_val, str) and exists_val.strip().lower() == "unknown":
-            st.warning("Istnieje: NIEZNANE")
-        else:
-            st.warning("Istnieje: NIEZNANE")
-
-        meta_lines = [
-            f"Metoda: {method}",
-            f"Rate limit: {rate_limit}",
-            f"Częsty rate limit: {freq_limit}",
-        ]
-        st.caption(" | ".join(meta_lines))
-
-        if error_msg:
-            st.error(f"Błąd: {error_msg}")
-
-        with st.expander("Szczegóły"):
-            st.code(json.dumps(item, ensure_ascii=False, indent=2), language="json")
-
-        if idx < len(filtered) - 1:
+    for idx, index in enumerate(order):
+        render_email_card(batch.record(index))
+        if idx < len(order) - 1:
             st.divider()
 
 
+def render_email_card(record: CheckResult) -> None:
+    name = record.name or "(bez nazwy)"
+    domain = record.domain or "(brak domeny)"
+    extra = record.extra or {}
+    method = extra.get("method") or "—"
+    freq_limit = extra.get("frequent_rate_limit", "—")
+    rate_limit = "Unknown" if record.rate_limit is Flag.UNKNOWN else record.rate_limit is Flag.TRUE
+
+    st.markdown(f"**{name}**\n\n`{domain}`")
+
+    if record.exists is Flag.TRUE:
+        st.success("Istnieje: TAK")
+    else:
+        st.warning("Istnieje: NIEZNANE")
+
+    meta_lines = [
+        f"Metoda: {method}",
+        f"Rate limit: {rate_limit}",
+        f"Częsty rate limit: {freq_limit}",
+    ]
+    st.caption(" | ".join(meta_lines))
+
+    if record.error:
+        st.error(f"Błąd: {record.error}")
+
+    with st.expander("Szczegóły"):
+        st.code(json.dumps(record.to_dict(), ensure_ascii=False, indent=2), language="json")
+
+
+def _render_json_item(record: CheckResult) -> None:
+    st.json(record.to_dict(), expanded=False)
+
+
+class LiveResults:
+    """Renders module results as they arrive, with a done / total / errors counter.
+
+    Pass :meth:`add` as the ``on_result`` callback of a lookup. Call :meth:`clear`
+    afterwards to drop the live view before rendering the final, sorted results.
+    """
+
+    def __init__(
+        self,
+        total: int,
+        render_item: Callable[[CheckResult], None] = _render_json_item,
+        item_filter: Optional[Callable[[CheckResult], bool]] = None,
+    ) -> None:
+        self.total = total
+        self.done = 0
+        self.errors = 0
+        self.render_item = render_item
+        self.item_filter = item_filter
+        self._progress = st.empty()
+        self._placeholder = st.empty()
+        self._container = self._placeholder.container()
+        self._update_progress()
+
+    def add(self, module_results: List[dict]) -> None:
+        self.done += 1
+        records = records_from_results("", module_results)
+        if any(r.status in (Status.ERROR, Status.TIMEOUT) for r in records):
+            self.errors += 1
+        for record in records:
+            if self.item_filter is not None and not self.item_filter(record):
+                continue
+            with self._container:
+                self.render_item(record)
+        self._update_progress()
+
+    def _update_progress(self) -> None:
+        fraction = min(1.0, self.done / self.total) if self.total else 1.0
+        self._progress.progress(
+            fraction,
+            text=f"Ukończono: {self.done} / {self.total} | błędy: {self.errors}",
+        )
+
+    def clear(self) -> None:
+        self._placeholder.empty()
+
+
+@st.cache_resource
+def get_check_service() -> CheckService:
+    """One background check service (trio loop + warm client) shared by all sessions.
+
+    Module health is only recorded here (mode ``all``); it feeds the presets.
+    """
+    return CheckService(health=ModuleHealth(mode="all")).start()
+
+
+PRESET_LABELS = {
+    PRESET_FAST: "Szybkie",
+    PRESET_HIGH_SIGNAL: "Najskuteczniejsze",
+    PRESET_FULL: "Wszystkie",
+}
+
+
+def module_selector(target: CheckerTarget, key: str) -> Optional[str]:
+    """Preset + multiselect of modules; returns the ``modules_str`` for the lookup.
+
+    ``None`` means every module, which shares the service's cached full list;
+    an empty selection shows a warning and returns :data:`NO_MODULES`.
+    """
+    health = get_check_service().engine_options.get("health")
+    all_specs = list(parse_modules_arg(target, None))
+    labels = {spec[0]: spec for spec in all_specs}
+
+    preset = st.radio(
+        "Zestaw modułów",
+        PRESETS,
+        format_func=PRESET_LABELS.get,
+        horizontal=True,
+        key=f"{key}_preset",
+    )
+    preset_specs = preset_module_specs(target, preset, health)
+    selected = st.multiselect(
+        f"Moduły ({len(all_specs)} dostępnych)",
+        list(labels),
+        default=[spec[0] for spec in preset_specs],
+        # A new key per preset resets the selection when the preset changes
+        key=f"{key}_modules_{preset}",
+    )
+    if not selected:
+        st.warning("Wybierz co najmniej jeden moduł")
+        return NO_MODULES
+    if len(selected) == len(all_specs):
+        return None
+    return specs_to_arg([labels[label] for label in selected])
+
+
+def follow_job(service: CheckService, job_id: str, live: LiveResults) -> Optional[JobSnapshot]:
+    """Feed the job's module results into ``live`` until the job finishes.
+
+    The job runs in the service thread, so a rerun only stops this polling loop;
+    the next run picks the job up again by its ID.
+    """
+    seen = 0
+    while True:
+        snapshot = service.job(job_id)
+        if snapshot is None:
+            return None
+        for module_out in snapshot.module_results[seen:]:
+            live.add(module_out)
+        seen = snapshot.done
+        if snapshot.finished:
+            return snapshot
+        time.sleep(POLL_INTERVAL)
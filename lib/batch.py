@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Set, TextIO, TypeVar
+
+from lib.checker import CheckerTarget, check_bulk_sync, prepare_modules
+from lib.client import CLIENT_PROFILES, get_profile
+from lib.instrument import Instrumentation, JsonFileSink, LoggingSink, PrometheusSink
+from lib.jobs import DEFAULT_MAX_ATTEMPTS, run_queue_sync
+from lib.normalize import Deduplicator
+from lib.ratelimit import CheckScheduler, RetryPolicy
+from lib.shard import check_sharded
+
+
+T = TypeVar("T")
+
+# (identifier, original input row, results) -> output JSONL record
+RecordFormatter = Callable[[Any, Optional[str], List[dict]], dict]
+
+
+def add_batch_arguments(parser: argparse.ArgumentParser, default_concurrency: int) -> None:
+    parser.add_argument(
+        "--input",
+        "-i",
+        default="-",
+        help="Plik wejściowy (jeden identyfikator na linię), '-' = stdin",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        default="-",
+        help="Plik wyjściowy JSONL, '-' = stdout",
+    )
+    parser.add_argument(
+        "--modules",
+        default=None,
+        help="Lista modułów oddzielona przecinkami (domyślnie: wszystkie)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=default_concurrency,
+        help="Maksymalna liczba równoległych wywołań modułów",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Limit zapytań na sekundę dla pojedynczej domeny (domyślnie: bez limitu)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Limit czasu pojedynczego modułu w sekundach",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=None,
+        help=(
+            "Ile razy ponowić moduł z błędem lub rate limitem (backoff z losowym rozrzutem); "
+            "domyślnie 0, a z --queue 4"
+        ),
+    )
+    parser.add_argument(
+        "--client-profile",
+        choices=sorted(CLIENT_PROFILES),
+        default="default",
+        help="Profil połączeń HTTP (default, reuse: długie keep-alive + cache DNS, http2)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Liczba procesów roboczych (>1 włącza tryb z podziałem na shardy)",
+    )
+    parser.add_argument(
+        "--trace-json",
+        default=None,
+        help="Zapisuj spany i liczniki instrumentacji do pliku JSONL",
+    )
+    parser.add_argument(
+        "--trace-log",
+        action="store_true",
+        help="Wypisuj spany i liczniki instrumentacji przez logging",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Udostępnij metryki w formacie Prometheus pod http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--queue",
+        default=None,
+        help=(
+            "Plik SQLite kolejki zadań: wejście trafia do kolejki, a proces ją opróżnia "
+            "z ponowieniami; kilka procesów może dzielić jedną kolejkę"
+        ),
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Pomiń identyfikatory obecne już w pliku wyjściowym i dopisuj do niego",
+    )
+
+
+def parse_batch_arguments(
+    parser: argparse.ArgumentParser, argv: Optional[Sequence[str]] = None
+) -> argparse.Namespace:
+    """Parse and cross-check the options added by :func:`add_batch_arguments`."""
+    args = parser.parse_args(argv)
+    if args.resume and args.output == "-":
+        parser.error("--resume wymaga pliku wyjściowego (--output)")
+    if args.queue and args.processes > 1:
+        parser.error("--queue nie łączy się z --processes; uruchom kilka procesów z tą samą kolejką")
+    if args.processes > 1 and (args.trace_json or args.trace_log or args.metrics_port is not None):
+        # Worker processes would write one trace file and bind one port concurrently
+        parser.error("--trace-json, --trace-log i --metrics-port nie łączą się z --processes > 1")
+    return args
+
+
+def scheduler_from_args(args: argparse.Namespace) -> Optional[CheckScheduler]:
+    if args.rate is None:
+        return None
+    return CheckScheduler(
+        rate_per_domain=args.rate,
+        max_concurrency=args.concurrency,
+        initial_concurrency=args.concurrency,
+    )
+
+
+def retry_from_args(args: argparse.Namespace) -> Optional[RetryPolicy]:
+    if not args.retries or args.retries <= 0:
+        return None
+    return RetryPolicy(max_retries=args.retries)
+
+
+def instrumentation_from_args(args: argparse.Namespace) -> Optional[Instrumentation]:
+    sinks: list = []
+    if args.trace_json:
+        sinks.append(JsonFileSink(args.trace_json))
+    if args.trace_log:
+        logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+        sinks.append(LoggingSink())
+    if args.metrics_port is not None:
+        prometheus = PrometheusSink()
+        prometheus.serve(args.metrics_port)
+        sinks.append(prometheus)
+    return Instrumentation(*sinks) if sinks else None
+
+
+def iter_input_lines(path: str) -> Iterator[str]:
+    """Yield non-empty, non-comment lines from ``path`` (or stdin for ``-``)."""
+    handle: TextIO = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for line in handle:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def report_invalid_row(row: str, error: ValueError) -> None:
+    """``on_invalid`` callback for :class:`lib.normalize.Deduplicator` in the CLIs."""
+    print(f"Pomijam: {error}", file=sys.stderr)
+
+
+def load_completed(path: str, key_of: Callable[[dict], Optional[str]]) -> Set[str]:
+    """Collect keys of records already written to a JSONL output file.
+
+    A truncated last line (e.g. after the process was killed) is ignored, so the
+    identifier it belonged to is simply checked again.
+    """
+    completed: Set[str] = set()
+    if path == "-" or not os.path.exists(path):
+        return completed
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            key = key_of(record) if isinstance(record, dict) else None
+            if key is not None:
+                completed.add(key)
+    return completed
+
+
+def skip_completed(
+    items: Iterable[T],
+    completed: Set[str],
+    key_of: Callable[[T], Optional[str]],
+) -> Iterator[T]:
+    for item in items:
+        if key_of(item) not in completed:
+            yield item
+
+
+class JsonlWriter:
+    """Writes one JSON document per line and flushes it right away."""
+
+    def __init__(self, path: str, append: bool = False) -> None:
+        self.path = path
+        if path == "-":
+            self._handle: TextIO = sys.stdout
+        else:
+            if append:
+                _terminate_last_line(path)
+            self._handle = open(path, "a" if append else "w", encoding="utf-8")
+        self.written = 0
+
+    def write(self, record: dict) -> None:
+        self._handle.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._handle.flush()
+        self.written += 1
+
+    def close(self) -> None:
+        if self._handle is not sys.stdout:
+            self._handle.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def _terminate_last_line(path: str) -> None:
+    # A run killed mid-write leaves a partial line; start appending on a fresh one
+    try:
+        with open(path, "rb+") as fh:
+            fh.seek(0, os.SEEK_END)
+            if fh.tell() == 0:
+                return
+            fh.seek(-1, os.SEEK_END)
+            if fh.read(1) != b"\n":
+                fh.write(b"\n")
+    except OSError:
+        pass
+
+
+def run_batch_cli(
+    target: CheckerTarget,
+    args: argparse.Namespace,
+    normalize: Callable[[str], Any],
+    to_record: RecordFormatter,
+    record_key: Callable[[dict], Optional[str]],
+) -> int:
+    """Body of the batch CLIs: read, deduplicate, check and write JSONL records.
+
+    ``normalize`` turns an input line into an identifier of ``target``;
+    ``record_key`` gives the cache key of a written record for ``--resume``.
+    """
+
+    def _line_key(line: str) -> Optional[str]:
+        try:
+            return target.cache_key(normalize(line))
+        except ValueError:
+            return None
+
+    rows: Iterable[str] = iter_input_lines(args.input)
+    if args.resume:
+        rows = skip_completed(rows, load_completed(args.output, record_key), _line_key)
+    dedup: Deduplicator[Any] = Deduplicator(normalize, on_invalid=report_invalid_row)
+    identifiers = dedup.feed(rows)
+
+    def _write(identifier: Any, out: List[dict]) -> None:
+        for row, _, results in dedup.fan_out(identifier, out):
+            writer.write(to_record(identifier, row, results))
+
+    instrumentation = instrumentation_from_args(args)
+    with JsonlWriter(args.output, append=args.resume) as writer:
+        if args.queue:
+            run_queue_sync(
+                args.queue,
+                target,
+                identifiers,
+                prepare_modules(target, args.modules, lazy=True),
+                lambda job_target, identifier, out: _write(identifier, out),
+                concurrency=args.concurrency,
+                scheduler=scheduler_from_args(args),
+                module_timeout=args.timeout,
+                profile=get_profile(args.client_profile),
+                instrumentation=instrumentation,
+                max_attempts=DEFAULT_MAX_ATTEMPTS if args.retries is None else max(args.retries, 0) + 1,
+            )
+        elif args.processes > 1:
+            for identifier, out in check_sharded(
+                target,
+                identifiers,
+                args.modules,
+                processes=args.processes,
+                concurrency=args.concurrency,
+                rate=args.rate,
+                module_timeout=args.timeout,
+                retries=args.retries or 0,
+                profile_name=args.client_profile,
+            ):
+                _write(identifier, out)
+        else:
+            check_bulk_sync(
+                target,
+                identifiers,
+                args.modules,
+                _write,
+                concurrency=args.concurrency,
+                scheduler=scheduler_from_args(args),
+                module_timeout=args.timeout,
+                retry=retry_from_args(args),
+                profile=get_profile(args.client_profile),
+                lazy=True,
+                keep_results=False,
+                instrumentation=instrumentation,
+            )
+        for row, identifier, results in dedup.drain():
+            writer.write(to_record(identifier, row, results))
+        print(f"Zapisano wyników: {writer.written} ({dedup.summary()})", file=sys.stderr)
+    if instrumentation is not None:
+        instrumentation.close()
+    return 0
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+DEFAULT_TTL = 7 * 24 * 3600.0
+DEFAULT_ERROR_TTL = 10 * 60.0
+DEFAULT_RATE_LIMIT_TTL = 5 * 60.0
+DEFAULT_MAX_ENTRIES = 100_000
+
+CacheKey = Tuple[str, str]
+
+
+def normalize_identifier(identifier: str) -> str:
+    return "".join(identifier.split()).lower()
+
+
+class MemoryCacheBackend:
+    """In-process LRU store of ``key -> (expires_at, results)``."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[float, List[dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: CacheKey) -> Optional[Tuple[float, List[dict]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: CacheKey, expires_at: float, results: List[dict]) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: CacheKey) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCacheBackend:
+    """Persistent LRU store backed by a single SQLite table."""
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS result_cache (
+                identifier TEXT NOT NULL,
+                module TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (identifier, module)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS result_cache_accessed ON result_cache (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: CacheKey) -> Optional[Tuple[float, List[dict]]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, payload FROM result_cache WHERE identifier = ? AND module = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE result_cache SET accessed_at = ? WHERE identifier = ? AND module = ?",
+                (time.time(), *key),
+            )
+            self._conn.commit()
+        return float(row[0]), json.loads(row[1])
+
+    def set(self, key: CacheKey, expires_at: float, results: List[dict]) -> None:
+        payload = json.dumps(results, ensure_ascii=False, default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO result_cache VALUES (?, ?, ?, ?, ?)",
+                (key[0], key[1], expires_at, time.time(), payload),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM result_cache").fetchone()[0]
+            if count > self.max_entries:
+                # Evict in batches of ~10% so inserts don't pay for eviction every time
+                excess = count - self.max_entries + max(1, self.max_entries // 10)
+                self._conn.execute(
+                    """
+                    DELETE FROM result_cache WHERE rowid IN (
+                        SELECT rowid FROM result_cache ORDER BY accessed_at LIMIT ?
+                    )
+                    """,
+                    (excess,),
+                )
+            self._conn.commit()
+
+    def delete(self, key: CacheKey) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM result_cache WHERE identifier = ? AND module = ?", key
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM result_cache")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResultCache:
+    """TTL cache of module results keyed on (normalized identifier, module path).
+
+    Definitive answers live for ``ttl`` (or the per-module value from
+    ``module_ttls``); errors and rate-limited answers expire much sooner so they
+    are retried on a later lookup.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[object] = None,
+        ttl: float = DEFAULT_TTL,
+        error_ttl: float = DEFAULT_ERROR_TTL,
+        rate_limit_ttl: float = DEFAULT_RATE_LIMIT_TTL,
+        module_ttls: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.rate_limit_ttl = rate_limit_ttl
+        self.module_ttls: Dict[str, float] = dict(module_ttls or {})
+
+    def ttl_for(self, module_path: str, results: Sequence[dict]) -> float:
+        if not results or any(item.get("error") for item in results):
+            return self.error_ttl
+        if any(item.get("rateLimit") is True for item in results):
+            return self.rate_limit_ttl
+        if any(not isinstance(item.get("exists"), bool) for item in results):
+            return self.error_ttl
+        return self.module_ttls.get(module_path, self.ttl)
+
+    def get(self, identifier: str, module_path: str) -> Optional[List[dict]]:
+        key = (normalize_identifier(identifier), module_path)
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+        expires_at, results = entry
+        if expires_at <= time.time():
+            self.backend.delete(key)
+            return None
+        return [dict(item) for item in results]
+
+    def put(self, identifier: str, module_path: str, results: Sequence[dict]) -> None:
+        ttl = self.ttl_for(module_path, results)
+        if ttl <= 0:
+            return
+        key = (normalize_identifier(identifier), module_path)
+        self.backend.set(key, time.time() + ttl, [dict(item) for item in results])
+
+    def clear(self) -> None:
+        self.backend.clear()
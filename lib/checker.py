@@ -0,0 +1,615 @@
+from __future__ import annotations
+
+import importlib
+import math
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import httpx
+import trio
+
+from lib.cache import ResultCache
+from lib.client import ClientProfile, build_transport
+from lib.health import ModuleHealth
+from lib.instrument import Instrumentation, current_module, result_status
+from lib.ratelimit import CheckScheduler, RetryPolicy
+from lib.registry import (
+    LazyLoadedModule,
+    LoadedModule,
+    discover_module_specs,
+    lazy_module_function,
+    load_module_function,
+    resolve_function,
+)
+
+
+DEFAULT_TIMEOUT = 20.0
+DEFAULT_CONCURRENCY = 64
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+
+ModuleCall = Callable[[Callable[..., Any], Any, httpx.AsyncClient, List[dict]], Awaitable[Any]]
+ResultCallback = Callable[[List[dict]], None]
+Job = Tuple["CheckerTarget", Any]
+
+# name -> target, so targets can be sent to worker processes by reference
+_TARGETS: Dict[str, "CheckerTarget"] = {}
+
+
+@dataclass(frozen=True)
+class CheckerTarget:
+    """Describes one checker package and how its module functions are called.
+
+    ``call(function, identifier, client, out)`` adapts the package's signature,
+    ``cache_key(identifier)`` gives the string used by the result cache and
+    ``error_fields`` are extra keys copied into error/timeout results.
+    """
+
+    name: str
+    package: str
+    call: ModuleCall
+    cache_key: Callable[[Any], str]
+    error_fields: Tuple[Tuple[str, object], ...] = ()
+    default_modules: Tuple[Tuple[str, str], ...] = ()
+
+    def __post_init__(self) -> None:
+        _TARGETS[self.name] = self
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # ``call``/``cache_key`` are usually lambdas, which do not pickle
+        return (_target_by_name, (self.name, self.call.__module__))
+
+    def error_result(self, loaded_module: LoadedModule, message: str) -> dict:
+        result: Dict[str, object] = {
+            "name": loaded_module.function_name,
+            "domain": loaded_module.module_path,
+        }
+        result.update(self.error_fields)
+        result.update({"rateLimit": "Unknown", "exists": "Unknown", "error": message})
+        return result
+
+    def timeout_result(self, loaded_module: LoadedModule, timeout: float) -> dict:
+        result = self.error_result(loaded_module, f"Przekroczono limit czasu ({timeout:g} s)")
+        result["status"] = "timeout"
+        return result
+
+
+def _target_by_name(name: str, module: str) -> CheckerTarget:
+    if name not in _TARGETS:
+        importlib.import_module(module)
+    return _TARGETS[name]
+
+
+def _discover_module_specs(target: CheckerTarget) -> List[Tuple[str, str]]:
+    discovered = discover_module_specs(target.package)
+    if discovered:
+        return discovered
+    if target.default_modules:
+        return list(target.default_modules)
+    raise RuntimeError(
+        f"Nie znaleziono żadnych modułów '{target.package}'. "
+        "Upewnij się, że pakiet jest poprawnie zainstalowany."
+    )
+
+
+def parse_modules_arg(target: CheckerTarget, arg_value: Optional[str]) -> Sequence[Tuple[str, str]]:
+    if not arg_value:
+        return _discover_module_specs(target)
+
+    normalized = arg_value.strip().lower().strip("'\"")
+    if normalized in {"all", "*"}:
+        return _discover_module_specs(target)
+
+    result: List[Tuple[str, str]] = []
+    for item in arg_value.split(","):
+        item = item.strip().strip("'\"")
+        if not item:
+            continue
+        if ":" in item:
+            module_path, func_name = item.split(":", 1)
+            module_path = module_path.strip().strip("'\"")
+            func_name = func_name.strip().strip("'\"")
+            if not module_path or not func_name:
+                raise ValueError(f"Nieprawidłowa specyfikacja modułu: '{item}'")
+            result.append((module_path, func_name))
+        else:
+            last_segment = item.split(".")[-1]
+            if not last_segment:
+                raise ValueError(f"Nieprawidłowa specyfikacja modułu: '{item}'")
+            result.append((item, last_segment))
+    return result
+
+
+def load_functions(
+    target: CheckerTarget,
+    module_specs: Sequence[Tuple[str, str]],
+    lazy: bool = False,
+    instrumentation: Optional[Instrumentation] = None,
+) -> List[LoadedModule]:
+    if instrumentation is not None:
+        with instrumentation.span("load_modules", package=target.package, lazy=lazy) as span:
+            loaded = _load_functions(target, module_specs, lazy, instrumentation)
+            span["count"] = len(loaded)
+    else:
+        loaded = _load_functions(target, module_specs, lazy, None)
+
+    if not loaded:
+        raise RuntimeError(
+            f"Nie udało się załadować żadnego modułu {target.package}. "
+            f"Sprawdź instalację pakietu '{target.package}'"
+        )
+
+    return loaded
+
+
+def _load_functions(
+    target: CheckerTarget,
+    module_specs: Sequence[Tuple[str, str]],
+    lazy: bool,
+    instrumentation: Optional[Instrumentation],
+) -> List[LoadedModule]:
+    loaded: List[LoadedModule] = []
+    for rel_module_path, func_name in module_specs:
+        if rel_module_path in {"all", "*"}:
+            continue
+        full_module = f"{target.package}.modules.{rel_module_path}"
+        if lazy:
+            loaded.append(lazy_module_function(full_module, func_name))
+            continue
+        if instrumentation is not None:
+            with instrumentation.span("import", module=full_module):
+                loaded_module = load_module_function(full_module, func_name)
+        else:
+            loaded_module = load_module_function(full_module, func_name)
+        if loaded_module is None:
+            continue
+
+        loaded.append(loaded_module)
+    return loaded
+
+
+def prepare_modules(
+    target: CheckerTarget,
+    modules_str: Optional[str],
+    lazy: bool = False,
+    health: Optional[ModuleHealth] = None,
+    instrumentation: Optional[Instrumentation] = None,
+) -> List[LoadedModule]:
+    """Parse ``modules_str``, load the modules and apply the health-based selection."""
+    module_specs = parse_modules_arg(target, modules_str)
+    loaded = load_functions(target, module_specs, lazy=lazy, instrumentation=instrumentation)
+    if health is not None:
+        loaded = health.select(loaded)
+    return loaded
+
+
+def create_client(
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    timeout: float = DEFAULT_TIMEOUT,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    instrumentation: Optional[Instrumentation] = None,
+    profile: Optional[ClientProfile] = None,
+) -> httpx.AsyncClient:
+    """Pooled client; ``profile`` (see :mod:`lib.client`) overrides the pool sizes."""
+    if profile is None:
+        profile = ClientProfile(
+            name="custom",
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+    if transport is None:
+        transport = build_transport(profile)
+    event_hooks = instrumentation.event_hooks() if instrumentation is not None else None
+    return httpx.AsyncClient(
+        timeout=timeout, limits=profile.limits, transport=transport, event_hooks=event_hooks
+    )
+
+
+class _PendingLookup:
+    __slots__ = ("target", "identifier", "remaining", "out")
+
+    def __init__(self, target: CheckerTarget, identifier: Any, remaining: int) -> None:
+        self.target = target
+        self.identifier = identifier
+        self.remaining = remaining
+        self.out: List[dict] = []
+
+
+class CheckEngine:
+    """Shared async core for every checker package.
+
+    One engine owns one pooled ``httpx.AsyncClient`` and applies the optional
+    scheduler (rate limits, adaptive concurrency), result cache, module timeout,
+    health statistics and instrumentation to every (identifier, module) call.
+    With a ``retry`` policy, failed calls are repeated for that module only and the
+    last outcome replaces the failed one. Use it as ``async with CheckEngine(...) as engine``.
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        timeout: float = DEFAULT_TIMEOUT,
+        scheduler: Optional[CheckScheduler] = None,
+        cache: Optional[ResultCache] = None,
+        module_timeout: Optional[float] = None,
+        health: Optional[ModuleHealth] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        retry: Optional[RetryPolicy] = None,
+        profile: Optional[ClientProfile] = None,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency musi być >= 1")
+        self.concurrency = concurrency
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.cache = cache
+        self.module_timeout = module_timeout
+        self.health = health
+        self.instrumentation = instrumentation
+        self.transport = transport
+        self.retry = retry
+        self.profile = profile
+        self._client = client
+        self._owns_client = client is None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("CheckEngine nie został otwarty (użyj 'async with')")
+        return self._client
+
+    async def __aenter__(self) -> "CheckEngine":
+        if self._client is None:
+            self._client = create_client(
+                self.max_connections,
+                self.max_keepalive_connections,
+                self.timeout,
+                transport=self.transport,
+                instrumentation=self.instrumentation,
+                profile=self.profile,
+            )
+            await self._client.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self._owns_client and self._client is not None:
+            client, self._client = self._client, None
+            await client.__aexit__(*exc_info)
+
+    async def invoke(
+        self,
+        target: CheckerTarget,
+        loaded_module: LoadedModule,
+        identifier: Any,
+        use_cache: bool = True,
+    ) -> List[dict]:
+        """Run one module for one identifier and return its results.
+
+        ``use_cache=False`` skips the cache lookup (retries must not get the cached
+        failure back); the fresh result is still stored.
+        """
+        cache = self.cache
+        instrumentation = self.instrumentation
+        if cache is not None and use_cache:
+            cached = cache.get(target.cache_key(identifier), loaded_module.module_path)
+            if cached is not None:
+                if instrumentation is not None:
+                    instrumentation.count("checks", module=loaded_module.module_path, status="cached")
+                return cached
+
+        if instrumentation is not None:
+            current_module.set(loaded_module.module_path)
+            if isinstance(loaded_module, LazyLoadedModule) and not loaded_module.resolved:
+                with instrumentation.span("import", module=loaded_module.module_path):
+                    try:
+                        await loaded_module.resolve()
+                    except Exception:
+                        # Reported as a regular module error by _call
+                        pass
+
+        module_out: List[dict] = []
+        if self.scheduler is None:
+            started = trio.current_time()
+            await self._call(target, loaded_module, identifier, module_out)
+        else:
+            async with self.scheduler.slot(loaded_module.module_path):
+                started = trio.current_time()
+                await self._call(target, loaded_module, identifier, module_out)
+            self.scheduler.report(loaded_module.module_path, module_out)
+        elapsed = trio.current_time() - started
+        if self.health is not None:
+            self.health.record(loaded_module.module_path, module_out, elapsed)
+        if instrumentation is not None:
+            status = result_status(module_out)
+            instrumentation.record_span("module", elapsed, module=loaded_module.module_path, status=status)
+            instrumentation.count("checks", module=loaded_module.module_path, status=status)
+        if cache is not None:
+            cache.put(target.cache_key(identifier), loaded_module.module_path, module_out)
+        return module_out
+
+    async def _call(
+        self,
+        target: CheckerTarget,
+        loaded_module: LoadedModule,
+        identifier: Any,
+        out: List[dict],
+    ) -> None:
+        module_timeout = self.module_timeout
+        with trio.move_on_after(module_timeout if module_timeout is not None else math.inf) as scope:
+            try:
+                function = await resolve_function(loaded_module)
+                await target.call(function, identifier, self.client, out)
+            except Exception as exc:  # pragma: no cover
+                out.append(target.error_result(loaded_module, str(exc)))
+        if scope.cancelled_caught:
+            out.append(target.timeout_result(loaded_module, module_timeout or 0.0))
+
+    async def retry_failed(
+        self,
+        target: CheckerTarget,
+        loaded_module: LoadedModule,
+        identifier: Any,
+        module_out: List[dict],
+        slots: Optional[trio.Semaphore] = None,
+        on_attempt: Optional[ResultCallback] = None,
+    ) -> List[dict]:
+        """Retry stage: re-run one failed (identifier, module) pair with backoff.
+
+        The backoff is waited out without holding one of ``slots``. Returns the
+        last outcome, tagged with the number of ``retries`` it took.
+        ``on_attempt`` gets every intermediate outcome.
+        """
+        retry = self.retry
+        if retry is None:
+            return module_out
+        domain = loaded_module.module_path
+        attempt = 0
+        while retry.report(domain, module_out) and attempt < retry.max_retries:
+            attempt += 1
+            await retry.wait(domain)
+            if slots is not None:
+                async with slots:
+                    module_out = await self.invoke(target, loaded_module, identifier, use_cache=False)
+            else:
+                module_out = await self.invoke(target, loaded_module, identifier, use_cache=False)
+            # Copies, so the tag does not leak into results held by the cache
+            module_out = [dict(item, retries=attempt) for item in module_out]
+            if self.instrumentation is not None:
+                self.instrumentation.count("retries", module=domain, status=result_status(module_out))
+            if on_attempt is not None:
+                on_attempt(module_out)
+        return module_out
+
+    async def check(
+        self,
+        target: CheckerTarget,
+        identifier: Any,
+        modules_to_run: Sequence[LoadedModule],
+        *,
+        deadline: Optional[float] = None,
+        on_result: Optional[ResultCallback] = None,
+    ) -> List[dict]:
+        """Run all modules for one identifier concurrently.
+
+        ``deadline`` bounds the whole lookup; modules that miss it get a result with
+        ``status: "timeout"``. ``on_result`` receives each module's results as soon
+        as that module is done.
+        """
+        out: List[dict] = []
+        completed: Set[int] = set()
+        # Latest outcome per module, so a retry cut off by the deadline keeps what it had
+        latest: Dict[int, List[dict]] = {}
+
+        async def _run_one(index: int, loaded_module: LoadedModule) -> None:
+            def _remember(module_out: List[dict]) -> None:
+                latest[index] = module_out
+
+            module_out = await self.invoke(target, loaded_module, identifier)
+            _remember(module_out)
+            module_out = await self.retry_failed(
+                target, loaded_module, identifier, module_out, on_attempt=_remember
+            )
+            out.extend(module_out)
+            completed.add(index)
+            if on_result is not None:
+                on_result(module_out)
+
+        with trio.move_on_after(deadline if deadline is not None else math.inf):
+            async with trio.open_nursery() as nursery:
+                for index, loaded_module in enumerate(modules_to_run):
+                    nursery.start_soon(_run_one, index, loaded_module)
+
+        if deadline is not None:
+            for index, loaded_module in enumerate(modules_to_run):
+                if index not in completed:
+                    module_out = latest.get(index) or [target.timeout_result(loaded_module, deadline)]
+                    out.extend(module_out)
+                    if on_result is not None:
+                        on_result(module_out)
+
+        return out
+
+    async def run_batch(
+        self,
+        jobs: Iterable[Job],
+        modules_by_target: Mapping[str, Sequence[LoadedModule]],
+        emit: Callable[[CheckerTarget, Any, List[dict]], Awaitable[None]],
+    ) -> None:
+        """Check a stream of ``(target, identifier)`` jobs, possibly of mixed targets.
+
+        Every (identifier, module) pair is a separate task and at most
+        ``concurrency`` of them run at once. ``await emit(target, identifier,
+        results)`` is called as soon as all modules for a job are done.
+        """
+        slots = trio.Semaphore(self.concurrency)
+
+        async def _run_one(loaded_module: LoadedModule, pending: _PendingLookup) -> None:
+            try:
+                module_out = await self.invoke(pending.target, loaded_module, pending.identifier)
+            finally:
+                slots.release()
+            module_out = await self.retry_failed(
+                pending.target, loaded_module, pending.identifier, module_out, slots
+            )
+            pending.out.extend(module_out)
+            pending.remaining -= 1
+            if pending.remaining == 0:
+                await emit(pending.target, pending.identifier, pending.out)
+
+        async with trio.open_nursery() as nursery:
+            for target, identifier in jobs:
+                modules_to_run = modules_by_target.get(target.name, ())
+                pending = _PendingLookup(target, identifier, len(modules_to_run))
+                if not modules_to_run:
+                    await emit(target, identifier, pending.out)
+                    continue
+                for loaded_module in modules_to_run:
+                    # Acquire before spawning so the number of live tasks stays bounded
+                    await slots.acquire()
+                    nursery.start_soon(_run_one, loaded_module, pending)
+
+
+def run_check_sync(
+    target: CheckerTarget,
+    identifier: Any,
+    modules_to_run: Sequence[LoadedModule],
+    *,
+    deadline: Optional[float] = None,
+    on_result: Optional[ResultCallback] = None,
+    **engine_options: Any,
+) -> List[dict]:
+    """Single lookup in a fresh event loop; ``engine_options`` go to :class:`CheckEngine`."""
+
+    async def _main() -> List[dict]:
+        async with CheckEngine(**engine_options) as engine:
+            return await engine.check(
+                target, identifier, modules_to_run, deadline=deadline, on_result=on_result
+            )
+
+    try:
+        return trio.run(_main)
+    finally:
+        health = engine_options.get("health")
+        if health is not None:
+            health.save()
+
+
+def run_batch_sync(
+    jobs: Iterable[Job],
+    modules_by_target: Mapping[str, Sequence[LoadedModule]],
+    on_result: Callable[[CheckerTarget, Any, List[dict]], None],
+    **engine_options: Any,
+) -> None:
+    """Run a (possibly mixed e-mail/phone) batch in one event loop and one client pool.
+
+    ``on_result(target, identifier, results)`` is called as each job completes.
+    """
+
+    async def _main() -> None:
+        send_channel, receive_channel = trio.open_memory_channel(0)
+
+        async def _emit(target: CheckerTarget, identifier: Any, results: List[dict]) -> None:
+            await send_channel.send((target, identifier, results))
+
+        async def _produce(engine: CheckEngine) -> None:
+            async with send_channel:
+                await engine.run_batch(jobs, modules_by_target, _emit)
+
+        async with CheckEngine(**engine_options) as engine:
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(_produce, engine)
+                async with receive_channel:
+                    async for target, identifier, results in receive_channel:
+                        on_result(target, identifier, results)
+
+    try:
+        trio.run(_main)
+    finally:
+        health = engine_options.get("health")
+        if health is not None:
+            health.save()
+
+
+async def run_bulk_checks(
+    target: CheckerTarget,
+    identifiers: Iterable[Any],
+    modules_to_run: Sequence[LoadedModule],
+    send_channel: trio.MemorySendChannel,
+    **engine_options: Any,
+) -> None:
+    """Check many identifiers of one target inside a single event loop and one pooled client.
+
+    ``(identifier, results)`` is sent to ``send_channel`` as soon as all modules for
+    an identifier are done; the channel is closed when the batch is finished.
+    """
+
+    async def _emit(job_target: CheckerTarget, identifier: Any, results: List[dict]) -> None:
+        await send_channel.send((identifier, results))
+
+    async with send_channel:
+        async with CheckEngine(**engine_options) as engine:
+            await engine.run_batch(
+                ((target, identifier) for identifier in identifiers),
+                {target.name: modules_to_run},
+                _emit,
+            )
+
+
+def check_bulk_sync(
+    target: CheckerTarget,
+    identifiers: Iterable[Any],
+    modules_str: Optional[str] = None,
+    on_result: Optional[Callable[[Any, List[dict]], None]] = None,
+    *,
+    lazy: bool = False,
+    keep_results: bool = True,
+    **engine_options: Any,
+) -> Dict[Any, List[dict]]:
+    """Load the modules named by ``modules_str`` and check ``identifiers`` in one event loop.
+
+    ``on_result(identifier, results)`` is called for every identifier as soon as it
+    completes. With ``keep_results=False`` results are only streamed to ``on_result``
+    and the returned dict stays empty, which keeps memory flat for very large batches.
+    """
+    loaded = prepare_modules(
+        target,
+        modules_str,
+        lazy,
+        engine_options.get("health"),
+        engine_options.get("instrumentation"),
+    )
+    results: Dict[Any, List[dict]] = {}
+
+    def _collect(job_target: CheckerTarget, identifier: Any, out: List[dict]) -> None:
+        if keep_results:
+            results[identifier] = out
+        if on_result is not None:
+            on_result(identifier, out)
+
+    run_batch_sync(
+        ((target, identifier) for identifier in identifiers),
+        {target.name: loaded},
+        _collect,
+        **engine_options,
+    )
+    return results
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import ipaddress
+import socket
+import ssl
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+import httpcore
+import httpx
+import trio
+
+
+DEFAULT_DNS_CACHE_TTL = 300.0
+
+
+@dataclass(frozen=True)
+class ClientProfile:
+    """Connection settings of the pooled checker client.
+
+    ``max_connections_per_host`` caps requests in flight to one host; with HTTP/1.1
+    that is the number of connections, with HTTP/2 the number of streams sharing
+    one connection. ``dns_cache_ttl`` keeps resolved addresses for that many
+    seconds instead of resolving on every new connection.
+    """
+
+    name: str = "default"
+    http2: bool = False
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 5.0
+    max_connections_per_host: Optional[int] = None
+    dns_cache_ttl: Optional[float] = None
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+CLIENT_PROFILES: Dict[str, ClientProfile] = {
+    # httpx defaults: HTTP/1.1, short keep-alive, every connection resolves DNS
+    "default": ClientProfile(),
+    # HTTP/1.1 with a large, long-lived keep-alive pool and cached DNS
+    "reuse": ClientProfile(
+        name="reuse",
+        max_connections=200,
+        max_keepalive_connections=200,
+        keepalive_expiry=60.0,
+        max_connections_per_host=8,
+        dns_cache_ttl=DEFAULT_DNS_CACHE_TTL,
+    ),
+    # One multiplexed HTTP/2 connection per host where the server supports it
+    "http2": ClientProfile(
+        name="http2",
+        http2=True,
+        max_connections=100,
+        max_keepalive_connections=100,
+        keepalive_expiry=60.0,
+        dns_cache_ttl=DEFAULT_DNS_CACHE_TTL,
+    ),
+}
+
+
+def get_profile(name: str) -> ClientProfile:
+    try:
+        return CLIENT_PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Nieznany profil klienta: '{name}' (dostępne: {', '.join(sorted(CLIENT_PROFILES))})"
+        ) from None
+
+
+def _is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """Wraps an httpcore network backend and caches ``host -> addresses`` for ``ttl`` seconds.
+
+    A connection tries the cached addresses in order and moves on to the next one
+    when an address refuses or times out; the address that answered is moved to
+    the front for later connections. TLS still uses the original host name for
+    SNI and certificate checks, since httpcore passes it to ``start_tls`` separately.
+    """
+
+    def __init__(self, inner: httpcore.AsyncNetworkBackend, ttl: float = DEFAULT_DNS_CACHE_TTL) -> None:
+        self.inner = inner
+        self.ttl = ttl
+        self.lookups = 0
+        self._cache: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        if _is_ip_address(host):
+            return [host]
+        now = trio.current_time()
+        cached = self._cache.get((host, port))
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        self.lookups += 1
+        infos = await trio.socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        # getaddrinfo order, without duplicates (several protocols can map to one address)
+        addresses = list(dict.fromkeys(str(info[4][0]) for info in infos))
+        if not addresses:
+            raise httpcore.ConnectError(f"Nie można rozwiązać nazwy hosta '{host}'")
+        self._cache[(host, port)] = (now + self.ttl, addresses)
+        return addresses
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Optional[Iterable[httpcore.SOCKET_OPTION]] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        addresses = await self.resolve(host, port)
+        error: Optional[Exception] = None
+        for address in list(addresses):
+            try:
+                stream = await self.inner.connect_tcp(
+                    address, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+                )
+            except (OSError, httpcore.ConnectError, httpcore.ConnectTimeout) as exc:
+                error = exc
+                continue
+            if address != addresses[0] and address in addresses:
+                addresses.remove(address)
+                addresses.insert(0, address)
+            return stream
+        assert error is not None
+        raise error
+
+    async def connect_unix_socket(
+        self,
+        path: str,
+        timeout: Optional[float] = None,
+        socket_options: Optional[Iterable[httpcore.SOCKET_OPTION]] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        return await self.inner.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self.inner.sleep(seconds)
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, inner: httpx.AsyncByteStream, semaphore: trio.Semaphore) -> None:
+        self._inner = inner
+        self._semaphore: Optional[trio.Semaphore] = semaphore
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._inner:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._inner.aclose()
+        finally:
+            if self._semaphore is not None:
+                self._semaphore.release()
+                self._semaphore = None
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """Allows at most ``per_host`` requests in flight to each host.
+
+    A slot is held until the response body is closed, so streamed responses count
+    for as long as they occupy their connection.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, per_host: int) -> None:
+        if per_host < 1:
+            raise ValueError("per_host musi być >= 1")
+        self.inner = inner
+        self.per_host = per_host
+        self._semaphores: Dict[str, trio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        semaphore = self._semaphores.get(request.url.host)
+        if semaphore is None:
+            semaphore = self._semaphores[request.url.host] = trio.Semaphore(self.per_host)
+        await semaphore.acquire()
+        try:
+            response = await self.inner.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, semaphore)  # type: ignore[arg-type]
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def build_transport(
+    profile: ClientProfile,
+    verify: Union[ssl.SSLContext, bool] = True,
+) -> httpx.AsyncBaseTransport:
+    try:
+        transport = httpx.AsyncHTTPTransport(verify=verify, http2=profile.http2, limits=profile.limits)
+    except ImportError as exc:
+        raise RuntimeError("Profil HTTP/2 wymaga pakietu 'h2' (pip install 'httpx[http2]')") from exc
+
+    if profile.dns_cache_ttl:
+        # httpx exposes no public hook for the httpcore network backend
+        pool = transport._pool
+        pool._network_backend = CachingNetworkBackend(pool._network_backend, profile.dns_cache_ttl)
+
+    if profile.max_connections_per_host:
+        return HostLimitedTransport(transport, profile.max_connections_per_host)
+    return transport
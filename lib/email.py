@@ -1,16 +1,23 @@
 from __future__ import annotations
 
 import argparse
-import importlib
-import json
-import sys
-from dataclasses import dataclass
-import pkgutil
-from typing import Callable, List, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import trio
 import httpx
 
+from lib.batch import add_batch_arguments, parse_batch_arguments, run_batch_cli
+from lib.cache import ResultCache
+from lib import checker
+from lib.checker import DEFAULT_CONCURRENCY, CheckEngine, CheckerTarget
+from lib.client import ClientProfile
+from lib.health import ModuleHealth
+from lib.instrument import Instrumentation
+from lib.normalize import normalize_email
+from lib.ratelimit import CheckScheduler, RetryPolicy
+from lib.registry import LoadedModule
+from lib.shard import check_sharded
+
 
 DEFAULT_MODULES: Sequence[Tuple[str, str]] = (
     ("social_media.instagram", "instagram"),
@@ -19,134 +26,146 @@ DEFAULT_MODULES: Sequence[Tuple[str, str]] = (
 )
 
 
-@dataclass
-class LoadedModule:
-    module_path: str
-    function_name: str
-    function: Callable[..., object]
+async def _call_holehe(
+    function: Callable[..., Any], email: str, client: httpx.AsyncClient, out: List[dict]
+) -> None:
+    await function(email, client, out)
 
 
-def _discover_all_holehe_module_specs() -> List[Tuple[str, str]]:
-    try:
-        root_pkg = importlib.import_module("holehe")
-    except Exception:
-        return []
-
-    search_path = getattr(root_pkg, "__path__", None)
-    if not search_path:
-        return []
-
-    discovered: List[Tuple[str, str]] = []
-    prefix = "holehe.modules."
-    for modinfo in pkgutil.walk_packages(search_path, prefix=root_pkg.__name__ + "."):
-        full_name = modinfo.name
-        if modinfo.ispkg:
-            continue
-        if not full_name.startswith(prefix):
-            continue
-        rel_name = full_name[len(prefix) :]
-        func_name = rel_name.split(".")[-1]
-        if func_name:
-            discovered.append((rel_name, func_name))
-    return discovered
+EMAIL_TARGET = CheckerTarget(
+    name="email",
+    package="holehe",
+    call=_call_holehe,
+    cache_key=lambda email: email,
+    default_modules=tuple(DEFAULT_MODULES),
+)
 
 
 def parse_modules_arg(arg_value: Optional[str]) -> Sequence[Tuple[str, str]]:
-    if not arg_value:
-        discovered = _discover_all_holehe_module_specs()
-        return discovered if discovered else DEFAULT_MODULES
-
-    normalized = arg_value.strip().lower().strip("'\"")
-    if normalized in {"all", "*"}:
-        discovered = _discover_all_holehe_module_specs()
-        return discovered if discovered else DEFAULT_MODULES
-
-    result: List[Tuple[str, str]] = []
-    for item in arg_value.split(","):
-        item = item.strip().strip("'\"")
-        if not item:
-            continue
-        if ":" in item:
-            module_path, func_name = item.split(":", 1)
-            module_path = module_path.strip().strip("'\"")
-            func_name = func_name.strip().strip("'\"")
-            if not module_path or not func_name:
-                raise ValueError(f"Nieprawidłowa specyfikacja modułu: '{item}'")
-            result.append((module_path, func_name))
-        else:
-            last_segment = item.split(".")[-1]
-            if not last_segment:
-                raise ValueError(f"Nieprawidłowa specyfikacja modułu: '{item}'")
-            result.append((item, last_segment))
-    return result
-
-
-def load_holehe_functions(module_specs: Sequence[Tuple[str, str]]) -> List[LoadedModule]:
-    loaded: List[LoadedModule] = []
-    for rel_module_path, func_name in module_specs:
-        if rel_module_path in {"all", "*"}:
-            continue
-        full_module = f"holehe.modules.{rel_module_path}"
-        try:
-            mod = importlib.import_module(full_module)
-        except Exception:
-            continue
-
-        try:
-            func = getattr(mod, func_name)
-        except AttributeError:
-            continue
-
-        loaded.append(LoadedModule(module_path=full_module, function_name=func_name, function=func))
-
-    if not loaded:
-        raise RuntimeError(
-            "Nie udało się załadować żadnego modułu holehe. Sprawdź instalację pakietu 'holehe'"
+    return checker.parse_modules_arg(EMAIL_TARGET, arg_value)
+
+
+def load_holehe_functions(
+    module_specs: Sequence[Tuple[str, str]],
+    lazy: bool = False,
+    instrumentation: Optional[Instrumentation] = None,
+) -> List[LoadedModule]:
+    return checker.load_functions(EMAIL_TARGET, module_specs, lazy, instrumentation)
+
+
+async def run_checks(
+    email: str,
+    modules_to_run: Sequence[LoadedModule],
+    scheduler: Optional[CheckScheduler] = None,
+    cache: Optional[ResultCache] = None,
+    module_timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    on_result: Optional[Callable[[List[dict]], None]] = None,
+    health: Optional[ModuleHealth] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    instrumentation: Optional[Instrumentation] = None,
+    retry: Optional[RetryPolicy] = None,
+    profile: Optional[ClientProfile] = None,
+) -> List[dict]:
+    """Run all modules concurrently; see :meth:`lib.checker.CheckEngine.check`."""
+    async with CheckEngine(
+        scheduler=scheduler,
+        cache=cache,
+        module_timeout=module_timeout,
+        health=health,
+        instrumentation=instrumentation,
+        retry=retry,
+        profile=profile,
+        transport=transport,
+    ) as engine:
+        return await engine.check(
+            EMAIL_TARGET, email, modules_to_run, deadline=deadline, on_result=on_result
         )
 
-    return loaded
+
+async def run_bulk_checks(
+    emails: Iterable[str],
+    modules_to_run: Sequence[LoadedModule],
+    send_channel: trio.MemorySendChannel,
+    **engine_options: Any,
+) -> None:
+    """E-mail variant of :func:`lib.checker.run_bulk_checks`."""
+    await checker.run_bulk_checks(EMAIL_TARGET, emails, modules_to_run, send_channel, **engine_options)
 
 
-async def run_checks(email: str, modules_to_run: Sequence[LoadedModule]) -> List[dict]:
-    out: List[dict] = []
+def check_emails_bulk_sync(
+    emails: Iterable[str],
+    modules_str: Optional[str] = None,
+    on_result: Optional[Callable[[str, List[dict]], None]] = None,
+    **options: Any,
+) -> Dict[str, List[dict]]:
+    """Synchronous bulk variant of :func:`check_email_sync`; see :func:`lib.checker.check_bulk_sync`."""
+    return checker.check_bulk_sync(EMAIL_TARGET, emails, modules_str, on_result, **options)
 
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        async with trio.open_nursery() as nursery:
-            for loaded_module in modules_to_run:
-                nursery.start_soon(
-                    _invoke_module,
-                    loaded_module,
-                    email,
-                    client,
-                    out,
-                )
 
-    return out
+def check_emails_sharded(
+    emails: Iterable[str], modules_str: Optional[str] = None, **options: Any
+) -> Iterator[Tuple[str, List[dict]]]:
+    """Check emails in a pool of worker processes; see :func:`lib.shard.check_sharded`."""
+    return check_sharded(EMAIL_TARGET, emails, modules_str, **options)
 
 
-async def _invoke_module(
-    loaded_module: LoadedModule,
+def check_email_sync(
     email: str,
-    client: httpx.AsyncClient,
-    out: List[dict],
-) -> None:
+    modules_str: Optional[str] = None,
+    scheduler: Optional[CheckScheduler] = None,
+    cache: Optional[ResultCache] = None,
+    lazy: bool = False,
+    module_timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    on_result: Optional[Callable[[List[dict]], None]] = None,
+    health: Optional[ModuleHealth] = None,
+    instrumentation: Optional[Instrumentation] = None,
+    retry: Optional[RetryPolicy] = None,
+    profile: Optional[ClientProfile] = None,
+) -> List[dict]:
+    loaded = checker.prepare_modules(EMAIL_TARGET, modules_str, lazy, health, instrumentation)
+    return checker.run_check_sync(
+        EMAIL_TARGET,
+        email,
+        loaded,
+        deadline=deadline,
+        on_result=on_result,
+        scheduler=scheduler,
+        cache=cache,
+        module_timeout=module_timeout,
+        health=health,
+        instrumentation=instrumentation,
+        retry=retry,
+        profile=profile,
+    )
+
+
+def _email_key(email: str) -> Optional[str]:
     try:
-        await loaded_module.function(email, client, out)
-    except Exception as exc:  # pragma: no cover
-        out.append(
-            {
-                "name": loaded_module.function_name,
-                "domain": loaded_module.module_path,
-                "rateLimit": "Unknown",
-                "exists": "Unknown",
-                "error": str(exc),
-            }
-        )
+        return normalize_email(email)
+    except ValueError:
+        return None
+
+
+def _email_record(email: str, row: Optional[str], results: List[dict]) -> dict:
+    return {"email": email, "input": row, "results": results}
 
 
-def check_email_sync(email: str, modules_str: Optional[str] = None) -> List[dict]:
-    module_specs = parse_modules_arg(modules_str)
-    loaded = load_holehe_functions(module_specs)
-    return trio.run(run_checks, email, loaded)
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Wsadowe sprawdzanie adresów e-mail (holehe), wynik w formacie JSONL"
+    )
+    add_batch_arguments(parser, DEFAULT_CONCURRENCY)
+    args = parse_batch_arguments(parser, argv)
+    return run_batch_cli(
+        EMAIL_TARGET,
+        args,
+        normalize_email,
+        _email_record,
+        lambda record: _email_key(str(record.get("email", ""))),
+    )
 
 
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from lib.registry import LoadedModule, cache_dir
+
+
+HEALTH_FILE_NAME = "module-health.json"
+MAX_LATENCY_SAMPLES = 200
+# Rates are computed over this many recent attempts, so recovered modules come back
+OUTCOME_WINDOW = 20
+DEFAULT_MIN_SAMPLES = 5
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_REPROBE_INTERVAL = 6 * 3600.0
+
+SELECTION_MODES = ("all", "skip", "deprioritize")
+
+# One character per attempt in ModuleStats.recent
+_OUTCOME_SUCCESS = "s"
+_OUTCOME_ERROR = "e"
+_OUTCOME_RATE_LIMIT = "r"
+
+
+def _percentile(sorted_values: Sequence[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+@dataclass
+class ModuleStats:
+    """Lifetime counters plus the outcomes of the last :data:`OUTCOME_WINDOW` attempts.
+
+    The rates (and so health) come from the recent window only.
+    """
+
+    attempts: int = 0
+    successes: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    rate_limits: int = 0
+    latencies: List[float] = field(default_factory=list)
+    recent: str = ""
+    last_checked: float = 0.0
+
+    @property
+    def samples(self) -> int:
+        return len(self.recent)
+
+    def _recent_rate(self, outcome: str) -> float:
+        return self.recent.count(outcome) / len(self.recent) if self.recent else 0.0
+
+    @property
+    def success_rate(self) -> float:
+        return self._recent_rate(_OUTCOME_SUCCESS)
+
+    @property
+    def error_rate(self) -> float:
+        return self._recent_rate(_OUTCOME_ERROR)
+
+    @property
+    def rate_limit_rate(self) -> float:
+        return self._recent_rate(_OUTCOME_RATE_LIMIT)
+
+    @property
+    def p50(self) -> Optional[float]:
+        return _percentile(sorted(self.latencies), 0.50)
+
+    @property
+    def p95(self) -> Optional[float]:
+        return _percentile(sorted(self.latencies), 0.95)
+
+    def summary(self) -> dict:
+        return {
+            "attempts": self.attempts,
+            "samples": self.samples,
+            "success_rate": round(self.success_rate, 3),
+            "error_rate": round(self.error_rate, 3),
+            "rate_limit_rate": round(self.rate_limit_rate, 3),
+            "p50": self.p50,
+            "p95": self.p95,
+        }
+
+
+class ModuleHealth:
+    """Persistent per-module statistics used to skip or deprioritize dead checkers.
+
+    A module is unhealthy once it has at least ``min_samples`` recent attempts and
+    a success rate below ``threshold`` over the last :data:`OUTCOME_WINDOW` ones. Unhealthy modules are still run again once
+    every ``reprobe_interval`` seconds so that recovered ones come back.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        mode: str = "skip",
+        threshold: float = DEFAULT_THRESHOLD,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        reprobe_interval: float = DEFAULT_REPROBE_INTERVAL,
+    ) -> None:
+        if mode not in SELECTION_MODES:
+            raise ValueError(f"Nieznany tryb wyboru modułów: '{mode}'")
+        if min_samples > OUTCOME_WINDOW:
+            raise ValueError(f"min_samples nie może przekraczać {OUTCOME_WINDOW}")
+        self.path = Path(path) if path else cache_dir() / HEALTH_FILE_NAME
+        self.mode = mode
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.reprobe_interval = reprobe_interval
+        self._stats: Dict[str, ModuleStats] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                raw = json.load(fh)
+        except (OSError, ValueError):
+            return
+        for module_path, values in raw.get("modules", {}).items():
+            try:
+                self._stats[module_path] = ModuleStats(**values)
+            except TypeError:
+                continue
+
+    def save(self) -> None:
+        with self._lock:
+            payload = {"modules": {name: asdict(stats) for name, stats in self._stats.items()}}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(payload, fh)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def stats(self, module_path: str) -> ModuleStats:
+        with self._lock:
+            return self._stats.get(module_path) or ModuleStats()
+
+    def all_stats(self) -> Dict[str, ModuleStats]:
+        with self._lock:
+            return dict(self._stats)
+
+    def record(self, module_path: str, results: Sequence[dict], latency: float) -> None:
+        timed_out = any(item.get("status") == "timeout" for item in results)
+        errored = not results or any(item.get("error") for item in results)
+        rate_limited = any(item.get("rateLimit") is True for item in results)
+        with self._lock:
+            stats = self._stats.setdefault(module_path, ModuleStats())
+            stats.attempts += 1
+            stats.last_checked = time.time()
+            if timed_out:
+                stats.timeouts += 1
+            if errored:
+                stats.errors += 1
+                outcome = _OUTCOME_ERROR
+            elif rate_limited:
+                stats.rate_limits += 1
+                outcome = _OUTCOME_RATE_LIMIT
+            else:
+                stats.successes += 1
+                outcome = _OUTCOME_SUCCESS
+            stats.recent = (stats.recent + outcome)[-OUTCOME_WINDOW:]
+            stats.latencies.append(round(latency, 4))
+            if len(stats.latencies) > MAX_LATENCY_SAMPLES:
+                del stats.latencies[: len(stats.latencies) - MAX_LATENCY_SAMPLES]
+
+    def is_healthy(self, module_path: str) -> bool:
+        stats = self.stats(module_path)
+        if stats.samples < self.min_samples:
+            return True
+        return stats.success_rate >= self.threshold
+
+    def _due_for_reprobe(self, module_path: str, now: float) -> bool:
+        return now - self.stats(module_path).last_checked >= self.reprobe_interval
+
+    def select(self, modules: Sequence[LoadedModule], mode: Optional[str] = None) -> List[LoadedModule]:
+        """Filter or reorder ``modules`` according to ``mode`` (default: ``self.mode``).
+
+        ``skip`` drops unhealthy modules that are not due for a re-probe;
+        ``deprioritize`` keeps everything but runs healthy, fast modules first.
+        """
+        mode = mode or self.mode
+        if mode == "all":
+            return list(modules)
+
+        now = time.time()
+        healthy = [m for m in modules if self.is_healthy(m.module_path)]
+        unhealthy = [m for m in modules if not self.is_healthy(m.module_path)]
+        if mode == "skip":
+            reprobe = [m for m in unhealthy if self._due_for_reprobe(m.module_path, now)]
+            # Never end up with nothing to run just because every module looks dead
+            return (healthy + reprobe) or list(modules)
+
+        def _latency_key(loaded_module: LoadedModule) -> float:
+            p50 = self.stats(loaded_module.module_path).p50
+            return p50 if p50 is not None else 0.0
+
+        return sorted(healthy, key=_latency_key) + sorted(unhealthy, key=_latency_key)
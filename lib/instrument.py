@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+
+# Module currently running in this task; lets the shared httpx hooks attribute requests
+current_module: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_module", default=None
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class LoggingSink:
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO) -> None:
+        self.logger = logger or logging.getLogger("tools.checks")
+        self.level = level
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        self.logger.log(self.level, "%s", json.dumps(record, ensure_ascii=False, default=str))
+
+    def close(self) -> None:
+        pass
+
+
+class JsonFileSink:
+    """Appends one JSON record per span/counter to ``path``."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._handle = open(path, "a", encoding="utf-8")
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._handle.write(line)
+
+    def close(self) -> None:
+        with self._lock:
+            self._handle.close()
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in key)
+    return "{" + body + "}"
+
+
+class PrometheusSink:
+    """Aggregates spans and counters and renders them in the Prometheus text format.
+
+    Spans become ``tools_span_seconds_sum`` / ``_count`` series, counters become
+    ``tools_<name>_total``. :meth:`serve` exposes ``/metrics`` on a background thread.
+    """
+
+    def __init__(self, prefix: str = "tools") -> None:
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._span_sum: Dict[LabelKey, float] = {}
+        self._span_count: Dict[LabelKey, int] = {}
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        labels = {k: v for k, v in record.items() if k not in {"type", "name", "duration", "value", "ts"}}
+        with self._lock:
+            if record.get("type") == "counter":
+                key = (str(record["name"]), _label_key(labels))
+                self._counters[key] = self._counters.get(key, 0.0) + float(record.get("value", 1))
+            else:
+                key = _label_key({"span": record["name"], **labels})
+                self._span_sum[key] = self._span_sum.get(key, 0.0) + float(record.get("duration", 0.0))
+                self._span_count[key] = self._span_count.get(key, 0) + 1
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            if self._span_count:
+                lines.append(f"# TYPE {self.prefix}_span_seconds summary")
+                for key, total in sorted(self._span_sum.items()):
+                    lines.append(f"{self.prefix}_span_seconds_sum{_format_labels(key)} {total:.6f}")
+                    lines.append(f"{self.prefix}_span_seconds_count{_format_labels(key)} {self._span_count[key]}")
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                lines.append(f"# TYPE {self.prefix}_{name}_total counter")
+                for (counter_name, key), value in sorted(self._counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{self.prefix}_{name}_total{_format_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        sink = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - http.server API
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+
+class Instrumentation:
+    """Emits per-module spans and counters to one or more sinks.
+
+    Instrumentation is off unless an instance is passed to the checker functions;
+    every hook in the hot path is guarded by ``if instrumentation is not None``.
+    """
+
+    def __init__(self, *sinks: Any) -> None:
+        self.sinks = list(sinks)
+
+    def _emit(self, record: Dict[str, Any]) -> None:
+        for sink in self.sinks:
+            sink.emit(record)
+
+    def record_span(self, name: str, duration: float, **labels: Any) -> None:
+        self._emit({"type": "span", "name": name, "duration": round(duration, 6), "ts": time.time(), **labels})
+
+    def count(self, name: str, value: float = 1, **labels: Any) -> None:
+        self._emit({"type": "counter", "name": name, "value": value, "ts": time.time(), **labels})
+
+    @contextmanager
+    def span(self, name: str, **labels: Any) -> Iterator[Dict[str, Any]]:
+        """Time the block; keys set on the yielded dict are added as span labels."""
+        extra: Dict[str, Any] = {}
+        started = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            self.record_span(name, time.perf_counter() - started, **labels, **extra)
+
+    def event_hooks(self) -> Dict[str, List[Callable[..., Any]]]:
+        """httpx event hooks timing requests and their connection phases.
+
+        Uses the httpcore ``trace`` extension, so DNS/TCP connect, TLS and the
+        wait for response headers are reported as separate ``http.*`` spans.
+        """
+        instrumentation = self
+
+        async def _on_request(request: httpx.Request) -> None:
+            module = current_module.get()
+            host = request.url.host
+            phase_started: Dict[str, float] = {}
+
+            async def _trace(event_name: str, info: Dict[str, Any]) -> None:
+                phase, _, stage = event_name.rpartition(".")
+                if stage == "started":
+                    phase_started[phase] = time.perf_counter()
+                elif stage in {"complete", "failed"} and phase in phase_started:
+                    instrumentation.record_span(
+                        f"http.{phase}",
+                        time.perf_counter() - phase_started.pop(phase),
+                        module=module,
+                        host=host,
+                        failed=(stage == "failed") or None,
+                    )
+
+            request.extensions["trace"] = _trace
+            request.extensions["instrument_started"] = time.perf_counter()
+
+        async def _on_response(response: httpx.Response) -> None:
+            started = response.request.extensions.get("instrument_started")
+            module = current_module.get()
+            if started is not None:
+                instrumentation.record_span(
+                    "http.request",
+                    time.perf_counter() - started,
+                    module=module,
+                    host=response.request.url.host,
+                    status=response.status_code,
+                )
+            instrumentation.count("http_requests", module=module, status=response.status_code)
+
+        return {"request": [_on_request], "response": [_on_response]}
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+def result_status(results: List[dict]) -> str:
+    if any(item.get("status") == "timeout" for item in results):
+        return "timeout"
+    if not results or any(item.get("error") for item in results):
+        return "error"
+    if any(item.get("rateLimit") is True for item in results):
+        return "rate_limited"
+    return "ok"
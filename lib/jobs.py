@@ -0,0 +1,570 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import trio
+
+from lib.checker import CheckEngine, CheckerTarget
+from lib.instrument import result_status
+from lib.registry import LoadedModule, lazy_module_function
+
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_BACKOFF = 30.0
+DEFAULT_MAX_BACKOFF = 3600.0
+DEFAULT_LEASE_SECONDS = 600.0
+DEFAULT_LEASE_BATCH = 200
+# Upper bound on how long an idle worker sleeps before looking at the queue again
+IDLE_POLL_INTERVAL = 5.0
+
+TASK_PENDING = "pending"
+TASK_LEASED = "leased"
+TASK_DONE = "done"
+TASK_FAILED = "failed"
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS check_tasks (
+        id INTEGER PRIMARY KEY,
+        target TEXT NOT NULL,
+        identifier_key TEXT NOT NULL,
+        identifier TEXT NOT NULL,
+        module TEXT NOT NULL,
+        function TEXT NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        available_at REAL NOT NULL,
+        lease_owner TEXT,
+        lease_expires REAL,
+        last_status TEXT,
+        -- Time of the last enqueue that asked for the task, see JobStore.enqueue
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    )
+    """,
+    # An (identifier, module) pair is queued at most once while it is still open
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS check_tasks_open
+        ON check_tasks (target, identifier_key, module, function) WHERE status IN ('pending', 'leased')
+    """,
+    "CREATE INDEX IF NOT EXISTS check_tasks_ready ON check_tasks (status, available_at)",
+    # Per-target lease order; done tasks of the target stay out of the scanned range
+    "CREATE INDEX IF NOT EXISTS check_tasks_target_ready ON check_tasks (target, status, available_at)",
+    "CREATE INDEX IF NOT EXISTS check_tasks_identifier ON check_tasks (target, identifier_key, status)",
+    """
+    CREATE TABLE IF NOT EXISTS check_results (
+        id INTEGER PRIMARY KEY,
+        target TEXT NOT NULL,
+        identifier_key TEXT NOT NULL,
+        module TEXT NOT NULL,
+        function TEXT NOT NULL,
+        checked_at REAL NOT NULL,
+        status TEXT NOT NULL,
+        attempt INTEGER NOT NULL,
+        payload TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS check_results_identifier
+        ON check_results (target, identifier_key, module, checked_at)
+    """,
+    "CREATE INDEX IF NOT EXISTS check_results_module ON check_results (module, checked_at)",
+)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _decode_identifier(raw: str) -> Any:
+    value = json.loads(raw)
+    # Phone numbers are (country_code, phone) tuples; JSON turns them into lists
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _target_filters(targets: Optional[Sequence[str]]) -> List[Tuple[str, List[Any]]]:
+    """SQL filter and parameters per target, or a single empty filter for all targets."""
+    if not targets:
+        return [("", [])]
+    return [(" AND target = ?", [target]) for target in targets]
+
+
+@dataclass
+class QueuedCheck:
+    task_id: int
+    target: str
+    identifier: Any
+    module_path: str
+    function_name: str
+    attempts: int
+
+
+class JobStore:
+    """SQLite-backed queue of (identifier, module) checks plus their result history.
+
+    Workers :meth:`lease` a batch of due tasks for ``lease_seconds``; a task whose
+    lease expires (e.g. the worker died) becomes available to other workers again.
+    Rate-limited, failed and timed-out results are retried with exponential
+    backoff up to ``max_attempts`` times. Every attempt is kept in
+    ``check_results``, indexed by identifier/module/time and by module/time.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ) -> None:
+        if max_attempts < 1:
+            raise ValueError("max_attempts musi być >= 1")
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+
+    def backoff(self, attempts: int) -> float:
+        return min(self.max_backoff, self.retry_backoff * 2 ** max(0, attempts - 1))
+
+    def enqueue(
+        self,
+        target: CheckerTarget,
+        identifiers: Iterable[Any],
+        modules: Sequence[LoadedModule],
+    ) -> int:
+        """Queue every module for every identifier; returns the number of new tasks.
+
+        Tasks that are still open keep their place in the queue but are stamped
+        with this enqueue's ``created_at``, so :meth:`latest_results` reports
+        exactly the modules of the latest enqueue of an identifier.
+        """
+        now = time.time()
+        keys = [
+            (target.cache_key(identifier), json.dumps(identifier, ensure_ascii=False))
+            for identifier in identifiers
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    """
+                    UPDATE check_tasks SET created_at = ?
+                    WHERE target = ? AND identifier_key = ? AND module = ? AND function = ?
+                        AND status IN ('pending', 'leased')
+                    """,
+                    (
+                        (now, target.name, key, loaded_module.module_path, loaded_module.function_name)
+                        for key, _ in keys
+                        for loaded_module in modules
+                    ),
+                )
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    """
+                    INSERT OR IGNORE INTO check_tasks
+                        (target, identifier_key, identifier, module, function, status,
+                         available_at, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        (
+                            target.name,
+                            key,
+                            raw_identifier,
+                            loaded_module.module_path,
+                            loaded_module.function_name,
+                            TASK_PENDING,
+                            now,
+                            now,
+                            now,
+                        )
+                        for key, raw_identifier in keys
+                        for loaded_module in modules
+                    ),
+                )
+                added = self._conn.total_changes - before
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return added
+
+    def lease(
+        self,
+        worker_id: str,
+        limit: int = DEFAULT_LEASE_BATCH,
+        targets: Optional[Sequence[str]] = None,
+    ) -> List[QueuedCheck]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # One index-ordered query per target and state instead of an OR over
+                # both, which would scan (and sort) every task of the target
+                rows: List[Tuple[Any, ...]] = []
+                for target_filter, params in _target_filters(targets):
+                    rows.extend(
+                        self._conn.execute(
+                            f"""
+                            SELECT id, target, identifier, module, function, attempts, available_at
+                            FROM check_tasks
+                            WHERE status = 'pending' AND available_at <= ?{target_filter}
+                            ORDER BY available_at
+                            LIMIT ?
+                            """,
+                            [now, *params, limit],
+                        )
+                    )
+                    rows.extend(
+                        self._conn.execute(
+                            f"""
+                            SELECT id, target, identifier, module, function, attempts, available_at
+                            FROM check_tasks
+                            WHERE status = 'leased' AND lease_expires <= ?{target_filter}
+                            ORDER BY available_at
+                            LIMIT ?
+                            """,
+                            [now, *params, limit],
+                        )
+                    )
+                rows = sorted(rows, key=lambda row: row[6])[:limit]
+                self._conn.executemany(
+                    """
+                    UPDATE check_tasks
+                    SET status = 'leased', lease_owner = ?, lease_expires = ?, updated_at = ?
+                    WHERE id = ?
+                    """,
+                    [(worker_id, now + self.lease_seconds, now, row[0]) for row in rows],
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return [
+            QueuedCheck(
+                task_id=row[0],
+                target=row[1],
+                identifier=_decode_identifier(row[2]),
+                module_path=row[3],
+                function_name=row[4],
+                attempts=row[5],
+            )
+            for row in rows
+        ]
+
+    def complete(self, check: QueuedCheck, identifier_key: str, results: Sequence[dict]) -> bool:
+        """Store one attempt's results; returns True once the task is final (done or failed)."""
+        now = time.time()
+        status = result_status(list(results))
+        attempts = check.attempts + 1
+        if status == "ok":
+            task_status, available_at = TASK_DONE, now
+        elif attempts >= self.max_attempts:
+            task_status, available_at = TASK_FAILED, now
+        else:
+            task_status, available_at = TASK_PENDING, now + self.backoff(attempts)
+        payload = json.dumps(list(results), ensure_ascii=False, default=str)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    """
+                    INSERT INTO check_results
+                        (target, identifier_key, module, function, checked_at, status, attempt, payload)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        check.target,
+                        identifier_key,
+                        check.module_path,
+                        check.function_name,
+                        now,
+                        status,
+                        attempts,
+                        payload,
+                    ),
+                )
+                self._conn.execute(
+                    """
+                    UPDATE check_tasks
+                    SET status = ?, attempts = ?, available_at = ?, last_status = ?,
+                        lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                    WHERE id = ?
+                    """,
+                    (task_status, attempts, available_at, status, now, check.task_id),
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return task_status != TASK_PENDING
+
+    def release(self, checks: Iterable[QueuedCheck]) -> None:
+        """Hand leased tasks back to the queue without counting an attempt."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """
+                UPDATE check_tasks
+                SET status = 'pending', lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                WHERE id = ? AND status = 'leased'
+                """,
+                [(now, check.task_id) for check in checks],
+            )
+
+    def is_settled(self, target: str, identifier_key: str) -> bool:
+        """True when no task for the identifier is waiting or running."""
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT 1 FROM check_tasks
+                WHERE target = ? AND identifier_key = ? AND status IN ('pending', 'leased')
+                LIMIT 1
+                """,
+                (target, identifier_key),
+            ).fetchone()
+        return row is None
+
+    def next_available_at(self, targets: Optional[Sequence[str]] = None) -> Optional[float]:
+        """Earliest time a pending or leased task may be picked up; None if the queue is empty."""
+        candidates: List[float] = []
+        with self._lock:
+            for target_filter, params in _target_filters(targets):
+                # ORDER BY/LIMIT rather than MIN(): the planner answers MIN(lease_expires)
+                # with a full table scan
+                for column, status in (("available_at", TASK_PENDING), ("lease_expires", TASK_LEASED)):
+                    query = (
+                        f"SELECT {column} FROM check_tasks WHERE status = ?{target_filter}"
+                        f" ORDER BY {column} LIMIT 1"
+                    )
+                    row = self._conn.execute(query, [status, *params]).fetchone()
+                    if row and row[0] is not None:
+                        candidates.append(row[0])
+        return min(candidates, default=None)
+
+    def latest_results(self, target: str, identifier_key: str) -> List[dict]:
+        """Most recent attempt of every module of the identifier's latest enqueue, flattened.
+
+        Modules queued only by earlier enqueues are left out, even though their
+        results stay in the history.
+        """
+        latest: Dict[Tuple[str, str], List[dict]] = {}
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT module, function, payload FROM check_results
+                WHERE target = ? AND identifier_key = ? AND (module, function) IN (
+                    SELECT module, function FROM check_tasks
+                    WHERE target = ? AND identifier_key = ? AND created_at = (
+                        SELECT MAX(created_at) FROM check_tasks WHERE target = ? AND identifier_key = ?
+                    )
+                )
+                ORDER BY module, checked_at
+                """,
+                (target, identifier_key) * 3,
+            ).fetchall()
+        for module, function, payload in rows:
+            latest[(module, function)] = json.loads(payload)
+        return [item for module_out in latest.values() for item in module_out]
+
+    def history(
+        self,
+        target: str,
+        identifier_key: str,
+        module: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[dict]:
+        query = (
+            "SELECT module, function, checked_at, status, attempt, payload FROM check_results"
+            " WHERE target = ? AND identifier_key = ?"
+        )
+        params: List[Any] = [target, identifier_key]
+        if module is not None:
+            query += " AND module = ?"
+            params.append(module)
+        if since is not None:
+            query += " AND checked_at >= ?"
+            params.append(since)
+        query += " ORDER BY checked_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            {
+                "module": row[0],
+                "function": row[1],
+                "checked_at": row[2],
+                "status": row[3],
+                "attempt": row[4],
+                "results": json.loads(row[5]),
+            }
+            for row in rows
+        ]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM check_tasks GROUP BY status"
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+    def purge_finished(self, older_than: float) -> int:
+        """Drop done/failed tasks last updated more than ``older_than`` seconds ago."""
+        cutoff = time.time() - older_than
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM check_tasks WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (cutoff,),
+            )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+SettledCallback = Callable[[CheckerTarget, Any, List[dict]], None]
+
+
+async def drain_queue(
+    store: JobStore,
+    engine: CheckEngine,
+    targets: Mapping[str, CheckerTarget],
+    *,
+    worker_id: Optional[str] = None,
+    batch_size: int = DEFAULT_LEASE_BATCH,
+    wait_for_retries: bool = True,
+    on_settled: Optional[SettledCallback] = None,
+) -> None:
+    """Lease tasks for ``targets`` and run them on ``engine`` until the queue is empty.
+
+    ``on_settled(target, identifier, results)`` is called once all modules of an
+    identifier are final, with the latest results of each module. With
+    ``wait_for_retries=False`` the worker stops as soon as nothing is due, even if
+    retries are scheduled for later.
+    """
+    worker_id = worker_id or default_worker_id()
+    target_names = list(targets)
+    slots = trio.Semaphore(engine.concurrency)
+    finished = trio.Event()
+
+    def _store_results(check: QueuedCheck, identifier_key: str, results: List[dict]) -> Optional[List[dict]]:
+        """Complete the task; returns the identifier's results once it is settled."""
+        if not store.complete(check, identifier_key, results) or on_settled is None:
+            return None
+        if not store.is_settled(check.target, identifier_key):
+            return None
+        return store.latest_results(check.target, identifier_key)
+
+    # The store calls may wait on SQLite locks held by other workers (BEGIN IMMEDIATE,
+    # 30 s busy timeout), so they run in worker threads, off the event loop
+    async def _run_one(check: QueuedCheck) -> None:
+        target = targets[check.target]
+        try:
+            try:
+                loaded_module = lazy_module_function(check.module_path, check.function_name)
+                # A retry must reach the module; the cached result is the failure being retried
+                results = await engine.invoke(
+                    target, loaded_module, check.identifier, use_cache=check.attempts == 0
+                )
+            except BaseException:
+                with trio.CancelScope(shield=True):
+                    await trio.to_thread.run_sync(store.release, [check])
+                raise
+            identifier_key = target.cache_key(check.identifier)
+            # The slot is held until the task is stored, so an idle loop never
+            # misses a retry that is about to be scheduled
+            settled = await trio.to_thread.run_sync(_store_results, check, identifier_key, results)
+        finally:
+            slots.release()
+            finished.set()
+        if settled is not None:
+            on_settled(target, check.identifier, settled)
+
+    async with trio.open_nursery() as nursery:
+        while True:
+            leased = await trio.to_thread.run_sync(store.lease, worker_id, batch_size, target_names)
+            if leased:
+                for check in leased:
+                    await slots.acquire()
+                    nursery.start_soon(_run_one, check)
+                continue
+            # Nothing due right now: wait for our own tasks or for scheduled retries
+            next_at = await trio.to_thread.run_sync(store.next_available_at, target_names)
+            busy = slots.value < engine.concurrency
+            if not busy and (next_at is None or not wait_for_retries):
+                return
+            delay = IDLE_POLL_INTERVAL if next_at is None else next_at - time.time()
+            with trio.move_on_after(min(IDLE_POLL_INTERVAL, max(0.0, delay))):
+                await finished.wait()
+            finished = trio.Event()
+
+
+def drain_queue_sync(
+    store: JobStore,
+    targets: Mapping[str, CheckerTarget],
+    on_settled: Optional[SettledCallback] = None,
+    *,
+    worker_id: Optional[str] = None,
+    batch_size: int = DEFAULT_LEASE_BATCH,
+    wait_for_retries: bool = True,
+    **engine_options: Any,
+) -> None:
+    """Drain the queue in a fresh event loop; ``engine_options`` go to :class:`CheckEngine`."""
+
+    async def _main() -> None:
+        async with CheckEngine(**engine_options) as engine:
+            await drain_queue(
+                store,
+                engine,
+                targets,
+                worker_id=worker_id,
+                batch_size=batch_size,
+                wait_for_retries=wait_for_retries,
+                on_settled=on_settled,
+            )
+
+    try:
+        trio.run(_main)
+    finally:
+        health = engine_options.get("health")
+        if health is not None:
+            health.save()
+
+
+def run_queue_sync(
+    path: str,
+    target: CheckerTarget,
+    identifiers: Iterable[Any],
+    modules: Sequence[LoadedModule],
+    on_settled: Optional[SettledCallback] = None,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    **engine_options: Any,
+) -> None:
+    """Queue ``identifiers`` in the store at ``path`` and drain every open task of ``target``.
+
+    Tasks left over by earlier or concurrent runs on the same file are drained too,
+    so several processes can share one queue. ``max_attempts`` is passed to :class:`JobStore`.
+    """
+    store = JobStore(path, max_attempts=max_attempts)
+    try:
+        store.enqueue(target, identifiers, modules)
+        drain_queue_sync(store, {target.name: target}, on_settled, **engine_options)
+    finally:
+        store.close()
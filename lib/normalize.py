@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+
+K = TypeVar("K")
+
+PhoneNumber = Tuple[str, str]
+InvalidRowCallback = Callable[[str, ValueError], None]
+
+# Finished identifiers whose results are kept for late duplicates
+DEFAULT_MAX_FINISHED = 10_000
+
+# ITU calling codes are prefix-free: 1 and 7 are the only one-digit codes, these are
+# the two-digit ones, and every other code has three digits
+_TWO_DIGIT_CODES = frozenset(
+    "20 27 30 31 32 33 34 36 39 40 41 43 44 45 46 47 48 49 51 52 53 54 55 56 57 58 "
+    "60 61 62 63 64 65 66 81 82 84 86 90 91 92 93 94 95 98".split()
+)
+# Countries where the leading 0 is part of the national number, not a trunk prefix
+_KEEP_LEADING_ZERO = frozenset({"39"})
+_PHONE_SEPARATORS = re.compile(r"[\s\-./()]+")
+_MAX_E164_DIGITS = 15
+_MIN_NATIONAL_DIGITS = 4
+
+
+def normalize_email(value: str) -> str:
+    """Canonical form of an e-mail address: no whitespace, lower case."""
+    email = "".join(value.split()).lower().strip("<>\"'")
+    local, sep, domain = email.rpartition("@")
+    if not sep or not local or "." not in domain or domain.startswith(".") or domain.endswith("."):
+        raise ValueError(f"Nieprawidłowy adres e-mail: '{value}'")
+    return email
+
+
+def split_country_code(digits: str) -> PhoneNumber:
+    """Split an international number (digits only, no prefix) into (country code, number)."""
+    if digits[:1] in {"1", "7"}:
+        return digits[:1], digits[1:]
+    if digits[:2] in _TWO_DIGIT_CODES:
+        return digits[:2], digits[2:]
+    return digits[:3], digits[3:]
+
+
+def is_country_code(value: str) -> bool:
+    return value.isdigit() and split_country_code(value) == (value, "")
+
+
+def normalize_phone(value: str, default_country: Optional[str] = None) -> PhoneNumber:
+    """Canonical ``(country_code, number)`` pair, as ignorant expects it.
+
+    Accepts ``+48 123-456-789``, ``0048123456789``, ``48 123456789`` (a valid country
+    code and the number as two fields) and national numbers with ``default_country``.
+    """
+    raw = value.strip()
+    fields = raw.replace(",", " ").replace(";", " ").split()
+    default_cc = (default_country or "").strip().lstrip("+") or None
+
+    if len(fields) == 2 and not raw.startswith("00") and is_country_code(fields[0].lstrip("+")):
+        country_code, national = fields[0].lstrip("+"), _PHONE_SEPARATORS.sub("", fields[1])
+    else:
+        compact = _PHONE_SEPARATORS.sub("", raw.replace(",", "").replace(";", ""))
+        if compact.startswith("+"):
+            country_code, national = split_country_code(compact[1:])
+        elif compact.startswith("00"):
+            country_code, national = split_country_code(compact[2:])
+        elif default_cc:
+            country_code, national = default_cc, compact
+            if national.startswith("0") and country_code not in _KEEP_LEADING_ZERO:
+                national = national[1:]
+        else:
+            raise ValueError(f"Brak kodu kraju w numerze: '{value}'")
+
+    if not country_code.isdigit() or not national.isdigit():
+        raise ValueError(f"Nieprawidłowy numer telefonu: '{value}'")
+    if len(national) < _MIN_NATIONAL_DIGITS or len(country_code) + len(national) > _MAX_E164_DIGITS:
+        raise ValueError(f"Nieprawidłowa długość numeru telefonu: '{value}'")
+    return country_code, national
+
+
+class Deduplicator(Generic[K]):
+    """Collapses input rows that normalize to the same identifier.
+
+    :meth:`feed` yields every canonical identifier once; :meth:`fan_out` maps the
+    results for one identifier back to each original row. Duplicates that show up
+    after their identifier is finished are answered from the results of the last
+    ``max_finished`` identifiers; older ones are yielded and checked again.
+
+    Rows that fail to normalize are counted in :attr:`invalid` and passed to
+    ``on_invalid(row, error)``.
+    """
+
+    def __init__(
+        self,
+        normalize: Callable[[str], K],
+        on_invalid: Optional[InvalidRowCallback] = None,
+        max_finished: int = DEFAULT_MAX_FINISHED,
+    ) -> None:
+        self.normalize = normalize
+        self.on_invalid = on_invalid
+        self.max_finished = max_finished
+        self.rows = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self._pending: Dict[K, List[str]] = {}
+        self._finished: "OrderedDict[K, List[dict]]" = OrderedDict()
+        self._late: List[Tuple[str, K, List[dict]]] = []
+
+    def feed(self, rows: Iterable[str]) -> Iterator[K]:
+        for row in rows:
+            self.rows += 1
+            try:
+                key = self.normalize(row)
+            except ValueError as exc:
+                self.invalid += 1
+                if self.on_invalid is not None:
+                    self.on_invalid(row, exc)
+                continue
+            finished = self._finished.get(key)
+            if finished is not None:
+                self._finished.move_to_end(key)
+                self.duplicates += 1
+                self._late.append((row, key, finished))
+                continue
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.duplicates += 1
+                pending.append(row)
+                continue
+            self._pending[key] = [row]
+            yield key
+
+    def fan_out(self, key: K, results: List[dict]) -> List[Tuple[Optional[str], K, List[dict]]]:
+        """``(original row, identifier, results)`` for every row waiting on ``key``,
+        plus rows of already finished identifiers that arrived since the last call.
+
+        A ``key`` that was never fed (e.g. left in a job queue by an earlier run)
+        is returned once with ``None`` as its row.
+        """
+        rows: List[Optional[str]] = list(self._pending.pop(key, [None]))
+        self._finished[key] = results
+        self._finished.move_to_end(key)
+        while len(self._finished) > self.max_finished:
+            self._finished.popitem(last=False)
+        out: List[Tuple[Optional[str], K, List[dict]]] = [(row, key, results) for row in rows]
+        out.extend(self.drain())
+        return out
+
+    def drain(self) -> List[Tuple[Optional[str], K, List[dict]]]:
+        """Rows of finished identifiers not handed out by :meth:`fan_out` yet."""
+        late, self._late = self._late, []
+        return list(late)
+
+    def summary(self) -> str:
+        unique = self.rows - self.duplicates - self.invalid
+        return (
+            f"wierszy: {self.rows}, unikalnych: {unique}, "
+            f"duplikatów: {self.duplicates}, błędnych: {self.invalid}"
+        )
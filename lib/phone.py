@@ -1,157 +1,174 @@
 from __future__ import annotations
 
 import argparse
-import importlib
-import json
-import sys
-from dataclasses import dataclass
-import pkgutil
-from typing import Callable, List, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import trio
 import httpx
 
+from lib.batch import add_batch_arguments, parse_batch_arguments, run_batch_cli
+from lib.cache import ResultCache
+from lib import checker
+from lib.checker import DEFAULT_CONCURRENCY, CheckEngine, CheckerTarget
+from lib.client import ClientProfile
+from lib.health import ModuleHealth
+from lib.instrument import Instrumentation
+from lib.normalize import PhoneNumber, normalize_phone
+from lib.ratelimit import CheckScheduler, RetryPolicy
+from lib.registry import LoadedModule
+from lib.shard import check_sharded
 
-@dataclass
-class LoadedModule:
-    module_path: str
-    function_name: str
-    function: Callable[..., object]
 
+def cache_identifier(country_code: str, phone: str) -> str:
+    return f"+{country_code.strip().lstrip('+')}{phone.strip()}"
 
-def _discover_all_ignorant_module_specs() -> List[Tuple[str, str]]:
-    try:
-        root_pkg = importlib.import_module("ignorant")
-    except Exception:
-        return []
 
-    search_path = getattr(root_pkg, "__path__", None)
-    if not search_path:
-        return []
+async def _call_ignorant(
+    function: Callable[..., Any], number: PhoneNumber, client: httpx.AsyncClient, out: List[dict]
+) -> None:
+    country_code, phone = number
+    await function(phone, country_code, client, out)
 
-    discovered: List[Tuple[str, str]] = []
-    prefix = "ignorant.modules."
-    for modinfo in pkgutil.walk_packages(search_path, prefix=root_pkg.__name__ + "."):
-        full_name = modinfo.name
-        if modinfo.ispkg:
-            continue
-        if not full_name.startswith(prefix):
-            continue
-        rel_name = full_name[len(prefix) :]
-        func_name = rel_name.split(".")[-1]
-        if func_name:
-            discovered.append((rel_name, func_name))
-    return discovered
 
+PHONE_TARGET = CheckerTarget(
+    name="phone",
+    package="ignorant",
+    call=_call_ignorant,
+    cache_key=lambda number: cache_identifier(*number),
+    error_fields=(("method", "unknown"), ("frequent_rate_limit", "Unknown")),
+)
 
-def parse_modules_arg(arg_value: Optional[str]) -> Sequence[Tuple[str, str]]:
-    if not arg_value:
-        discovered = _discover_all_ignorant_module_specs()
-        if not discovered:
-            raise RuntimeError(
-                "Nie znaleziono żadnych modułów 'ignorant'. Upewnij się, że pakiet jest poprawnie zainstalowany."
-            )
-        return discovered
-
-    normalized = arg_value.strip().lower().strip("'\"")
-    if normalized in {"all", "*"}:
-        discovered = _discover_all_ignorant_module_specs()
-        if not discovered:
-            raise RuntimeError(
-                "Nie znaleziono żadnych modułów 'ignorant'. Upewnij się, że pakiet jest poprawnie zainstalowany."
-            )
-        return discovered
-
-    result: List[Tuple[str, str]] = []
-    for item in arg_value.split(","):
-        item = item.strip().strip("'\"")
-        if not item:
-            continue
-        if ":" in item:
-            module_path, func_name = item.split(":", 1)
-            module_path = module_path.strip().strip("'\"")
-            func_name = func_name.strip().strip("'\"")
-            if not module_path or not func_name:
-                raise ValueError(f"Nieprawidłowa specyfikacja modułu: '{item}'")
-            result.append((module_path, func_name))
-        else:
-            last_segment = item.split(".")[-1]
-            if not last_segment:
-                raise ValueError(f"Nieprawidłowa specyfikacja modułu: '{item}'")
-            result.append((item, last_segment))
-    return result
-
-
-def load_ignorant_functions(module_specs: Sequence[Tuple[str, str]]) -> List[LoadedModule]:
-    loaded: List[LoadedModule] = []
-    for rel_module_path, func_name in module_specs:
-        if rel_module_path in {"all", "*"}:
-            continue
-        full_module = f"ignorant.modules.{rel_module_path}"
-        try:
-            mod = importlib.import_module(full_module)
-        except Exception:
-            continue
-
-        try:
-            func = getattr(mod, func_name)
-        except AttributeError:
-            continue
-
-        loaded.append(LoadedModule(module_path=full_module, function_name=func_name, function=func))
-
-    if not loaded:
-        raise RuntimeError(
-            "Nie udało się załadować żadnego modułu ignorant. Sprawdź instalację pakietu 'ignorant'"
-        )
 
-    return loaded
+def parse_modules_arg(arg_value: Optional[str]) -> Sequence[Tuple[str, str]]:
+    return checker.parse_modules_arg(PHONE_TARGET, arg_value)
 
 
-async def run_checks(country_code: str, phone: str, modules_to_run: Sequence[LoadedModule]) -> List[dict]:
-    out: List[dict] = []
+def load_ignorant_functions(
+    module_specs: Sequence[Tuple[str, str]],
+    lazy: bool = False,
+    instrumentation: Optional[Instrumentation] = None,
+) -> List[LoadedModule]:
+    return checker.load_functions(PHONE_TARGET, module_specs, lazy, instrumentation)
 
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        async with trio.open_nursery() as nursery:
-            for loaded_module in modules_to_run:
-                nursery.start_soon(
-                    _invoke_module,
-                    loaded_module,
-                    phone,
-                    country_code,
-                    client,
-                    out,
-                )
 
-    return out
+async def run_checks(
+    country_code: str,
+    phone: str,
+    modules_to_run: Sequence[LoadedModule],
+    scheduler: Optional[CheckScheduler] = None,
+    cache: Optional[ResultCache] = None,
+    module_timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    on_result: Optional[Callable[[List[dict]], None]] = None,
+    health: Optional[ModuleHealth] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    instrumentation: Optional[Instrumentation] = None,
+    retry: Optional[RetryPolicy] = None,
+    profile: Optional[ClientProfile] = None,
+) -> List[dict]:
+    """Run all modules concurrently; see :meth:`lib.checker.CheckEngine.check`."""
+    async with CheckEngine(
+        scheduler=scheduler,
+        cache=cache,
+        module_timeout=module_timeout,
+        health=health,
+        instrumentation=instrumentation,
+        retry=retry,
+        profile=profile,
+        transport=transport,
+    ) as engine:
+        return await engine.check(
+            PHONE_TARGET,
+            (country_code, phone),
+            modules_to_run,
+            deadline=deadline,
+            on_result=on_result,
+        )
 
 
-async def _invoke_module(
-    loaded_module: LoadedModule,
-    phone: str,
-    country_code: str,
-    client: httpx.AsyncClient,
-    out: List[dict],
+async def run_bulk_checks(
+    numbers: Iterable[PhoneNumber],
+    modules_to_run: Sequence[LoadedModule],
+    send_channel: trio.MemorySendChannel,
+    **engine_options: Any,
 ) -> None:
-    try:
-        await loaded_module.function(phone, country_code, client, out)
-    except Exception as exc:  # pragma: no cover
-        out.append(
-            {
-                "name": loaded_module.function_name,
-                "domain": loaded_module.module_path,
-                "method": "unknown",
-                "frequent_rate_limit": "Unknown",
-                "rateLimit": "Unknown",
-                "exists": "Unknown",
-                "error": str(exc),
-            }
-        )
+    """Phone variant of :func:`lib.checker.run_bulk_checks` for ``(country_code, phone)`` pairs."""
+    await checker.run_bulk_checks(PHONE_TARGET, numbers, modules_to_run, send_channel, **engine_options)
+
+
+def check_phones_bulk_sync(
+    numbers: Iterable[PhoneNumber],
+    modules_str: Optional[str] = None,
+    on_result: Optional[Callable[[PhoneNumber, List[dict]], None]] = None,
+    **options: Any,
+) -> Dict[PhoneNumber, List[dict]]:
+    """Synchronous bulk variant of :func:`check_phone_sync`; see :func:`lib.checker.check_bulk_sync`."""
+    return checker.check_bulk_sync(PHONE_TARGET, numbers, modules_str, on_result, **options)
 
 
-def check_phone_sync(country_code: str, phone: str, modules_str: Optional[str] = None) -> List[dict]:
-    module_specs = parse_modules_arg(modules_str)
-    loaded = load_ignorant_functions(module_specs)
-    return trio.run(run_checks, country_code, phone, loaded)
+def check_phones_sharded(
+    numbers: Iterable[PhoneNumber], modules_str: Optional[str] = None, **options: Any
+) -> Iterator[Tuple[PhoneNumber, List[dict]]]:
+    """Check numbers in a pool of worker processes; see :func:`lib.shard.check_sharded`."""
+    return check_sharded(PHONE_TARGET, numbers, modules_str, **options)
 
 
+def check_phone_sync(
+    country_code: str,
+    phone: str,
+    modules_str: Optional[str] = None,
+    scheduler: Optional[CheckScheduler] = None,
+    cache: Optional[ResultCache] = None,
+    lazy: bool = False,
+    module_timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    on_result: Optional[Callable[[List[dict]], None]] = None,
+    health: Optional[ModuleHealth] = None,
+    instrumentation: Optional[Instrumentation] = None,
+    retry: Optional[RetryPolicy] = None,
+    profile: Optional[ClientProfile] = None,
+) -> List[dict]:
+    """``phone`` may use separators, a ``+``/``00`` prefix or a national trunk 0."""
+    number = normalize_phone(phone, country_code)
+    loaded = checker.prepare_modules(PHONE_TARGET, modules_str, lazy, health, instrumentation)
+    return checker.run_check_sync(
+        PHONE_TARGET,
+        number,
+        loaded,
+        deadline=deadline,
+        on_result=on_result,
+        scheduler=scheduler,
+        cache=cache,
+        module_timeout=module_timeout,
+        health=health,
+        instrumentation=instrumentation,
+        retry=retry,
+        profile=profile,
+    )
+
+
+def _phone_record(number: PhoneNumber, row: Optional[str], results: List[dict]) -> dict:
+    return {"country_code": number[0], "phone": number[1], "input": row, "results": results}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Wsadowe sprawdzanie numerów telefonów (ignorant), wynik w formacie JSONL. "
+            "Linia wejścia: '+<kod kraju><numer>', '<kod kraju> <numer>' lub sam numer z --country"
+        )
+    )
+    add_batch_arguments(parser, DEFAULT_CONCURRENCY)
+    parser.add_argument("--country", default=None, help="Domyślny kod kraju, np. 48")
+    args = parse_batch_arguments(parser, argv)
+    return run_batch_cli(
+        PHONE_TARGET,
+        args,
+        lambda line: normalize_phone(line, args.country),
+        _phone_record,
+        lambda record: cache_identifier(str(record.get("country_code", "")), str(record.get("phone", ""))),
+    )
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
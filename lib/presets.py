@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import List, Optional, Sequence, Tuple
+
+from lib.checker import CheckerTarget, parse_modules_arg
+from lib.health import ModuleHealth
+
+
+PRESET_FAST = "fast"
+PRESET_HIGH_SIGNAL = "high-signal"
+PRESET_FULL = "full"
+PRESETS = (PRESET_FAST, PRESET_HIGH_SIGNAL, PRESET_FULL)
+DEFAULT_PRESET_SIZE = 15
+
+ModuleSpec = Tuple[str, str]
+
+
+def module_path(target: CheckerTarget, spec: ModuleSpec) -> str:
+    return f"{target.package}.modules.{spec[0]}"
+
+
+def specs_to_arg(specs: Sequence[ModuleSpec]) -> str:
+    """Inverse of :func:`lib.checker.parse_modules_arg` for explicit specs."""
+    return ",".join(f"{rel_path}:{func_name}" for rel_path, func_name in specs)
+
+
+def preset_module_specs(
+    target: CheckerTarget,
+    preset: str,
+    health: Optional[ModuleHealth] = None,
+    limit: int = DEFAULT_PRESET_SIZE,
+) -> List[ModuleSpec]:
+    """Module specs for a named preset, ranked from ``health`` statistics.
+
+    ``fast`` takes the healthy modules with the lowest median latency,
+    ``high-signal`` the ones with the highest success rate (ties broken by
+    latency). Modules without enough samples fill the remaining places in
+    discovery order. ``full`` is every discovered module.
+    """
+    if preset not in PRESETS:
+        raise ValueError(f"Nieznany preset modułów: '{preset}'")
+    specs = list(parse_modules_arg(target, None))
+    if preset == PRESET_FULL:
+        return specs
+    if health is None:
+        return specs[:limit]
+
+    ranked: List[Tuple[Tuple[float, float], ModuleSpec]] = []
+    unranked: List[ModuleSpec] = []
+    for spec in specs:
+        path = module_path(target, spec)
+        if not health.is_healthy(path):
+            continue
+        stats = health.stats(path)
+        if stats.samples < health.min_samples or stats.p50 is None:
+            unranked.append(spec)
+        elif preset == PRESET_FAST:
+            ranked.append(((stats.p50, -stats.success_rate), spec))
+        else:
+            ranked.append(((-stats.success_rate, stats.p50), spec))
+    ranked.sort(key=lambda item: item[0])
+    return ([spec for _, spec in ranked] + unranked)[:limit]
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Sequence
+
+import trio
+
+
+DEFAULT_DOMAIN_RATE = 1.0
+DEFAULT_DOMAIN_BURST = 2.0
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_MIN_CONCURRENCY = 2
+DEFAULT_INCREASE_AFTER = 10
+DEFAULT_DECREASE_COOLDOWN = 5.0
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_BASE_DELAY = 1.0
+DEFAULT_RETRY_MAX_DELAY = 60.0
+DEFAULT_RETRY_JITTER = 0.5
+
+
+def is_rate_limited(results: Sequence[dict]) -> bool:
+    return any(item.get("rateLimit") is True for item in results)
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens per second, holding up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        if rate <= 0:
+            raise ValueError("rate musi być > 0")
+        if burst < 1:
+            raise ValueError("burst musi być >= 1")
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._updated_at: Optional[float] = None
+        # Waiters queue up on the lock, so tokens are handed out in FIFO order
+        self._lock = trio.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self._updated_at is not None:
+            elapsed = now - self._updated_at
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill(trio.current_time())
+            if self._tokens < 1.0:
+                await trio.sleep((1.0 - self._tokens) / self.rate)
+                self._refill(trio.current_time())
+            self._tokens -= 1.0
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit with additive increase / multiplicative decrease.
+
+    The limit is halved when a check reports a rate limit (at most once per
+    ``decrease_cooldown`` seconds) and raised by one after ``increase_after``
+    consecutive clean checks.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = DEFAULT_MIN_CONCURRENCY,
+        maximum: int = DEFAULT_MAX_CONCURRENCY,
+        increase_after: int = DEFAULT_INCREASE_AFTER,
+        decrease_cooldown: float = DEFAULT_DECREASE_COOLDOWN,
+    ) -> None:
+        if minimum < 1 or maximum < minimum:
+            raise ValueError("Nieprawidłowe granice współbieżności")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase_after = increase_after
+        self.decrease_cooldown = decrease_cooldown
+        self._limiter = trio.CapacityLimiter(max(minimum, min(maximum, initial)))
+        self._clean_streak = 0
+        self._last_decrease: Optional[float] = None
+
+    @property
+    def limit(self) -> int:
+        return int(self._limiter.total_tokens)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        async with self._limiter:
+            yield
+
+    def on_success(self) -> None:
+        self._clean_streak += 1
+        if self._clean_streak >= self.increase_after:
+            self._clean_streak = 0
+            if self.limit < self.maximum:
+                self._limiter.total_tokens = self.limit + 1
+
+    def on_rate_limit(self) -> None:
+        self._clean_streak = 0
+        now = trio.current_time()
+        if self._last_decrease is not None and now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self._limiter.total_tokens = max(self.minimum, self.limit // 2)
+
+
+class CheckScheduler:
+    """Per-domain token buckets combined with a global adaptive concurrency cap.
+
+    Domains are keyed on ``LoadedModule.module_path``; ``domain_rates`` overrides
+    the default rate for selected modules. A task first waits for its domain's
+    token and only then takes a global slot, so throttled domains do not hold slots.
+    """
+
+    def __init__(
+        self,
+        rate_per_domain: float = DEFAULT_DOMAIN_RATE,
+        burst_per_domain: float = DEFAULT_DOMAIN_BURST,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        min_concurrency: int = DEFAULT_MIN_CONCURRENCY,
+        initial_concurrency: Optional[int] = None,
+        domain_rates: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.rate_per_domain = rate_per_domain
+        self.burst_per_domain = burst_per_domain
+        self.domain_rates: Dict[str, float] = dict(domain_rates or {})
+        self.concurrency = AdaptiveConcurrency(
+            initial_concurrency if initial_concurrency is not None else max_concurrency,
+            minimum=min_concurrency,
+            maximum=max_concurrency,
+        )
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def _bucket_for(self, domain: str) -> TokenBucket:
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            rate = self.domain_rates.get(domain, self.rate_per_domain)
+            bucket = TokenBucket(rate, self.burst_per_domain)
+            self._buckets[domain] = bucket
+        return bucket
+
+    @asynccontextmanager
+    async def slot(self, domain: str) -> AsyncIterator[None]:
+        await self._bucket_for(domain).acquire()
+        async with self.concurrency.slot():
+            yield
+
+    def report(self, domain: str, results: Sequence[dict]) -> None:
+        if is_rate_limited(results):
+            self.concurrency.on_rate_limit()
+        elif results and not any(item.get("error") for item in results):
+            self.concurrency.on_success()
+
+
+def needs_retry(results: Sequence[dict]) -> bool:
+    """True for rate-limited, failed or timed-out module results."""
+    if not results:
+        return True
+    return any(
+        item.get("rateLimit") is True or item.get("error") or item.get("status") == "timeout"
+        for item in results
+    )
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter for retrying single (identifier, module) calls.
+
+    The delay grows with the number of consecutive failed calls to the same domain
+    (``LoadedModule.module_path``), so a domain that keeps rate limiting is backed
+    off for all identifiers at once, and resets after its first clean result.
+    ``jitter`` is the fraction of the delay that is randomized.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = DEFAULT_RETRY_BASE_DELAY,
+        max_delay: float = DEFAULT_RETRY_MAX_DELAY,
+        jitter: float = DEFAULT_RETRY_JITTER,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        if max_retries < 0:
+            raise ValueError("max_retries musi być >= 0")
+        if not 0.0 <= jitter <= 1.0:
+            raise ValueError("jitter musi być w przedziale [0, 1]")
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._rng = rng or random.Random()
+        self._failures: Dict[str, int] = {}
+
+    def delay_for(self, domain: str) -> float:
+        failures = max(1, self._failures.get(domain, 0))
+        delay = min(self.max_delay, self.base_delay * 2 ** (failures - 1))
+        return delay * (1.0 - self.jitter * self._rng.random())
+
+    def report(self, domain: str, results: Sequence[dict]) -> bool:
+        """Record an outcome for ``domain``; returns whether it should be retried."""
+        if needs_retry(results):
+            self._failures[domain] = self._failures.get(domain, 0) + 1
+            return True
+        self._failures.pop(domain, None)
+        return False
+
+    async def wait(self, domain: str) -> None:
+        await trio.sleep(self.delay_for(domain))
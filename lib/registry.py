@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import importlib
+import importlib.metadata
+import json
+import os
+import pkgutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import trio
+from trio.lowlevel import RunVar
+
+
+CACHE_DIR_ENV = "TOOLS_CACHE_DIR"
+MANIFEST_FORMAT = 1
+# Concurrent imports only interleave under the GIL and all finish late; a couple
+# at a time, in request order, gets the first modules to their HTTP calls early
+RESOLVE_CONCURRENCY = 2
+
+_RESOLVE_LIMITER: RunVar = RunVar("resolve_limiter")
+
+
+def _resolve_limiter() -> trio.CapacityLimiter:
+    """One limiter per event loop, shared by every lazy resolve in it."""
+    try:
+        return _RESOLVE_LIMITER.get()
+    except LookupError:
+        limiter = trio.CapacityLimiter(RESOLVE_CONCURRENCY)
+        _RESOLVE_LIMITER.set(limiter)
+        return limiter
+
+
+@dataclass
+class LoadedModule:
+    module_path: str
+    function_name: str
+    function: Callable[..., object]
+
+
+class LazyLoadedModule(LoadedModule):
+    """LoadedModule whose module is imported on first use instead of up front.
+
+    ``await resolve()`` imports in a worker thread, so modules that are already
+    resolved can start their HTTP requests while the rest are still importing.
+    At most :data:`RESOLVE_CONCURRENCY` imports run at once, first come first served.
+    """
+
+    def __init__(self, module_path: str, function_name: str) -> None:
+        self.module_path = module_path
+        self.function_name = function_name
+        self._function: Optional[Callable[..., object]] = None
+
+    def __repr__(self) -> str:
+        state = "resolved" if self.resolved else "pending"
+        return f"LazyLoadedModule({self.module_path!r}, {self.function_name!r}, {state})"
+
+    @property
+    def resolved(self) -> bool:
+        return self._function is not None
+
+    @property
+    def function(self) -> Callable[..., object]:
+        if self._function is None:
+            self._function = _import_function(self.module_path, self.function_name)
+        return self._function
+
+    async def resolve(self) -> Callable[..., object]:
+        if self._function is None:
+            self._function = await trio.to_thread.run_sync(
+                _import_function, self.module_path, self.function_name, limiter=_resolve_limiter()
+            )
+        return self._function
+
+
+# package -> discovered (module_path, function_name) specs
+_DISCOVERED: Dict[str, List[Tuple[str, str]]] = {}
+# (full module path, function name) -> loaded module, or None if the import failed
+_LOADED: Dict[Tuple[str, str], Optional[LoadedModule]] = {}
+_LAZY: Dict[Tuple[str, str], LazyLoadedModule] = {}
+
+
+def cache_dir() -> Path:
+    configured = os.environ.get(CACHE_DIR_ENV)
+    if configured:
+        return Path(configured)
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "tools"
+
+
+def _package_version(package: str) -> Optional[str]:
+    try:
+        return importlib.metadata.version(package)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def _manifest_path(package: str) -> Path:
+    return cache_dir() / f"{package}-modules.json"
+
+
+def _read_manifest(package: str, version: str) -> Optional[List[Tuple[str, str]]]:
+    try:
+        with open(_manifest_path(package), "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if data.get("format") != MANIFEST_FORMAT or data.get("version") != version:
+        return None
+    return [(str(rel), str(func)) for rel, func in data.get("modules", [])]
+
+
+def _write_manifest(package: str, version: str, specs: List[Tuple[str, str]]) -> None:
+    path = _manifest_path(package)
+    payload = {"format": MANIFEST_FORMAT, "package": package, "version": version, "modules": specs}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        # The manifest is only an optimisation; a read-only home must not break lookups
+        pass
+
+
+def _walk_module_specs(package: str) -> List[Tuple[str, str]]:
+    try:
+        root_pkg = importlib.import_module(package)
+    except Exception:
+        return []
+
+    search_path = getattr(root_pkg, "__path__", None)
+    if not search_path:
+        return []
+
+    discovered: List[Tuple[str, str]] = []
+    prefix = f"{package}.modules."
+    for modinfo in pkgutil.walk_packages(search_path, prefix=root_pkg.__name__ + "."):
+        full_name = modinfo.name
+        if modinfo.ispkg:
+            continue
+        if not full_name.startswith(prefix):
+            continue
+        rel_name = full_name[len(prefix) :]
+        func_name = rel_name.split(".")[-1]
+        if func_name:
+            discovered.append((rel_name, func_name))
+    return discovered
+
+
+def discover_module_specs(package: str) -> List[Tuple[str, str]]:
+    """Return (module_path, function_name) specs for ``<package>.modules``.
+
+    Results are memoised in-process and persisted in an on-disk manifest keyed on
+    the installed package version, so the package tree is walked once per upgrade.
+    """
+    cached = _DISCOVERED.get(package)
+    if cached is not None:
+        return list(cached)
+
+    version = _package_version(package)
+    specs = _read_manifest(package, version) if version else None
+    if specs is None:
+        specs = _walk_module_specs(package)
+        if version and specs:
+            _write_manifest(package, version, specs)
+
+    if specs:
+        _DISCOVERED[package] = specs
+    return list(specs)
+
+
+def load_module_function(full_module: str, func_name: str) -> Optional[LoadedModule]:
+    """Import ``full_module`` and return its ``func_name`` wrapped in a LoadedModule.
+
+    Both successes and failures are remembered, so each module is imported at most
+    once per process.
+    """
+    key = (full_module, func_name)
+    if key in _LOADED:
+        return _LOADED[key]
+
+    loaded: Optional[LoadedModule] = None
+    try:
+        mod = importlib.import_module(full_module)
+        loaded = LoadedModule(
+            module_path=full_module,
+            function_name=func_name,
+            function=getattr(mod, func_name),
+        )
+    except Exception:
+        loaded = None
+
+    _LOADED[key] = loaded
+    return loaded
+
+
+def _import_function(full_module: str, func_name: str) -> Callable[..., object]:
+    loaded = load_module_function(full_module, func_name)
+    if loaded is None:
+        raise ImportError(f"Nie udało się zaimportować {full_module}:{func_name}")
+    return loaded.function
+
+
+def lazy_module_function(full_module: str, func_name: str) -> LoadedModule:
+    """Return an already imported module if available, otherwise a LazyLoadedModule."""
+    key = (full_module, func_name)
+    loaded = _LOADED.get(key)
+    if loaded is not None:
+        return loaded
+    lazy = _LAZY.get(key)
+    if lazy is None:
+        lazy = LazyLoadedModule(full_module, func_name)
+        _LAZY[key] = lazy
+    return lazy
+
+
+async def resolve_function(loaded_module: LoadedModule) -> Callable[..., object]:
+    if isinstance(loaded_module, LazyLoadedModule):
+        return await loaded_module.resolve()
+    return loaded_module.function
+
+
+def clear_caches(remove_manifests: bool = False) -> None:
+    if remove_manifests:
+        for package in list(_DISCOVERED):
+            try:
+                _manifest_path(package).unlink()
+            except OSError:
+                pass
+    _DISCOVERED.clear()
+    _LOADED.clear()
+    _LAZY.clear()
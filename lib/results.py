@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from enum import IntEnum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Keys stored in dedicated fields; other non-null keys a module reports go to ``extra``
+_CORE_KEYS = frozenset({"name", "domain", "exists", "rateLimit", "status", "error"})
+
+
+class Flag(IntEnum):
+    FALSE = 0
+    TRUE = 1
+    UNKNOWN = 2
+
+
+class Status(IntEnum):
+    OK = 0
+    RATE_LIMITED = 1
+    ERROR = 2
+    TIMEOUT = 3
+
+
+# Members as globals for the per-result hot paths: attribute access on an Enum
+# class costs over 10x a global lookup
+_TRUE, _FALSE, _UNKNOWN = Flag.TRUE, Flag.FALSE, Flag.UNKNOWN
+_OK, _RATE_LIMITED, _ERROR, _TIMEOUT = Status.OK, Status.RATE_LIMITED, Status.ERROR, Status.TIMEOUT
+_FLAG_WORDS = {"true": _TRUE, "yes": _TRUE, "1": _TRUE, "false": _FALSE, "no": _FALSE, "0": _FALSE}
+
+
+def parse_flag(value: object) -> Flag:
+    """Map the booleans and "true"/"Unknown"-style strings modules report to a :class:`Flag`."""
+    if value is True:
+        return _TRUE
+    if value is False:
+        return _FALSE
+    if isinstance(value, str):
+        return _FLAG_WORDS.get(value.strip().lower(), _UNKNOWN)
+    return _UNKNOWN
+
+
+def _flag_value(flag: Flag) -> object:
+    if flag is Flag.TRUE:
+        return True
+    if flag is Flag.FALSE:
+        return False
+    return "Unknown"
+
+
+def _intern(value: object) -> str:
+    return sys.intern(str(value)) if value else ""
+
+
+class CheckResult:
+    """One module result for one identifier, with normalized fields.
+
+    ``name``/``domain``/``module`` are interned, so millions of records share a
+    handful of strings; module-specific keys are kept in ``extra``.
+    """
+
+    __slots__ = ("identifier", "module", "name", "domain", "exists", "rate_limit", "status", "error", "extra")
+
+    def __init__(
+        self,
+        identifier: str,
+        module: str,
+        name: str,
+        domain: str,
+        exists: Flag = Flag.UNKNOWN,
+        rate_limit: Flag = Flag.UNKNOWN,
+        status: Status = Status.OK,
+        error: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.identifier = identifier
+        self.module = module
+        self.name = name
+        self.domain = domain
+        self.exists = exists
+        self.rate_limit = rate_limit
+        self.status = status
+        self.error = error
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, item: dict, identifier: str = "", module: str = "") -> "CheckResult":
+        return cls(identifier, *_parse_item(item, module))
+
+    def to_dict(self) -> dict:
+        """Back to the dict layout the checker modules produce."""
+        item: Dict[str, Any] = {"name": self.name, "domain": self.domain}
+        if self.extra:
+            item.update(self.extra)
+        item["rateLimit"] = _flag_value(self.rate_limit)
+        item["exists"] = _flag_value(self.exists)
+        if self.error:
+            item["error"] = self.error
+        if self.status is Status.TIMEOUT:
+            item["status"] = "timeout"
+        return item
+
+    def __repr__(self) -> str:
+        return (
+            f"CheckResult({self.identifier!r}, {self.name!r}, exists={self.exists.name}, "
+            f"status={self.status.name})"
+        )
+
+
+def _parse_item(
+    item: dict, module: str
+) -> Tuple[str, str, str, Flag, Flag, Status, Optional[str], Optional[Dict[str, Any]]]:
+    """``CheckResult`` fields after the identifier, in constructor order."""
+    rate_limit = parse_flag(item.get("rateLimit"))
+    error = item.get("error") or None
+    if item.get("status") == "timeout":
+        status = _TIMEOUT
+    elif error:
+        status = _ERROR
+    elif rate_limit is _TRUE:
+        status = _RATE_LIMITED
+    else:
+        status = _OK
+    extra = {k: v for k, v in item.items() if k not in _CORE_KEYS and v is not None}
+    domain = item.get("domain")
+    return (
+        _intern(module or domain),
+        _intern(item.get("name")),
+        _intern(domain),
+        parse_flag(item.get("exists")),
+        rate_limit,
+        status,
+        str(error) if error else None,
+        extra or None,
+    )
+
+
+def records_from_results(identifier: str, results: Iterable[dict], module: str = "") -> List[CheckResult]:
+    return [CheckResult.from_dict(item, identifier, module) for item in results]
+
+
+class ResultBatch:
+    """Column-oriented container for large numbers of :class:`CheckResult` records.
+
+    Enum columns are byte arrays and string columns hold interned strings, so a
+    batch costs a few pointers per result. Filtering, ordering and counting run
+    on NumPy views of the byte arrays and return index arrays; :meth:`to_frame`
+    hands the columns to pandas (if installed).
+    """
+
+    def __init__(self) -> None:
+        self.identifiers: List[str] = []
+        self.modules: List[str] = []
+        self.names: List[str] = []
+        self.domains: List[str] = []
+        self.exists = array("b")
+        self.rate_limits = array("b")
+        self.statuses = array("b")
+        self.errors: Dict[int, str] = {}
+        self.extras: Dict[int, Dict[str, Any]] = {}
+        # Identical ``extra`` dicts (e.g. {"method": "register"}) are stored once
+        self._shared_extras: Dict[Tuple[Tuple[str, Any], ...], Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def append(self, record: CheckResult) -> None:
+        self._append(
+            record.identifier,
+            record.module,
+            record.name,
+            record.domain,
+            record.exists,
+            record.rate_limit,
+            record.status,
+            record.error,
+            record.extra,
+        )
+
+    def _append(
+        self,
+        identifier: str,
+        module: str,
+        name: str,
+        domain: str,
+        exists: Flag,
+        rate_limit: Flag,
+        status: Status,
+        error: Optional[str],
+        extra: Optional[Dict[str, Any]],
+    ) -> None:
+        index = len(self.names)
+        self.identifiers.append(identifier)
+        self.modules.append(module)
+        self.names.append(name)
+        self.domains.append(domain)
+        self.exists.append(exists)
+        self.rate_limits.append(rate_limit)
+        self.statuses.append(status)
+        if error:
+            self.errors[index] = error
+        if extra:
+            self.extras[index] = self._share_extra(extra)
+
+    def _share_extra(self, extra: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            key = tuple(extra.items())
+            return self._shared_extras.setdefault(key, extra)
+        except TypeError:
+            return extra
+
+    def extend(self, records: Iterable[CheckResult]) -> None:
+        for record in records:
+            self.append(record)
+
+    def add_results(self, identifier: str, results: Iterable[dict], module: str = "") -> None:
+        # Straight into the columns, without a CheckResult per item
+        for item in results:
+            self._append(identifier, *_parse_item(item, module))
+
+    @classmethod
+    def from_results(cls, identifier: str, results: Iterable[dict]) -> "ResultBatch":
+        batch = cls()
+        batch.add_results(identifier, results)
+        return batch
+
+    def record(self, index: int) -> CheckResult:
+        return CheckResult(
+            identifier=self.identifiers[index],
+            module=self.modules[index],
+            name=self.names[index],
+            domain=self.domains[index],
+            exists=Flag(self.exists[index]),
+            rate_limit=Flag(self.rate_limits[index]),
+            status=Status(self.statuses[index]),
+            error=self.errors.get(index),
+            extra=self.extras.get(index),
+        )
+
+    def __iter__(self) -> Iterator[CheckResult]:
+        for index in range(len(self)):
+            yield self.record(index)
+
+    def take(self, indices: Sequence[int]) -> "ResultBatch":
+        batch = ResultBatch()
+        for index in indices:
+            batch.append(self.record(int(index)))
+        return batch
+
+    @staticmethod
+    def _view(column: array) -> np.ndarray:
+        # Zero-copy; the view must not outlive the call, since an exported
+        # buffer blocks further appends to the array
+        return np.frombuffer(column, dtype=np.int8) if len(column) else np.zeros(0, dtype=np.int8)
+
+    def where_exists(self, *flags: Flag) -> np.ndarray:
+        return np.flatnonzero(np.isin(self._view(self.exists), [int(flag) for flag in flags]))
+
+    def order_by_exists(self, indices: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Indices with confirmed accounts first; the sort is stable within each group."""
+        if indices is None:
+            indices = np.arange(len(self))
+        indices = np.asarray(indices, dtype=np.intp)
+        not_found = self._view(self.exists)[indices] != Flag.TRUE
+        return indices[np.argsort(not_found, kind="stable")]
+
+    def count_by_status(self) -> Dict[Status, int]:
+        counts = np.bincount(self._view(self.statuses), minlength=len(Status))
+        return {status: int(counts[status]) for status in Status}
+
+    def to_dicts(self) -> List[dict]:
+        return [record.to_dict() for record in self]
+
+    def to_frame(self) -> Any:
+        try:
+            import pandas as pd
+        except ImportError as exc:
+            raise RuntimeError("Eksport do DataFrame wymaga pakietu 'pandas'") from exc
+
+        n = len(self)
+        return pd.DataFrame(
+            {
+                "identifier": pd.Categorical(self.identifiers),
+                "module": pd.Categorical(self.modules),
+                "name": pd.Categorical(self.names),
+                "domain": pd.Categorical(self.domains),
+                "exists": pd.Categorical.from_codes(list(self.exists), [f.name.lower() for f in Flag]),
+                "rate_limit": pd.Categorical.from_codes(list(self.rate_limits), [f.name.lower() for f in Flag]),
+                "status": pd.Categorical.from_codes(list(self.statuses), [s.name.lower() for s in Status]),
+                "error": pd.Series([self.errors.get(i) for i in range(n)], dtype="object"),
+            }
+        )
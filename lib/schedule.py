@@ -1,131 +1,641 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+import math
+import os
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple, Union
 
+import numpy as np
 
-def optimize_schedule(
-    preferences: Dict[str, Dict[str, int]]
-) -> Tuple[Dict[str, str], int]:
-    """
-    Optimize duty schedule using OR-Tools CP-SAT.
 
-    Input structure:
-      preferences[person][day] = score in [0..10]
+SCORE_WEIGHT = 10
+DIVERSITY_WEIGHT = 1
+DEFAULT_TIME_LIMIT = 10.0
 
-    Hard constraints:
-      - exactly one person per day
-      - if score == 0, that person cannot work that day
-      - optionally enforce near-equal load when feasible (each works ~równomiernie)
+BACKEND_AUTO = "auto"
+BACKEND_CP_SAT = "cp-sat"
+BACKEND_MIN_COST_FLOW = "min-cost-flow"
+BACKENDS = (BACKEND_AUTO, BACKEND_CP_SAT, BACKEND_MIN_COST_FLOW)
 
-    Objective (lexicographically approximated in single linear objective):
-      - primary: maximize total sum of assigned scores
-      - secondary: maximize liczba osób, które mają co najmniej 1 dyżur (premia za zróżnicowanie)
+# Slot keys are "<day>" (one duty per day) or "<day>/<shift>"
+SLOT_SEPARATOR = "/"
 
-    Returns:
-      (assignments, total_score)
-        assignments: dict of {day: person}
-        total_score: int objective value
+PreviousSchedule = Mapping[str, Union[str, Sequence[str]]]
+
+
+def slot_key(day: str, shift: Optional[str] = None) -> str:
+    return f"{day}{SLOT_SEPARATOR}{shift}" if shift else day
+
+
+def slot_day(slot: str) -> str:
+    return slot.split(SLOT_SEPARATOR, 1)[0]
+
+
+def slot_shift(slot: str) -> str:
+    """Shift name of a slot, ``""`` for a plain day."""
+    return slot.partition(SLOT_SEPARATOR)[2]
+
+
+@dataclass(frozen=True)
+class SolverConfig:
+    """CP-SAT search settings.
+
+    ``workers=None`` uses every CPU core. ``relative_gap`` stops the search once
+    the solution is provably within that fraction of the optimum. With
+    ``deterministic=True`` the search is interleaved and ``time_limit`` counts
+    CP-SAT's deterministic time instead of wall-clock seconds, so the same input
+    and ``seed`` always give the same schedule. ``backend`` picks the solver, see
+    :func:`select_backend`; the search settings only apply to CP-SAT.
     """
 
+    workers: Optional[int] = None
+    time_limit: float = DEFAULT_TIME_LIMIT
+    relative_gap: float = 0.0
+    seed: int = 0
+    deterministic: bool = False
+    backend: str = BACKEND_AUTO
+
+    def apply(self, parameters: Any) -> None:
+        parameters.num_workers = self.workers or os.cpu_count() or 1
+        parameters.random_seed = self.seed
+        if self.relative_gap > 0:
+            parameters.relative_gap_limit = self.relative_gap
+        if self.deterministic:
+            parameters.interleave_search = True
+            parameters.max_deterministic_time = self.time_limit
+        else:
+            parameters.max_time_in_seconds = self.time_limit
+
+
+@dataclass
+class SolveProgress:
+    """Objective and bound of an improving solution found during the search."""
+
+    objective: float
+    best_bound: float
+    wall_time: float
+
+
+@dataclass
+class ScheduleResult:
+    """``roster`` maps every slot to the people staffing it."""
+
+    roster: Dict[str, List[str]]
+    total_score: int
+    status: str
+    objective: float
+    best_bound: float
+    wall_time: float
+    changed_slots: int = 0
+    windows: int = 1
+
+    @property
+    def assignments(self) -> Dict[str, str]:
+        """``{slot: person}``; slots staffed by several people list them comma-separated."""
+        return {slot: ", ".join(people) for slot, people in self.roster.items()}
+
+    @property
+    def optimal(self) -> bool:
+        return self.status == "OPTIMAL"
+
+    @property
+    def gap(self) -> float:
+        """Relative distance between the objective and the best proven bound.
+
+        NaN for rolling-horizon results, which have no global bound.
+        """
+        if self.optimal:
+            return 0.0
+        if math.isnan(self.best_bound):
+            return math.nan
+        return abs(self.best_bound - self.objective) / max(1.0, abs(self.objective))
+
+
+def _load_ortools(module: str) -> Any:
     try:
         import importlib
-        cp_model_mod = importlib.import_module("ortools.sat.python.cp_model")
+        return importlib.import_module(module)
     except Exception as exc:  # pragma: no cover
         raise RuntimeError(
             "Pakiet 'ortools' nie jest dostępny. Zainstaluj go (np. pip install ortools)."
         ) from exc
 
-    if not preferences:
-        return {}, 0
 
-    persons: List[str] = sorted(preferences.keys())
+def _load_cp_model() -> Any:
+    return _load_ortools("ortools.sat.python.cp_model")
+
+
+def _previous_sets(previous: Optional[PreviousSchedule]) -> Dict[str, Set[str]]:
+    if not previous:
+        return {}
+    return {slot: {people} if isinstance(people, str) else set(people) for slot, people in previous.items()}
+
+
+@dataclass
+class ScheduleProblem:
+    """Preferences as a dense ``(persons, slots)`` score matrix.
+
+    A score of 0 means the person cannot work that slot. Each slot needs
+    ``headcount[s]`` people and belongs to calendar day ``days[slot_days[s]]``;
+    nobody works two slots of the same day. ``committed[i]`` counts days person
+    ``i`` already works outside this problem (earlier rolling-horizon windows)
+    and is included in the load balance.
+    """
+
+    persons: List[str]
+    slots: List[str]
+    scores: np.ndarray
+    headcount: np.ndarray
+    days: List[str]
+    slot_days: np.ndarray
+    committed: np.ndarray
+
+    @classmethod
+    def from_preferences(
+        cls,
+        preferences: Dict[str, Dict[str, int]],
+        headcount: Optional[Mapping[str, int]] = None,
+        committed: Optional[Mapping[str, int]] = None,
+    ) -> "ScheduleProblem":
+        persons: List[str] = sorted(preferences.keys())
+        # Collect all slots across persons (defensive)
+        slots_set = set()
+        for slots_map in preferences.values():
+            slots_set.update(slots_map.keys())
+        slots: List[str] = sorted(slots_set)
+
+        slot_index = {s: j for j, s in enumerate(slots)}
+        scores = np.zeros((len(persons), len(slots)), dtype=np.int64)
+        for i, p in enumerate(persons):
+            slots_map = preferences[p]
+            if slots_map:
+                cols = np.fromiter((slot_index[s] for s in slots_map), dtype=np.intp, count=len(slots_map))
+                scores[i, cols] = np.fromiter(
+                    (int(v) for v in slots_map.values()), dtype=np.int64, count=len(slots_map)
+                )
+
+        slot_day_names = [slot_day(s) for s in slots]
+        days: List[str] = sorted(set(slot_day_names))
+        day_index = {d: j for j, d in enumerate(days)}
+        headcount = headcount or {}
+        committed = committed or {}
+        return cls(
+            persons=persons,
+            slots=slots,
+            scores=scores,
+            headcount=np.array([int(headcount.get(s, 1)) for s in slots], dtype=np.int64),
+            days=days,
+            slot_days=np.array([day_index[d] for d in slot_day_names], dtype=np.int64),
+            committed=np.array([int(committed.get(p, 0)) for p in persons], dtype=np.int64),
+        )
+
+    @property
+    def allowed(self) -> np.ndarray:
+        return self.scores != 0
+
+    @property
+    def multi_shift(self) -> bool:
+        return len(self.slots) > len(self.days)
 
-    # Collect all days across persons (defensive)
-    days_set = set()
-    for days_map in preferences.values():
-        days_set.update(days_map.keys())
-    days: List[str] = sorted(days_set)
+    def check_coverage(self) -> None:
+        short = np.flatnonzero(self.allowed.sum(axis=0) < self.headcount)
+        if short.size:
+            slot = self.slots[short[0]]
+            raise RuntimeError(f"{slot}: za mało osób może pełnić dyżur (potrzeba {self.headcount[short[0]]}).")
+
+    def workable_days(self) -> np.ndarray:
+        """Number of days each person has at least one allowed slot."""
+        person_index, slot_index = np.nonzero(self.allowed)
+        day_allowed = np.zeros((len(self.persons), len(self.days)), dtype=bool)
+        day_allowed[person_index, self.slot_days[slot_index]] = True
+        return day_allowed.sum(axis=1)
+
+    def load_bounds(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Per-person (min, max) number of slots, or None when loads are left free.
+
+        Loads are kept at ``base..base+1`` (``base = slots to staff // persons``,
+        committed days included) when everyone can reach ``base``.
+        """
+        if not self.persons:
+            return None
+        units = int(self.headcount.sum())
+        workable = self.workable_days()
+        base = (units + int(self.committed.sum())) // len(self.persons)
+        if not bool((self.committed + workable >= base).all()):
+            return None
+        low = np.maximum(base - self.committed, 0)
+        high = np.maximum(np.minimum(base + 1 - self.committed, workable), low)
+        if not int(low.sum()) <= units <= int(high.sum()):
+            return None
+        return low, high
+
+    def pair_weights(
+        self,
+        person_index: np.ndarray,
+        slot_index: np.ndarray,
+        previous: Optional[PreviousSchedule] = None,
+        stability_weight: int = 0,
+    ) -> np.ndarray:
+        """Objective weight of every (person, slot) pair: score plus the stability bonus."""
+        weights = SCORE_WEIGHT * self.scores[person_index, slot_index]
+        if previous and stability_weight:
+            weights = weights + SCORE_WEIGHT * stability_weight * self.previous_mask(person_index, slot_index, previous)
+        return weights
+
+    def previous_mask(self, person_index: np.ndarray, slot_index: np.ndarray, previous: PreviousSchedule) -> np.ndarray:
+        """1 for every pair that matches the previous schedule, 0 otherwise."""
+        person_pos = {p: i for i, p in enumerate(self.persons)}
+        kept = np.zeros((len(self.persons), len(self.slots)), dtype=np.int64)
+        for j, people in enumerate(_previous_sets(previous).get(s, ()) for s in self.slots):
+            for p in people:
+                if p in person_pos:
+                    kept[person_pos[p], j] = 1
+        return kept[person_index, slot_index]
+
+
+def _group_bounds(keys: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Order of ``keys`` and start offsets of each key 0..size-1 in that order."""
+    order = np.argsort(keys, kind="stable")
+    return order, np.searchsorted(keys[order], np.arange(size + 1))
+
+
+@dataclass
+class ScheduleModel:
+    """CP-SAT model with one variable per allowed (person, slot) pair.
+
+    ``person_index[k]`` and ``slot_index[k]`` are the pair behind ``x[k]``; pairs
+    are in row-major order, so each person's variables are contiguous.
+    """
+
+    model: Any
+    person_index: np.ndarray
+    slot_index: np.ndarray
+    x: List[Any]
+    used: List[Any]
+
+
+def build_schedule_model(
+    problem: ScheduleProblem,
+    previous: Optional[PreviousSchedule] = None,
+    stability_weight: int = 0,
+) -> ScheduleModel:
+    """Build the CP-SAT model; ``previous`` (``{slot: person(s)}``) is the published schedule.
+
+    The previous schedule is added as a solution hint, and every slot that keeps
+    its previous person is worth ``stability_weight`` preference points.
+    """
+    cp_model_mod = _load_cp_model()
+    persons, slots = problem.persons, problem.slots
+    problem.check_coverage()
 
     model = cp_model_mod.CpModel()
+    person_index, slot_index = np.nonzero(problem.allowed)
 
-    # Decision variables: x[p, d] in {0,1}
-    x: Dict[Tuple[str, str], object] = {}
-    for p in persons:
-        for d in days:
-            score = int(preferences.get(p, {}).get(d, 0))
-            if score == 0:
-                # Forbidden assignment - keep a fixed 0 var to simplify constraints
-                x[(p, d)] = model.NewConstant(0)
-            else:
-                x[(p, d)] = model.NewBoolVar(f"x_{p}_{d}")
-
-    # Exactly one person per day
-    for d in days:
-        model.Add(sum(x[(p, d)] for p in persons) == 1)
-
-    # Load per person
-    loads: Dict[str, object] = {}
-    for p in persons:
-        loads[p] = model.NewIntVar(0, len(days), f"load_{p}")
-        model.Add(loads[p] == sum(x[(p, d)] for d in days))
-
-    # Try to keep loads balanced if feasible
-    total_days = len(days)
-    num_people = len(persons)
-    if num_people > 0:
-        base = total_days // num_people
-        remainder = total_days % num_people  # not used directly; we allow base..base+1
-        workable: Dict[str, int] = {
-            p: sum(1 for d in days if int(preferences.get(p, {}).get(d, 0)) > 0)
-            for p in persons
-        }
-        if all(workable[p] >= base for p in persons):
-            for p in persons:
-                ub = min(base + 1, workable[p])
-                model.Add(loads[p] >= base)
-                model.Add(loads[p] <= ub)
-
-    # Diversity variables: y_p == 1 if person works at least one day
-    used_vars: Dict[str, object] = {}
-    for p in persons:
-        used_vars[p] = model.NewBoolVar(f"used_{p}")
-        # load >= used ensures used can be 1 only if load >= 1
-        model.Add(loads[p] >= used_vars[p])
+    # Decision variables: x[k] == 1 if person_index[k] works slot_index[k]
+    x = [model.NewBoolVar(f"x_{persons[i]}_{slots[j]}") for i, j in zip(person_index.tolist(), slot_index.tolist())]
+
+    # Headcount per slot
+    by_slot, slot_starts = _group_bounds(slot_index, len(slots))
+    for j, needed in enumerate(problem.headcount.tolist()):
+        staff = [x[k] for k in by_slot[slot_starts[j]:slot_starts[j + 1]].tolist()]
+        if needed == 1:
+            model.AddExactlyOne(staff)
+        else:
+            model.Add(cp_model_mod.LinearExpr.Sum(staff) == needed)
+
+    # At most one slot per person and day
+    if problem.multi_shift:
+        person_day = person_index * len(problem.days) + problem.slot_days[slot_index]
+        order, starts = _group_bounds(person_day, len(persons) * len(problem.days))
+        for g in np.flatnonzero(np.diff(starts) > 1).tolist():
+            model.AddAtMostOne([x[k] for k in order[starts[g]:starts[g + 1]].tolist()])
+
+    # Load per person (pairs are grouped by person already). The explicit IntVars
+    # cost little to build and guide the single-worker search much better than
+    # using the sums directly.
+    person_starts = np.searchsorted(person_index, np.arange(len(persons) + 1))
+    loads = []
+    for i, p in enumerate(persons):
+        load = model.NewIntVar(0, len(problem.days), f"load_{p}")
+        model.Add(load == cp_model_mod.LinearExpr.Sum(x[person_starts[i]:person_starts[i + 1]]))
+        loads.append(load)
+
+    # Try to keep loads balanced if feasible: base..base+1 each
+    bounds = problem.load_bounds()
+    if bounds is not None:
+        for load, low, high in zip(loads, bounds[0].tolist(), bounds[1].tolist()):
+            model.AddLinearConstraint(load, low, high)
+
+    # Diversity variables: used[i] == 1 only if person i works at least one slot
+    used = [model.NewBoolVar(f"used_{p}") for p in persons]
+    for load, used_var in zip(loads, used):
+        model.Add(load >= used_var)
 
     # Objective: weighted sum (scores primary, diversity secondary)
-    score_weight = 10
-    diversity_weight = 1
-    objective_expr = []
-    for p in persons:
-        for d in days:
-            objective_expr.append(score_weight * int(preferences[p].get(d, 0)) * x[(p, d)])
-    objective_expr.append(diversity_weight * sum(used_vars.values()))
-    model.Maximize(sum(objective_expr))
+    weights = problem.pair_weights(person_index, slot_index, previous, stability_weight)
+    if previous:
+        kept = problem.previous_mask(person_index, slot_index, previous)
+        for var, hint in zip(x, kept.tolist()):
+            model.AddHint(var, hint)
+        hinted_people = set().union(*_previous_sets(previous).values())
+        for p, used_var in zip(persons, used):
+            model.AddHint(used_var, p in hinted_people)
+    model.Maximize(
+        cp_model_mod.LinearExpr.WeightedSum(x + used, weights.tolist() + [DIVERSITY_WEIGHT] * len(used))
+    )
+    return ScheduleModel(model, person_index, slot_index, x, used)
+
+
+def select_backend(config: SolverConfig) -> str:
+    """Solver for a schedule: ``auto`` prefers min-cost flow where it applies.
+
+    The headcounts, one slot per person and day, the load bounds, the diversity
+    bonus and the stability bonus all map onto a flow network (slots -> person-days
+    -> persons -> sink) with convex per-person costs, so min-cost flow finds the
+    exact optimum in polynomial time.
+    """
+    if config.backend not in BACKENDS:
+        raise ValueError(f"Nieznany solver harmonogramu: '{config.backend}'")
+    if config.backend == BACKEND_AUTO:
+        return BACKEND_MIN_COST_FLOW
+    return config.backend
+
+
+def _solve_min_cost_flow(
+    problem: ScheduleProblem,
+    previous: Optional[PreviousSchedule],
+    stability_weight: int,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Chosen ``(person_index, slot_index)`` pairs and the objective value."""
+    flow_mod = _load_ortools("ortools.graph.python.min_cost_flow")
+    problem.check_coverage()
+    num_persons, num_slots = len(problem.persons), len(problem.slots)
+    person_index, slot_index = np.nonzero(problem.allowed)
+    weights = problem.pair_weights(person_index, slot_index, previous, stability_weight)
+    ones = np.ones(len(person_index), dtype=np.int64)
+
+    # Nodes: slots 0..S-1 (supply = headcount), with several shifts a node per
+    # (person, day) that lets one unit through, then persons and the sink. A person
+    # absorbs its minimum load directly and sends the rest on to the sink.
+    if problem.multi_shift:
+        person_day = person_index * len(problem.days) + problem.slot_days[slot_index]
+        groups, pair_group = np.unique(person_day, return_inverse=True)
+        first_person = num_slots + len(groups)
+        group_nodes = num_slots + np.arange(len(groups))
+        tails = [slot_index, group_nodes]
+        heads = [num_slots + pair_group, first_person + groups // len(problem.days)]
+        capacities = [ones, np.ones(len(groups), dtype=np.int64)]
+        costs = [-weights, np.zeros(len(groups), dtype=np.int64)]
+    else:
+        first_person = num_slots
+        tails, heads, capacities, costs = [slot_index], [first_person + person_index], [ones], [-weights]
+    sink = first_person + num_persons
+
+    bounds = problem.load_bounds()
+    if bounds is None:
+        low, high = np.zeros(num_persons, dtype=np.int64), problem.workable_days()
+    else:
+        low, high = bounds
+    supplies = np.zeros(sink + 1, dtype=np.int64)
+    supplies[:num_slots] = problem.headcount
+    supplies[first_person:sink] = -low
+    supplies[sink] = -(int(problem.headcount.sum()) - int(low.sum()))
+
+    # Diversity bonus: persons with a minimum load always work, the others earn
+    # it on their first slot (a cheaper first unit keeps the costs convex)
+    person_nodes = first_person + np.arange(num_persons)
+    spare = high - low
+    bonus = (low == 0) & (spare >= 1)
+    rest = spare - bonus
+    constant = DIVERSITY_WEIGHT * int((low >= 1).sum())
+    tails += [person_nodes[bonus], person_nodes[rest > 0]]
+    heads += [np.full(int(bonus.sum()), sink), np.full(int((rest > 0).sum()), sink)]
+    capacities += [np.ones(int(bonus.sum()), dtype=np.int64), rest[rest > 0]]
+    costs += [np.full(int(bonus.sum()), -DIVERSITY_WEIGHT), np.zeros(int((rest > 0).sum()), dtype=np.int64)]
+
+    flow = flow_mod.SimpleMinCostFlow()
+    arcs = flow.add_arcs_with_capacity_and_unit_cost(
+        np.concatenate(tails), np.concatenate(heads), np.concatenate(capacities), np.concatenate(costs)
+    )
+    flow.set_nodes_supplies(np.arange(sink + 1), supplies)
+    if flow.solve() != flow.OPTIMAL:
+        raise RuntimeError("Nie znaleziono rozwiązania harmonogramu.")
+    chosen = np.flatnonzero(flow.flows(arcs[: len(person_index)]) == 1)
+    return person_index[chosen], slot_index[chosen], constant - flow.optimal_cost()
+
+
+def _solve_cp_sat(
+    problem: ScheduleProblem,
+    config: SolverConfig,
+    on_progress: Optional[Callable[[SolveProgress], None]],
+    previous: Optional[PreviousSchedule],
+    stability_weight: int,
+) -> Tuple[np.ndarray, np.ndarray, str, float, float]:
+    """Chosen pairs, status name, objective and best bound."""
+    cp_model_mod = _load_cp_model()
+    built = build_schedule_model(problem, previous, stability_weight)
 
     solver = cp_model_mod.CpSolver()
-    solver.parameters.max_time_in_seconds = 10.0
-    status = solver.Solve(model)
+    config.apply(solver.parameters)
+    if on_progress is not None:
+
+        class _Progress(cp_model_mod.CpSolverSolutionCallback):
+            def on_solution_callback(self) -> None:
+                on_progress(SolveProgress(self.ObjectiveValue(), self.BestObjectiveBound(), self.WallTime()))
+
+        status = solver.Solve(built.model, _Progress())
+    else:
+        status = solver.Solve(built.model)
 
     if status not in (cp_model_mod.OPTIMAL, cp_model_mod.FEASIBLE):
         raise RuntimeError("Nie znaleziono rozwiązania harmonogramu.")
 
-    assignments: Dict[str, str] = {}
-    total_score = 0
-    for d in days:
-        chosen_person = None
-        chosen_score = 0
-        for p in persons:
-            var = x[(p, d)]
-            if solver.Value(var) == 1:
-                chosen_person = p
-                chosen_score = int(preferences[p].get(d, 0))
-                break
-        if chosen_person is None:
-            # Shouldn't happen due to ==1 constraint, but guard anyway
-            raise RuntimeError(f"Dzień {d}: brak przypisanej osoby w rozwiązaniu.")
-        assignments[d] = chosen_person
-        total_score += chosen_score
-
-    return assignments, total_score
+    # Read all decision values at once instead of one solver.Value() call per pair
+    solution = np.asarray(solver.ResponseProto().solution)
+    var_indices = np.fromiter((var.Index() for var in built.x), dtype=np.intp, count=len(built.x))
+    chosen = np.flatnonzero(solution[var_indices] == 1)
+    return (
+        built.person_index[chosen],
+        built.slot_index[chosen],
+        solver.StatusName(status),
+        solver.ObjectiveValue(),
+        solver.BestObjectiveBound(),
+    )
+
+
+def _changed_slots(roster: Dict[str, List[str]], previous: Optional[PreviousSchedule]) -> int:
+    return sum(
+        1 for slot, people in _previous_sets(previous).items() if slot in roster and set(roster[slot]) != people
+    )
+
+
+def solve_schedule(
+    preferences: Dict[str, Dict[str, int]],
+    config: Optional[SolverConfig] = None,
+    on_progress: Optional[Callable[[SolveProgress], None]] = None,
+    previous: Optional[PreviousSchedule] = None,
+    stability_weight: int = 0,
+    headcount: Optional[Mapping[str, int]] = None,
+    committed: Optional[Mapping[str, int]] = None,
+) -> ScheduleResult:
+    """Like :func:`optimize_schedule`, with explicit solver settings and statistics.
+
+    ``on_progress`` is called from the solver for every improving solution.
+    Passing the last published schedule as ``previous`` warm-starts the CP-SAT
+    search after small preference edits; ``stability_weight`` > 0 additionally
+    prefers schedules that change as few slots as possible (with either backend).
+    ``headcount`` gives the number of people per slot (default 1).
+    """
+    config = config or SolverConfig()
+    backend = select_backend(config)
+
+    if not preferences:
+        return ScheduleResult({}, 0, "OPTIMAL", 0.0, 0.0, 0.0)
+
+    started = time.perf_counter()
+    problem = ScheduleProblem.from_preferences(preferences, headcount, committed)
+    if backend == BACKEND_MIN_COST_FLOW:
+        person_index, slot_index, objective = _solve_min_cost_flow(problem, previous, stability_weight)
+        status, best_bound = "OPTIMAL", float(objective)
+        if on_progress is not None:
+            on_progress(SolveProgress(float(objective), best_bound, time.perf_counter() - started))
+    else:
+        person_index, slot_index, status, objective, best_bound = _solve_cp_sat(
+            problem, config, on_progress, previous, stability_weight
+        )
+
+    roster: Dict[str, List[str]] = {slot: [] for slot in problem.slots}
+    for i, j in zip(person_index.tolist(), slot_index.tolist()):
+        roster[problem.slots[j]].append(problem.persons[i])
+    for j, slot in enumerate(problem.slots):
+        if len(roster[slot]) != problem.headcount[j]:
+            # Shouldn't happen due to the headcount constraint, but guard anyway
+            raise RuntimeError(f"{slot}: niepełna obsada w rozwiązaniu.")
+    total_score = int(problem.scores[person_index, slot_index].sum())
+
+    return ScheduleResult(
+        roster=roster,
+        total_score=total_score,
+        status=status,
+        objective=float(objective),
+        best_bound=best_bound,
+        wall_time=time.perf_counter() - started,
+        changed_slots=_changed_slots(roster, previous),
+    )
+
 
+def rolling_windows(days: Sequence[str], window_days: int, overlap_days: int) -> List[Tuple[int, int, int]]:
+    """``(start, end, commit_end)`` day offsets of each rolling-horizon window.
+
+    Days ``start..commit_end`` are fixed after the window is solved; the overlap
+    up to ``end`` is solved again as the beginning of the next window.
+    """
+    if window_days < 1 or not 0 <= overlap_days < window_days:
+        raise ValueError("Okno musi mieć co najmniej 1 dzień, a zakładka być krótsza od okna")
+    windows = []
+    start = 0
+    while True:
+        end = min(start + window_days, len(days))
+        if end == len(days):
+            windows.append((start, end, end))
+            return windows
+        windows.append((start, end, end - overlap_days))
+        start = end - overlap_days
+
+
+def solve_rolling(
+    preferences: Dict[str, Dict[str, int]],
+    window_days: int,
+    overlap_days: int = 0,
+    config: Optional[SolverConfig] = None,
+    previous: Optional[PreviousSchedule] = None,
+    stability_weight: int = 0,
+    headcount: Optional[Mapping[str, int]] = None,
+    on_window: Optional[Callable[[int, int], None]] = None,
+) -> ScheduleResult:
+    """Solve a long horizon as a sequence of overlapping windows of ``window_days`` days.
+
+    Each window is solved with all earlier windows fixed, and days worked there
+    count towards the load balance. The time limit is split evenly between the
+    windows. The result is not proven optimal for the whole horizon.
+    """
+    config = config or SolverConfig()
+    days = sorted({slot_day(slot) for slots_map in preferences.values() for slot in slots_map})
+    windows = rolling_windows(days, window_days, overlap_days)
+    if len(windows) == 1:
+        return solve_schedule(preferences, config, previous=previous, stability_weight=stability_weight, headcount=headcount)
+
+    started = time.perf_counter()
+    window_config = replace(config, time_limit=config.time_limit / len(windows))
+    roster: Dict[str, List[str]] = {}
+    committed: Dict[str, int] = {p: 0 for p in preferences}
+    for n, (start, end, commit_end) in enumerate(windows):
+        window, fixed = set(days[start:end]), set(days[start:commit_end])
+        window_preferences = {
+            p: {slot: score for slot, score in slots_map.items() if slot_day(slot) in window}
+            for p, slots_map in preferences.items()
+        }
+        result = solve_schedule(
+            window_preferences,
+            window_config,
+            previous=previous,
+            stability_weight=stability_weight,
+            headcount=headcount,
+            committed=committed,
+        )
+        for slot, people in result.roster.items():
+            if slot_day(slot) in fixed:
+                roster[slot] = people
+                for p in people:
+                    committed[p] += 1
+        if on_window is not None:
+            on_window(n + 1, len(windows))
+
+    roster = dict(sorted(roster.items()))
+    total_score = sum(int(preferences[p][slot]) for slot, people in roster.items() for p in people)
+    previous_sets = _previous_sets(previous)
+    kept = sum(1 for slot, people in roster.items() for p in people if p in previous_sets.get(slot, ()))
+    used = {p for people in roster.values() for p in people}
+    return ScheduleResult(
+        roster=roster,
+        total_score=total_score,
+        status="FEASIBLE",
+        objective=float(SCORE_WEIGHT * (total_score + stability_weight * kept) + DIVERSITY_WEIGHT * len(used)),
+        best_bound=math.nan,
+        wall_time=time.perf_counter() - started,
+        changed_slots=_changed_slots(roster, previous),
+        windows=len(windows),
+    )
+
+
+def optimize_schedule(
+    preferences: Dict[str, Dict[str, int]],
+    config: Optional[SolverConfig] = None,
+) -> Tuple[Dict[str, str], int]:
+    """
+    Optimize duty schedule using OR-Tools (min-cost flow or CP-SAT, see select_backend).
+
+    Input structure:
+      preferences[person][day] = score in [0..10]
+
+    Hard constraints:
+      - exactly one person per day
+      - if score == 0, that person cannot work that day
+      - optionally enforce near-equal load when feasible (each works ~równomiernie)
+
+    Objective (lexicographically approximated in single linear objective):
+      - primary: maximize total sum of assigned scores
+      - secondary: maximize liczba osób, które mają co najmniej 1 dyżur (premia za zróżnicowanie)
+
+    Returns:
+      (assignments, total_score)
+        assignments: dict of {day: person}
+        total_score: int objective value
+
+    Shifts and headcounts are handled by :func:`solve_schedule`, long horizons
+    by :func:`solve_rolling`.
+    """
 
+    result = solve_schedule(preferences, config)
+    return result.assignments, result.total_score
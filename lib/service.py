@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import trio
+
+from lib.checker import CheckEngine, CheckerTarget, prepare_modules
+from lib.registry import LoadedModule
+
+
+DEFAULT_MAX_ACTIVE_JOBS = 8
+# Finished jobs are kept this long so a page that reruns late still finds them
+DEFAULT_JOB_RETENTION = 3600.0
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+@dataclass
+class JobSnapshot:
+    """Copy of a job's state that is safe to read from any thread."""
+
+    job_id: str
+    target: str
+    identifier: Any
+    status: str
+    total: int
+    module_results: List[List[dict]]
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    @property
+    def done(self) -> int:
+        return len(self.module_results)
+
+    @property
+    def results(self) -> List[dict]:
+        return [item for module_out in self.module_results for item in module_out]
+
+
+@dataclass
+class _Job:
+    job_id: str
+    target: CheckerTarget
+    identifier: Any
+    modules: List[LoadedModule]
+    deadline: Optional[float]
+    status: str = JOB_QUEUED
+    module_results: List[List[dict]] = field(default_factory=list)
+    error: Optional[str] = None
+    finished_at: Optional[float] = None
+    finished_event: threading.Event = field(default_factory=threading.Event)
+
+
+class CheckService:
+    """Background thread running one persistent trio loop and one :class:`CheckEngine`.
+
+    Lookups are submitted from any thread (e.g. Streamlit script runs) and get a
+    job ID; their progress is read with :meth:`job`. The connection pool and the
+    loaded modules stay warm between jobs, and a job keeps running when the
+    session that submitted it reruns. At most ``max_active_jobs`` jobs run at once,
+    the rest wait in the ``queued`` state.
+    """
+
+    def __init__(
+        self,
+        max_active_jobs: int = DEFAULT_MAX_ACTIVE_JOBS,
+        job_retention: float = DEFAULT_JOB_RETENTION,
+        **engine_options: Any,
+    ) -> None:
+        self.max_active_jobs = max_active_jobs
+        self.job_retention = job_retention
+        self.engine_options = engine_options
+        self._jobs: Dict[str, _Job] = {}
+        self._modules: Dict[Tuple[str, Optional[str]], List[LoadedModule]] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._token: Optional[trio.lowlevel.TrioToken] = None
+        self._nursery: Optional[trio.Nursery] = None
+        self._engine: Optional[CheckEngine] = None
+        self._limiter: Optional[trio.CapacityLimiter] = None
+        self._stop: Optional[trio.Event] = None
+        self._startup_error: Optional[BaseException] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and self._token is not None
+
+    def start(self) -> "CheckService":
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name="check-service", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._startup_error is not None:
+            raise RuntimeError("Nie udało się uruchomić usługi sprawdzania") from self._startup_error
+        return self
+
+    def _run(self) -> None:
+        try:
+            trio.run(self._main)
+        except BaseException as exc:
+            self._startup_error = exc
+        finally:
+            self._token = None
+            self._ready.set()
+
+    async def _main(self) -> None:
+        async with CheckEngine(**self.engine_options) as engine:
+            async with trio.open_nursery() as nursery:
+                self._engine = engine
+                self._nursery = nursery
+                self._limiter = trio.CapacityLimiter(self.max_active_jobs)
+                self._stop = trio.Event()
+                self._token = trio.lowlevel.current_trio_token()
+                self._ready.set()
+                await self._stop.wait()
+                nursery.cancel_scope.cancel()
+        health = self.engine_options.get("health")
+        if health is not None:
+            health.save()
+
+    def modules(self, target: CheckerTarget, modules_str: Optional[str] = None) -> List[LoadedModule]:
+        """Loaded (lazy) modules for ``target``, shared by every job that uses them."""
+        key = (target.name, modules_str)
+        with self._lock:
+            cached = self._modules.get(key)
+        if cached is not None:
+            return cached
+        loaded = prepare_modules(
+            target,
+            modules_str,
+            lazy=True,
+            health=self.engine_options.get("health"),
+            instrumentation=self.engine_options.get("instrumentation"),
+        )
+        with self._lock:
+            return self._modules.setdefault(key, loaded)
+
+    def submit(
+        self,
+        target: CheckerTarget,
+        identifier: Any,
+        modules_str: Optional[str] = None,
+        *,
+        deadline: Optional[float] = None,
+    ) -> str:
+        if not self.running:
+            raise RuntimeError("Usługa sprawdzania nie jest uruchomiona")
+        job = _Job(
+            job_id=f"{target.name}-{next(self._ids)}",
+            target=target,
+            identifier=identifier,
+            modules=self.modules(target, modules_str),
+            deadline=deadline,
+        )
+        with self._lock:
+            self._prune_locked(time.monotonic())
+            self._jobs[job.job_id] = job
+        trio.from_thread.run_sync(self._start_job, job, trio_token=self._token)
+        return job.job_id
+
+    def _start_job(self, job: _Job) -> None:
+        assert self._nursery is not None
+        self._nursery.start_soon(self._run_job, job)
+
+    async def _run_job(self, job: _Job) -> None:
+        assert self._engine is not None and self._limiter is not None
+
+        def _on_result(module_out: List[dict]) -> None:
+            with self._lock:
+                job.module_results.append(module_out)
+
+        try:
+            async with self._limiter:
+                with self._lock:
+                    job.status = JOB_RUNNING
+                await self._engine.check(
+                    job.target, job.identifier, job.modules, deadline=job.deadline, on_result=_on_result
+                )
+            status, error = JOB_DONE, None
+        except Exception as exc:
+            status, error = JOB_FAILED, str(exc)
+        with self._lock:
+            job.status = status
+            job.error = error
+            job.finished_at = time.monotonic()
+        job.finished_event.set()
+        health = self.engine_options.get("health")
+        if health is not None:
+            # Presets are ranked from these statistics, so keep them on disk
+            await trio.to_thread.run_sync(health.save)
+
+    def _prune_locked(self, now: float) -> None:
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.job_retention
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def job(self, job_id: str) -> Optional[JobSnapshot]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return JobSnapshot(
+                job_id=job.job_id,
+                target=job.target.name,
+                identifier=job.identifier,
+                status=job.status,
+                total=len(job.modules),
+                module_results=list(job.module_results),
+                error=job.error,
+            )
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[JobSnapshot]:
+        """Block until the job finishes (or ``timeout`` passes) and return its snapshot."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job.finished_event.wait(timeout)
+        return self.job(job_id)
+
+    def shutdown(self) -> None:
+        if self.running and self._stop is not None:
+            trio.from_thread.run_sync(self._stop.set, trio_token=self._token)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+import trio
+
+from lib.checker import DEFAULT_CONCURRENCY, CheckEngine, CheckerTarget, prepare_modules
+from lib.client import get_profile
+from lib.ratelimit import CheckScheduler, RetryPolicy
+
+
+T = TypeVar("T")
+
+# Each chunk ends with a barrier (its slowest module); with a persistent engine per
+# worker, larger chunks only cost a little more buffering in the parent
+DEFAULT_CHUNK_SIZE = 200
+# Chunks queued per worker; keeps every process busy without reading the whole input
+IN_FLIGHT_PER_PROCESS = 2
+
+ShardWorker = Callable[..., List[Tuple[Any, List[dict]]]]
+
+
+def default_processes() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+def iter_chunks(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_sharded(
+    items: Iterable[T],
+    worker: ShardWorker,
+    worker_kwargs: Optional[Dict[str, Any]] = None,
+    *,
+    processes: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: Tuple[Any, ...] = (),
+) -> Iterator[Tuple[T, List[dict]]]:
+    """Split ``items`` into chunks and check them in a pool of worker processes.
+
+    ``worker(chunk, **worker_kwargs)`` must be a picklable module-level function that
+    returns ``(item, results)`` pairs for its chunk in order; ``initializer(*initargs)``
+    runs once in every worker process. Pairs are yielded in input order, and only a
+    small window of chunks is in flight, so arbitrarily long inputs are streamed.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size musi być >= 1")
+    processes = processes or default_processes()
+    kwargs = dict(worker_kwargs or {})
+    max_in_flight = processes * IN_FLIGHT_PER_PROCESS
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=initializer, initargs=initargs) as pool:
+        pending: Deque["Future[List[Tuple[T, List[dict]]]]"] = deque()
+        for chunk in iter_chunks(items, chunk_size):
+            pending.append(pool.submit(worker, chunk, **kwargs))
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class _WorkerEngine:
+    """One CheckEngine per worker process, kept open across chunks.
+
+    The engine lives in a trio loop on a daemon thread, so its connection pool,
+    DNS cache and scheduler state carry over from chunk to chunk; chunks are
+    handed to the loop with ``trio.from_thread.run``.
+    """
+
+    def __init__(self, target: CheckerTarget, modules_str: Optional[str], engine_options: Dict[str, Any]) -> None:
+        self.target = target
+        self.modules = prepare_modules(target, modules_str, lazy=True)
+        self._engine_options = engine_options
+        self._engine: Optional[CheckEngine] = None
+        self._token: Optional[trio.lowlevel.TrioToken] = None
+        self._error: Optional[BaseException] = None
+        self._ready = threading.Event()
+        threading.Thread(target=self._run, name="shard-engine", daemon=True).start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        try:
+            trio.run(self._serve)
+        except BaseException as exc:
+            self._error = exc
+            self._ready.set()
+
+    async def _serve(self) -> None:
+        async with CheckEngine(**self._engine_options) as engine:
+            self._engine = engine
+            self._token = trio.lowlevel.current_trio_token()
+            self._ready.set()
+            await trio.sleep_forever()
+
+    async def _check(self, chunk: List[Any]) -> List[Tuple[Any, List[dict]]]:
+        assert self._engine is not None
+        results: Dict[Any, List[dict]] = {}
+
+        async def _emit(target: CheckerTarget, identifier: Any, out: List[dict]) -> None:
+            results[identifier] = out
+
+        await self._engine.run_batch(
+            ((self.target, identifier) for identifier in chunk),
+            {self.target.name: self.modules},
+            _emit,
+        )
+        return [(identifier, results.get(identifier, [])) for identifier in chunk]
+
+    def check(self, chunk: List[Any]) -> List[Tuple[Any, List[dict]]]:
+        return trio.from_thread.run(self._check, chunk, trio_token=self._token)
+
+
+# Per worker process: the configuration from _init_worker and the engine built from it
+_WORKER_CONFIG: Optional[Tuple[CheckerTarget, Optional[str], Dict[str, Any]]] = None
+_WORKER_ENGINE: Optional[_WorkerEngine] = None
+
+
+def _init_worker(
+    target: CheckerTarget,
+    modules_str: Optional[str],
+    concurrency: int,
+    rate: Optional[float],
+    module_timeout: Optional[float],
+    retries: int = 0,
+    profile_name: str = "default",
+) -> None:
+    global _WORKER_CONFIG, _WORKER_ENGINE
+    scheduler = None
+    if rate:
+        scheduler = CheckScheduler(
+            rate_per_domain=rate,
+            max_concurrency=concurrency,
+            initial_concurrency=concurrency,
+        )
+    engine_options = {
+        "concurrency": concurrency,
+        "scheduler": scheduler,
+        "module_timeout": module_timeout,
+        "retry": RetryPolicy(max_retries=retries) if retries else None,
+        "profile": get_profile(profile_name),
+    }
+    _WORKER_CONFIG = (target, modules_str, engine_options)
+    _WORKER_ENGINE = None
+
+
+def _check_chunk(chunk: List[Any]) -> List[Tuple[Any, List[dict]]]:
+    global _WORKER_ENGINE
+    if _WORKER_ENGINE is None:
+        # Built on the first chunk rather than in the initializer, so a failure
+        # (e.g. no module loads) reaches the parent as this chunk's exception
+        if _WORKER_CONFIG is None:
+            raise RuntimeError("Proces roboczy nie został zainicjalizowany")
+        _WORKER_ENGINE = _WorkerEngine(*_WORKER_CONFIG)
+    return _WORKER_ENGINE.check(chunk)
+
+
+def check_sharded(
+    target: CheckerTarget,
+    identifiers: Iterable[T],
+    modules_str: Optional[str] = None,
+    *,
+    processes: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate: Optional[float] = None,
+    module_timeout: Optional[float] = None,
+    retries: int = 0,
+    profile_name: str = "default",
+) -> Iterator[Tuple[T, List[dict]]]:
+    """Check ``identifiers`` of ``target`` in a pool of worker processes, in input order.
+
+    Every worker keeps one trio loop, engine and connection pool for all of its
+    chunks; ``rate`` is the total per-domain rate and is split evenly between the
+    workers.
+    """
+    processes = processes or default_processes()
+    worker_rate = rate / processes if rate else None
+    return run_sharded(
+        identifiers,
+        _check_chunk,
+        processes=processes,
+        chunk_size=chunk_size,
+        initializer=_init_worker,
+        initargs=(target, modules_str, concurrency, worker_rate, module_timeout, retries, profile_name),
+    )